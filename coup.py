@@ -1,24 +1,82 @@
+import argparse
+import asyncio
 import sys
+from contextlib import nullcontext
+from functools import partial
 
+from dotenv import load_dotenv
 from rich.panel import Panel
 from rich.text import Text
 
-from dotenv import load_dotenv
-load_dotenv()
-
 from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.players.human import HumanPlayer
+from src.models.table import TableSpec
+from src.utils.dashboard import DEFAULT_FRAMES_PER_SECOND, LiveDashboard
 from src.utils.print import (
+    aprint_confirm,
+    aprint_prompt,
     console,
     print_blank,
-    print_confirm,
-    print_prompt,
     print_text,
 )
 
+# Settings like the LLM rate limits are read from the environment on first use, not on import
+load_dotenv()
 console.clear()
 
 
-def main():
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="The Resistance: Coup")
+    parser.add_argument(
+        "--table", help="Table composition, e.g. 'human,llm*2,ai*2:think_time=0'"
+    )
+    parser.add_argument("--table-config", help="Table composition from a .toml or .json file")
+    parser.add_argument("--no-narration", action="store_true", help="Skip the LLM table talk")
+    parser.add_argument(
+        "--batch-narration",
+        action="store_true",
+        help="Generate the table talk of a turn in one LLM call, said once the turn is played",
+    )
+    parser.add_argument(
+        "--stream-narration", action="store_true", help="Print the table talk while the LLM generates it"
+    )
+    parser.add_argument(
+        "--live", action="store_true", help="Show the game on a dashboard that updates in place"
+    )
+    parser.add_argument(
+        "--fps", type=float, default=DEFAULT_FRAMES_PER_SECOND, help="Most dashboard redraws per second"
+    )
+    parser.add_argument(
+        "--turn-timeout",
+        type=float,
+        help="Seconds you get for each decision, after which a safe default is played for you",
+    )
+    return parser.parse_args()
+
+
+def narration_settings(args: argparse.Namespace) -> dict:
+    """The narration flags given on the command line, which take precedence over a table file"""
+    settings = {}
+    if args.no_narration:
+        settings["narration"] = False
+    if args.batch_narration:
+        settings["batch_narration"] = True
+    if args.stream_narration:
+        settings["stream_narration"] = True
+    return settings
+
+
+def parse_table_spec(args: argparse.Namespace) -> TableSpec | None:
+    if args.table_config:
+        return TableSpec.from_file(args.table_config).model_copy(update=narration_settings(args))
+    if args.table:
+        return TableSpec.from_cli_spec(args.table, **narration_settings(args))
+    return None
+
+
+async def main():
+    args = parse_args()
+    table_spec = parse_table_spec(args)
 
     text = Text(
         """
@@ -49,14 +107,23 @@ def main():
     console.print(panel)
 
     console.print()
-    player_name = print_prompt("What is your name, player?")
+    human_player_factory = partial(HumanPlayer, decision_timeout=args.turn_timeout)
+    if table_spec:
+        player_name = await aprint_prompt("What is your name, player?") if table_spec.has_human else "Player"
+        handler = ResistanceCoupGameHandler.from_table_spec(
+            table_spec, player_name, human_player_factory=human_player_factory
+        )
+    else:
+        player_name = await aprint_prompt("What is your name, player?")
 
-    ai_play = print_confirm("Do you wanna continue game only with AI players?")
+        ai_play = await aprint_confirm("Do you wanna continue game only with AI players?")
 
-    handler = ResistanceCoupGameHandler(player_name, 5, ai_play)
+        handler = ResistanceCoupGameHandler(
+            player_name, 5, ai_play, human_player_factory=human_player_factory, **narration_settings(args)
+        )
 
     console.print()
-    game_ready = print_confirm("Ready to start?")
+    game_ready = await aprint_confirm("Ready to start?")
 
     # Play the game
     while game_ready:
@@ -67,31 +134,37 @@ def main():
         # Take turns until we have a winner
         end_state = False
         turn_count = 0
-        while not end_state:
-            turn_count += 1
+        with LiveDashboard(console, args.fps) if args.live else nullcontext() as dashboard:
+            while not end_state:
+                turn_count += 1
 
-            handler.print_game_state()
+                handler.print_game_state()
 
-            console.print()
-            panel = Panel(Text(f"Turn {turn_count}", style="bold", justify="left"), expand=False)
-            console.print(panel)
+                if dashboard is not None:
+                    dashboard.show_turn(turn_count)
+                else:
+                    console.print()
+                    panel = Panel(Text(f"Turn {turn_count}", style="bold", justify="left"), expand=False)
+                    console.print(panel)
 
-            end_state = handler.handle_turn()
+                # Waiting on you doesn't hold up the bots' background work
+                end_state = await handler.ahandle_turn()
 
         console.print()
 
         console.print("======================")
         handler.print_game_history()
-        game_ready = print_confirm("Want to play again?")
+        game_ready = await aprint_confirm("Want to play again?")
 
+    handler.close()
     print_blank()
     print_text("GAME OVER", rainbow=True)
 
 
 if __name__ == "__main__":
     try:
-        main()
-    except KeyboardInterrupt:
+        asyncio.run(main())
+    except (KeyboardInterrupt, EOFError):
         print_blank()
         print_text("GAME OVER", rainbow=True)
         sys.exit(130)
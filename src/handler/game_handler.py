@@ -1,26 +1,60 @@
+import logging
 import random
 from enum import Enum
-from typing import List, Optional, Tuple, Union
-import io
-import sys
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
 import names
-from src.models.action import Action, ActionType, CounterAction, get_counter_action
-from src.models.card import Card, build_deck
+from rich.text import Text
+
+from src.handler.seat_ring import SeatRing
+from src.handler.speculation import SpeculativeDecisionEngine, decision_key
+from src.handler.turn_steps import (
+    Narration,
+    PlayerDecision,
+    SpeculatedDecision,
+    TurnNarration,
+    TurnSteps,
+)
+from src.models.action import (
+    Action,
+    ActionType,
+    CounterAction,
+    TaxAction,
+    get_counter_action,
+)
+from src.models.beliefs import BeliefTracker
+from src.models.card import Card, CardType
+from src.models.deck import Deck, copies_per_type_for
+from src.models.game_history import FinalState, GameHistory, HistoryRecord, PlayerState
 from src.models.players.base import BasePlayer
 from src.models.players.human import HumanPlayer
-from src.models.players.llm_player.llm_player import LLMPlayer
-from src.models.players.llm_player.llm_player import generate_message
-from src.models.game_history import GameHistory, HistoryRecord, FinalState, PlayerState
+from src.models.players.registry import resolve_strategy
+from src.models.table import HUMAN_STRATEGY, SeatSpec, TableSpec
+from src.stats.aggregator import GameRecorder, TournamentStats
+from src.stats.training_data import DecisionRecorder, TrainingDataWriter
 from src.utils.game_state import generate_players_table, generate_state_panel
 from src.utils.print import (
     build_action_report_string,
     build_counter_report_string,
-    print_confirm,
+    capture_print,
+    get_dashboard,
     print_panel,
     print_table,
     print_text,
     print_texts,
 )
+from src.utils.steps import arun_steps, run_steps
+
+logger = logging.getLogger(__name__)
+
+
+# Coins in the treasury at the start of a game, before the starting coins are handed out
+BASE_TREASURY_COINS = 50
+# Big variant tables get a larger treasury, so it does not run dry before the first coup
+TREASURY_COINS_PER_PLAYER = 5
+
+# Claims worth speculating a challenge decision on while the current player is still thinking
+LIKELY_CLAIMS: List[Action] = [TaxAction()]
 
 
 class ChallengeResult(Enum):
@@ -32,44 +66,105 @@ class ChallengeResult(Enum):
 class ResistanceCoupGameHandler:
     _players: List[BasePlayer] = []
     _current_player_index = 0
-    _deck: List[Card] = []
+    _active_seats: SeatRing = SeatRing(1)
+    _seat_by_name: Dict[str, int] = {}
+    _pending_defeats: List[int] = []
+    _defeated_seats: List[int] = []
+    _game_recorder: Optional[GameRecorder] = None
+    _decision_recorder: Optional[DecisionRecorder] = None
+    _current_action: Optional[Action] = None
+    _pending_claim: Optional[Union[Action, CounterAction]] = None
+    _deck: Deck = Deck()
     _number_of_players: int = 0
     _treasury: int = 0
     _game_history: GameHistory = GameHistory(history=[])
+    _belief_tracker: BeliefTracker = BeliefTracker()
     _turn_count: int = 0
     _current_turn_messages: List[str] = []
+    _turn_narrations: List[Narration] = []
 
-    def __init__(self, player_name: str, number_of_players: int, ai_play: bool = False):
-        self._number_of_players = number_of_players
-        if ai_play:
-            unique_names = set()
-            for i in range(number_of_players):
-                gender = random.choice(["male", "female"])
-
-                ai_name = names.get_first_name(gender=gender)
-                while ai_name in unique_names:
-                    ai_name = names.get_first_name(gender=gender)
-
-                unique_names.add(ai_name)
-
-                # self._players.append(AIPlayer(name=ai_name, game_handler=self))
-                self._players.append(LLMPlayer(name=ai_name, game_handler=self))
-        else:
-            # Set up players
-            self._players.append(HumanPlayer(name=player_name, game_handler=self))
-
-            unique_names = set()
-            for i in range(number_of_players - 1):
-                gender = random.choice(["male", "female"])
+    def __init__(
+            self,
+            player_name: str,
+            number_of_players: int,
+            ai_play: bool = False,
+            human_player_factory: Callable[..., BasePlayer] = HumanPlayer,
+            narration: bool = True,
+            batch_narration: bool = False,
+            stream_narration: bool = False,
+            speculative_decisions: bool = False,
+            seats: Optional[List[SeatSpec]] = None,
+            tournament_stats: Optional[TournamentStats] = None,
+            training_data: Optional[TrainingDataWriter] = None,
+    ):
+        # Per-instance state, so several handlers can run side by side in one process
+        self._players = []
+        self._current_turn_messages = []
+        self._pending_defeats = []
+        self._turn_narrations = []
+        self._narration = narration
+        # Generate the table talk of a turn in one LLM call once it is played, instead of one call per line
+        self._batch_narration = batch_narration
+        # Print the table talk while it is generated, instead of once it is complete
+        self._stream_narration = stream_narration
+        self._speculation = SpeculativeDecisionEngine() if speculative_decisions else None
+        self._tournament_stats = tournament_stats
+        self._training_data = training_data
+
+        if seats is None:
+            # The classic table: you against LLM players, or LLM players only
+            seats = [] if ai_play else [SeatSpec(strategy=HUMAN_STRATEGY, name=player_name)]
+            seats += [SeatSpec(strategy="llm") for _ in range(number_of_players - len(seats))]
+        self._number_of_players = len(seats)
+        self._seat_labels = [seat.display_label for seat in seats]
+
+        # Set up players
+        unique_names = {player_name} | {seat.name for seat in seats if seat.name}
+        for seat in seats:
+            if seat.strategy == HUMAN_STRATEGY:
+                player_factory = human_player_factory
+                seat_name = seat.name or player_name
+            else:
+                player_factory = resolve_strategy(seat.strategy)
+                seat_name = seat.name or self._generate_name(unique_names)
+
+            self._players.append(player_factory(name=seat_name, game_handler=self, **seat.params))
+
+        self._seat_by_name = {player.name: seat for seat, player in enumerate(self._players)}
+        self._active_seats = SeatRing(len(self._players))
+
+    @classmethod
+    def from_table_spec(
+            cls,
+            table_spec: TableSpec,
+            player_name: str = "Player",
+            human_player_factory: Callable[..., BasePlayer] = HumanPlayer,
+            tournament_stats: Optional[TournamentStats] = None,
+            training_data: Optional[TrainingDataWriter] = None,
+    ) -> "ResistanceCoupGameHandler":
+        return cls(
+            player_name,
+            table_spec.number_of_players,
+            human_player_factory=human_player_factory,
+            narration=table_spec.narration,
+            batch_narration=table_spec.batch_narration,
+            stream_narration=table_spec.stream_narration,
+            speculative_decisions=table_spec.speculative_decisions,
+            seats=table_spec.expanded_seats(),
+            tournament_stats=tournament_stats,
+            training_data=training_data,
+        )
 
-                ai_name = names.get_first_name(gender=gender)
-                while ai_name in unique_names:
-                    ai_name = names.get_first_name(gender=gender)
+    @staticmethod
+    def _generate_name(unique_names: set) -> str:
+        gender = random.choice(["male", "female"])
 
-                unique_names.add(ai_name)
+        ai_name = names.get_first_name(gender=gender)
+        while ai_name in unique_names:
+            ai_name = names.get_first_name(gender=gender)
 
-                # self._players.append(AIPlayer(name=ai_name, game_handler=self))
-                self._players.append(LLMPlayer(name=ai_name, game_handler=self))
+        unique_names.add(ai_name)
+        return ai_name
 
     @property
     def current_player(self) -> BasePlayer:
@@ -78,41 +173,146 @@ class ResistanceCoupGameHandler:
     @property
     def remaining_player(self) -> BasePlayer:
         """Return the only remaining player"""
-        return [player for player in self._players if player.is_active][0]
+        return self._players[self._active_seats.first()]
 
     def _capture_print_output(self, func, *args, **kwargs):
-        """Captures the printed output of a function and returns it as a string."""
-        func(*args)
-        captured_output = io.StringIO()
-        sys.stdout = captured_output
-        func(*args, **kwargs)
-        sys.stdout = sys.__stdout__  # Restore the original stdout
-        return captured_output.getvalue()
+        """Prints the output of a function and also returns it as a string."""
+        return capture_print(func, *args, **kwargs)
 
     def get_game_history(self) -> GameHistory:
         return self._game_history
 
+    def get_belief_tracker(self) -> BeliefTracker:
+        return self._belief_tracker
+
+    def get_active_players(self) -> List[BasePlayer]:
+        """Players still in the game, in turn order"""
+        return [self._players[seat] for seat in self._active_seats]
+
+    def get_current_action(self) -> Optional[Action]:
+        """The action of the current turn, once it has been chosen"""
+        return self._current_action
+
+    def get_pending_claim(self) -> Optional[Union[Action, CounterAction]]:
+        """The action or counter that players are deciding whether to challenge"""
+        return self._pending_claim
+
+    def get_final_ranking(self) -> List[int]:
+        """Seats from the winner to the first player out. Only complete once the game has a winner"""
+        return [*self._active_seats, *reversed(self._defeated_seats)]
+
+    def get_speculation_stats(self):
+        return self._speculation.stats if self._speculation else None
+
+    def close(self) -> None:
+        """Stop the background work of the table. The handler can't play another game afterwards"""
+        if self._speculation:
+            self._speculation.shutdown()
+            self._speculation = None
+
+    def _end_speculation(self) -> None:
+        """Drop the speculations left over from the game, and report how useful they were"""
+        self._speculation.discard_stale()
+        stats = self._speculation.stats
+        if stats.issued:
+            logger.info(
+                "Speculative decisions: %d/%d hits (%.1f%%), %d wasted, %d never sent",
+                stats.hits, stats.issued, 100 * stats.hit_rate, stats.wasted, stats.cancelled,
+            )
+
+    def _table_state(self) -> Tuple:
+        """Everything public about the table that a decision can depend on"""
+        return tuple(
+            (player.name, player.coins, len(player.cards))
+            for player in map(self._players.__getitem__, self._active_seats)
+        )
+
+    def _decide(self, key_parts: Tuple, decision: PlayerDecision) -> TurnSteps:
+        """Use the speculated result of a decision if it was made for this exact state"""
+        if self._speculation is None:
+            return (yield decision)
+
+        kind, player, *details = key_parts
+        key = decision_key(kind, player, self._table_state(), *details)
+        return (yield SpeculatedDecision(self._speculation, key, decision))
+
+    def _speculate_challenges(self, players_without_current: list[BasePlayer]) -> None:
+        """While the current player thinks, let the others decide on challenging the likely claims"""
+        available_action_types = {action.action_type for action in self.current_player.available_actions()}
+        for claim in LIKELY_CLAIMS:
+            if claim.action_type not in available_action_types:
+                continue
+
+            claim_message = Text.from_markup(
+                build_action_report_string(player=self.current_player, action=claim, target_player=None)
+            ).plain
+            current_record = self._game_history.history[-1]
+            hypothetical_history = self._game_history.with_latest(
+                current_record.model_copy(
+                    update={"messages": [*self._current_turn_messages, claim_message]}
+                )
+            )
+
+            for challenger in players_without_current:
+                if not hasattr(challenger, "speculative_challenge"):
+                    continue
+                key = decision_key(
+                    "challenge", challenger, self._table_state(), self.current_player.name, claim.action_type
+                )
+                self._speculation.speculate(
+                    key, challenger.speculative_challenge(self.current_player, hypothetical_history)
+                )
+
+    def _speculate_next_action(self) -> None:
+        """Let the next player pick their action while this turn is being wrapped up"""
+        # Players defeated this turn are still seated until the turn is wrapped up
+        if len(self._active_seats) - len(self._pending_defeats) < 2:
+            return
+
+        seat = self._active_seats.next(self._current_player_index)
+        while seat in self._pending_defeats:
+            seat = self._active_seats.next(seat)
+        next_player = self._players[seat]
+        if not hasattr(next_player, "speculative_action"):
+            return
+
+        other_players = [
+            self._players[other_seat]
+            for other_seat in self._active_seats.seats_after(seat)
+            if other_seat not in self._pending_defeats
+        ]
+        key = decision_key(
+            "choose_action",
+            next_player,
+            self._table_state(),
+            tuple(player.name for player in other_players),
+        )
+        self._speculation.speculate(key, next_player.speculative_action(other_players))
+
     def print_game_state(self) -> None:
+        dashboard = get_dashboard()
+        if dashboard is not None:
+            dashboard.show_state(self._players, self._current_player_index, self._deck, self._treasury)
+            return
+
         # Print the table and panel directly without capturing
         print_table(generate_players_table(self._players, self._current_player_index))
         print_panel(generate_state_panel(self._deck, self._treasury, self.current_player))
 
-    def _players_without_player(self, excluded_player: BasePlayer):
-        players_copy = self._players.copy()
-        return [
-            player
-            for player in players_copy
-            if player.is_active and player.name != excluded_player.name
-        ]
-
-    def _shuffle_deck(self) -> None:
-        random.shuffle(self._deck)
+    def _players_without_player(self, excluded_player: BasePlayer) -> List[BasePlayer]:
+        """The other players still in the game, in turn order starting after the excluded player"""
+        excluded_seat = self._seat_by_name[excluded_player.name]
+        return [self._players[seat] for seat in self._active_seats.seats_after(excluded_seat)]
 
     def setup_game(self) -> None:
-        self._deck = build_deck()
-        self._shuffle_deck()
+        copies_per_type = copies_per_type_for(len(self._players))
+        self._deck = Deck.full(copies_per_type)
 
-        self._treasury = 50 - 2 * len(self._players)
+        total_coins = max(BASE_TREASURY_COINS, TREASURY_COINS_PER_PLAYER * len(self._players))
+        self._treasury = total_coins - 2 * len(self._players)
+        self._active_seats = SeatRing(len(self._players))
+        self._pending_defeats = []
+        self._defeated_seats = []
 
         player_states = []
 
@@ -120,8 +320,8 @@ class ResistanceCoupGameHandler:
             player.reset_player()
 
             # Deal 2 cards to each player
-            player.cards.append(self._deck.pop())
-            player.cards.append(self._deck.pop())
+            player.cards.append(self._deck.draw())
+            player.cards.append(self._deck.draw())
 
             # Gives each player 2 coins
             player.coins = 2
@@ -141,10 +341,26 @@ class ResistanceCoupGameHandler:
             number_of_coins_in_treasury=self._treasury
         )
 
+        self._belief_tracker = BeliefTracker()
+        self._belief_tracker.reset((player.name for player in self._players), copies_per_type)
+
         # Random starting player
         self._current_player_index = random.randint(0, self._number_of_players - 1)
 
+        if self._tournament_stats is not None:
+            self._game_recorder = self._tournament_stats.start_game(
+                (player.name, label, (seat - self._current_player_index) % len(self._players))
+                for seat, (player, label) in enumerate(zip(self._players, self._seat_labels))
+            )
+        if self._training_data is not None:
+            # A game that was ended early is never written
+            self._decision_recorder = self._training_data.start_game(
+                (player.name, seat, (seat - self._current_player_index) % len(self._players))
+                for seat, player in enumerate(self._players)
+            )
+
         # Reset game history, turn count, and current turn messages
+        self._game_history.close()
         self._game_history = GameHistory(history=[
             HistoryRecord(
                 turn=0,  # Initial turn
@@ -154,14 +370,29 @@ class ResistanceCoupGameHandler:
             )
         ])
 
-
         self._turn_count = 0
         self._current_turn_messages = []
 
     def _swap_card(self, player: BasePlayer, card: Card) -> None:
-        self._deck.append(card)
-        self._shuffle_deck()
-        player.cards.append(self._deck.pop())
+        self._deck.put_back(card)
+        player.cards.append(self._deck.draw())
+
+    def _player_loses_influence(self, player: BasePlayer) -> TurnSteps[None]:
+        """Let the player discard a card and record which card was revealed"""
+        cards_before = [card.card_type for card in player.cards]
+        yield PlayerDecision(player, "remove_card")
+        for card in player.cards:
+            cards_before.remove(card.card_type)
+
+        for card_type in cards_before:
+            self._belief_tracker.on_discard(player.name, card_type)
+
+        if not player.cards:
+            self._pending_defeats.append(self._seat_by_name[player.name])
+
+    @staticmethod
+    def _holds_card(player: BasePlayer, card_type: Optional[CardType]) -> bool:
+        return any(card.card_type == card_type for card in player.cards)
 
     def _take_coin_from_treasury(self, player: BasePlayer, number_of_coins: int):
         if number_of_coins <= self._treasury:
@@ -177,27 +408,57 @@ class ResistanceCoupGameHandler:
         player.coins -= number_of_coins
 
     def _next_player(self):
-        self._current_player_index = (self._current_player_index + 1) % len(self._players)
-        while not self.current_player.is_active:
-            self._current_player_index = (self._current_player_index + 1) % len(self._players)
+        self._current_player_index = self._active_seats.next(self._current_player_index)
 
     def _remove_defeated_player(self) -> Optional[BasePlayer]:
-        for ind, player in enumerate(self._players):
-            if not player.cards and player.is_active:
-                player.is_active = False
-                self._give_coin_to_treasury(player, player.coins)
-
-                return player
+        """Take the next player who lost their last card this turn out of the game"""
+        while self._pending_defeats:
+            seat = self._pending_defeats.pop(0)
+            player = self._players[seat]
+            if seat not in self._active_seats:
+                continue
+
+            player.is_active = False
+            self._active_seats.remove(seat)
+            self._defeated_seats.append(seat)
+            self._give_coin_to_treasury(player, player.coins)
+
+            return player
         return None
 
     def _determine_win_state(self) -> bool:
-        return sum(player.is_active for player in self._players) == 1
+        return len(self._active_seats) == 1
 
     def _action_phase(
             self, players_without_current: list[BasePlayer]
-    ) -> Tuple[Action, Optional[BasePlayer]]:
+    ) -> TurnSteps[Tuple[Action, Optional[BasePlayer]]]:
+        if self._speculation:
+            self._speculate_challenges(players_without_current)
+
         # Player chooses action
-        target_action, target_player = self.current_player.choose_action(players_without_current)
+        target_action, target_player = yield from self._decide(
+            ("choose_action", self.current_player, tuple(player.name for player in players_without_current)),
+            PlayerDecision(self.current_player, "choose_action", players_without_current),
+        )
+        self._current_action = target_action
+        if self._decision_recorder:
+            self._decision_recorder.on_action(
+                self._turn_count,
+                self.current_player,
+                players_without_current,
+                self._belief_tracker,
+                target_action,
+                target_player,
+            )
+        if target_action.associated_card_type:
+            self._belief_tracker.on_claim(self.current_player.name, target_action.associated_card_type)
+        if self._game_recorder:
+            self._game_recorder.on_action(
+                self.current_player.name,
+                target_action.action_type.value,
+                claimed=target_action.associated_card_type is not None,
+                bluffing=not self._holds_card(self.current_player, target_action.associated_card_type),
+            )
 
         action_message = build_action_report_string(
             player=self.current_player, action=target_action, target_player=target_player
@@ -206,14 +467,14 @@ class ResistanceCoupGameHandler:
             print_text, action_message, with_markup=True
         )
 
-        self._log_player_message(self.current_player, target_action, target_player)
+        yield from self._log_player_message(self.current_player, target_action, target_player)
         self._current_turn_messages.append(captured_output)
 
         return target_action, target_player
 
     def _challenge_against_player_failed(
             self, player_being_challenged: BasePlayer, card: Card, challenger: BasePlayer
-    ):
+    ) -> TurnSteps[None]:
         # Player being challenged reveals the card
         # message = f"{player_being_challenged} reveals their {card} card!"
         captured_output = self._capture_print_output(
@@ -223,11 +484,16 @@ class ResistanceCoupGameHandler:
             " card!",
         )
 
-        history = self._game_history
-        history.history[-1].messages = self._current_turn_messages
+        if self._narration and self._batch_narration:
+            self._turn_narrations.append(
+                Narration(challenger, "challenge_failed", player_being_challenged, self._game_history)
+            )
+        elif self._narration:
+            history = self._game_history
+            history.history[-1].messages = self._current_turn_messages
 
-        player_message = generate_message(challenger, "challenge_failed", player_being_challenged, history)
-        self._current_turn_messages.append(f"{self.current_player} said: {player_message}")
+            player_message = yield Narration(challenger, "challenge_failed", player_being_challenged, history)
+            self._current_turn_messages.append(f"{self.current_player} said: {player_message}")
 
         self._current_turn_messages.append(captured_output)
         captured_output = self._capture_print_output(
@@ -236,7 +502,7 @@ class ResistanceCoupGameHandler:
         self._current_turn_messages.append(captured_output)
 
         # Challenge player loses influence (chooses a card to remove)
-        challenger.remove_card()
+        yield from self._player_loses_influence(challenger)
 
         # Player puts card into the deck and gets a new card
         captured_output = self._capture_print_output(
@@ -244,38 +510,63 @@ class ResistanceCoupGameHandler:
         )
         self._current_turn_messages.append(captured_output)
         self._swap_card(player_being_challenged, card)
+        self._belief_tracker.on_card_replaced(player_being_challenged.name, card.card_type)
 
-    def _challenge_against_player_succeeded(self, player_being_challenged: BasePlayer):
+    def _challenge_against_player_succeeded(
+            self, player_being_challenged: BasePlayer, action_being_challenged: Union[Action, CounterAction]
+    ) -> TurnSteps[None]:
         message = f"{player_being_challenged} bluffed! They do not have the required card!"
         captured_output = self._capture_print_output(print_text, message)
 
-        self._log_player_message(player_being_challenged, "challenge_succeed", None)
+        yield from self._log_player_message(player_being_challenged, "challenge_succeed", None)
         self._current_turn_messages.append(captured_output)
 
         # Player being challenged loses influence (chooses a card to remove)
-        player_being_challenged.remove_card()
+        self._belief_tracker.on_challenge_succeeded(
+            player_being_challenged.name, action_being_challenged.associated_card_type
+        )
+        yield from self._player_loses_influence(player_being_challenged)
 
     def _challenge_phase(
             self,
             other_players: list[BasePlayer],
             player_being_challenged: BasePlayer,
             action_being_challenged: Union[Action, CounterAction],
-    ) -> ChallengeResult:
+    ) -> TurnSteps[ChallengeResult]:
         # Every player can choose to challenge
+        self._pending_claim = action_being_challenged
         for challenger in other_players:
-            should_challenge = challenger.determine_challenge(player_being_challenged)
+            claim_type = getattr(action_being_challenged, "action_type", None) or action_being_challenged.counter_type
+            should_challenge = yield from self._decide(
+                ("challenge", challenger, player_being_challenged.name, claim_type),
+                PlayerDecision(challenger, "determine_challenge", player_being_challenged),
+            )
+            if self._decision_recorder:
+                self._decision_recorder.on_challenge(
+                    self._turn_count,
+                    challenger,
+                    self._players_without_player(challenger),
+                    self._belief_tracker,
+                    action_being_challenged,
+                    player_being_challenged,
+                    should_challenge,
+                )
             if should_challenge:
                 challenge_message = f"{challenger} is challenging {player_being_challenged}!"
                 if challenger.is_ai:
-                    self._log_player_message(challenger, "challenge", player_being_challenged)
+                    yield from self._log_player_message(challenger, "challenge", player_being_challenged)
                     captured_output = self._capture_print_output(print_text, challenge_message)
                     self._current_turn_messages.append(captured_output)
 
+                card = player_being_challenged.find_card(action_being_challenged.associated_card_type)
+                if self._game_recorder:
+                    self._game_recorder.on_challenge(
+                        challenger.name, player_being_challenged.name, succeeded=card is None
+                    )
+
                 # Player being challenged has the card
-                if card := player_being_challenged.find_card(
-                        action_being_challenged.associated_card_type
-                ):
-                    self._challenge_against_player_failed(
+                if card:
+                    yield from self._challenge_against_player_failed(
                         player_being_challenged=player_being_challenged,
                         card=card,
                         challenger=challenger,
@@ -284,7 +575,9 @@ class ResistanceCoupGameHandler:
 
                 # Player being challenged bluffed
                 else:
-                    self._challenge_against_player_succeeded(player_being_challenged)
+                    yield from self._challenge_against_player_succeeded(
+                        player_being_challenged, action_being_challenged
+                    )
                     return ChallengeResult.challenge_succeeded
 
         # No challenge happened
@@ -292,19 +585,37 @@ class ResistanceCoupGameHandler:
 
     def _counter_phase(
             self, players_without_current: list[BasePlayer], target_action: Action
-    ) -> Tuple[Optional[BasePlayer], Optional[CounterAction]]:
+    ) -> TurnSteps[Tuple[Optional[BasePlayer], Optional[CounterAction]]]:
         # Every player can choose to counter
         for countering_player in players_without_current:
-            should_counter = countering_player.determine_counter(self.current_player)
+            should_counter = yield PlayerDecision(countering_player, "determine_counter", self.current_player)
+            if self._decision_recorder:
+                self._decision_recorder.on_counter(
+                    self._turn_count,
+                    countering_player,
+                    self._players_without_player(countering_player),
+                    self._belief_tracker,
+                    target_action,
+                    self.current_player,
+                    should_counter,
+                )
             if should_counter:
                 target_counter = get_counter_action(target_action.action_type)
+                self._belief_tracker.on_claim(countering_player.name, target_counter.associated_card_type)
+                if self._game_recorder:
+                    self._game_recorder.on_action(
+                        countering_player.name,
+                        target_counter.counter_type.value,
+                        claimed=True,
+                        bluffing=not self._holds_card(countering_player, target_counter.associated_card_type),
+                    )
                 counter_message = build_counter_report_string(
                     target_player=self.current_player,
                     counter=target_counter,
                     countering_player=countering_player,
                 )
 
-                self._log_player_message(countering_player, target_counter, self.current_player)
+                yield from self._log_player_message(countering_player, target_counter, self.current_player)
                 captured_output = self._capture_print_output(print_text, counter_message)
                 self._current_turn_messages.append(captured_output)
 
@@ -314,9 +625,9 @@ class ResistanceCoupGameHandler:
 
     def _execute_action(
             self, action: Action, target_player: BasePlayer, countered: bool = False
-    ) -> None:
+    ) -> TurnSteps[None]:
 
-        self._log_player_message(self.current_player, action, target_player)
+        yield from self._log_player_message(self.current_player, action, target_player)
         match action.action_type:
             case ActionType.income:
                 # Player gets 1 coin
@@ -340,7 +651,7 @@ class ResistanceCoupGameHandler:
 
                 if target_player.cards:
                     # Target player loses influence
-                    target_player.remove_card()
+                    yield from self._player_loses_influence(target_player)
             case ActionType.tax:
                 # Player gets 3 coins
                 self._take_coin_from_treasury(self.current_player, 3)
@@ -354,7 +665,7 @@ class ResistanceCoupGameHandler:
                     message = f"{self.current_player} assassinates {target_player}"
                     captured_output = self._capture_print_output(print_text, message)
                     self._current_turn_messages.append(captured_output)
-                    target_player.remove_card()
+                    yield from self._player_loses_influence(target_player)
             case ActionType.steal:
                 if not countered:
                     # Take 2 (or all) coins from a player
@@ -366,10 +677,11 @@ class ResistanceCoupGameHandler:
                     self._current_turn_messages.append(captured_output)
             case ActionType.exchange:
                 # Get 2 random cards from deck
-                cards = [self._deck.pop(), self._deck.pop()]
-                first_card, second_card = self.current_player.choose_exchange_cards(cards)
-                self._deck.append(first_card)
-                self._deck.append(second_card)
+                cards = [self._deck.draw(), self._deck.draw()]
+                first_card, second_card = yield PlayerDecision(self.current_player, "choose_exchange_cards", cards)
+                self._deck.put_back(first_card)
+                self._deck.put_back(second_card)
+                self._belief_tracker.on_exchange(self.current_player.name)
 
     def _record_final_state(self):
         player_states = [
@@ -387,12 +699,28 @@ class ResistanceCoupGameHandler:
         )
         self._game_history.history[-1].final_state = final_state
 
+        if self._game_recorder:
+            self._game_recorder.on_turn_end(
+                self._turn_count, (self._players[seat].coins for seat in self._active_seats)
+            )
+
     def handle_turn(self) -> bool:
+        """Play one turn, blocking on every decision. Returns whether the game is over"""
+        return run_steps(self._turn())
+
+    async def ahandle_turn(self) -> bool:
+        """Play one turn, awaiting every decision, so other tables keep playing in the meantime"""
+        return await arun_steps(self._turn())
+
+    def _turn(self) -> TurnSteps[bool]:
         self._turn_count += 1
         self._current_turn_messages = []  # Reset messages for the new turn
+        self._turn_narrations = []
+        self._current_action = None
+        self._pending_claim = None
 
         # Create new record for the current turn
-        self._game_history.history.append(
+        self._game_history.append(
             HistoryRecord(
                 turn=self._turn_count,
                 current_player=self.current_player.name,
@@ -404,61 +732,83 @@ class ResistanceCoupGameHandler:
         players_without_current = self._players_without_player(self.current_player)
 
         # Choose an action to perform
-        target_action, target_player = self._action_phase(players_without_current)
+        target_action, target_player = yield from self._action_phase(players_without_current)
+
+        yield from self._resolve_action(players_without_current, target_action, target_player)
+
+        if self._speculation:
+            self._speculation.discard_stale()
+            self._speculate_next_action()
+
+        # Is any player out of the game?
+        if (yield from self._defeat_phase()):
+            return True
+
+        # Have we reached a winner?
+        if self._determine_win_state():
+            yield from self._win_phase()
+            return True
+
+        yield from self._narrate_turn()
+        self._record_final_state()
+        self._next_player()
+
+        # Record the messages for the completed turn
+        self._game_history.history[-1].messages = self._current_turn_messages
 
+        # No winner yet
+        return False
+
+    def _resolve_action(
+            self, other_players: List[BasePlayer], target_action: Action, target_player: Optional[BasePlayer]
+    ) -> TurnSteps[None]:
+        """Give the other players the opportunity to challenge and counter the action, then resolve it"""
         # Opportunity to challenge action
         challenge_result = ChallengeResult.no_challenge
         if target_action.can_be_challenged:
-            challenge_result = self._challenge_phase(
-                other_players=players_without_current,
+            challenge_result = yield from self._challenge_phase(
+                other_players=other_players,
                 player_being_challenged=self.current_player,
                 action_being_challenged=target_action,
             )
 
         if challenge_result == ChallengeResult.challenge_succeeded:
             # Challenge succeeded and the action does not take place
-            pass
-        elif challenge_result == ChallengeResult.challenge_failed:
-            # Challenge failed and the action is still resolved
-            self._execute_action(target_action, target_player)
-        elif challenge_result == ChallengeResult.no_challenge:
-            # Action can't be countered
-            if not target_action.can_be_countered:
-                self._execute_action(target_action, target_player)
-
-            # Opportunity to counter
-            else:
-                countering_player, counter = self._counter_phase(
-                    players_without_current, target_action
-                )
-
-                # Opportunity to challenge counter
-                counter_challenge_result = ChallengeResult.no_challenge
-                if countering_player and counter:
-                    players_without_countering_player = self._players_without_player(
-                        countering_player
-                    )
-                    counter_challenge_result = self._challenge_phase(
-                        other_players=players_without_countering_player,
-                        player_being_challenged=countering_player,
-                        action_being_challenged=counter,
-                    )
+            return
+        if challenge_result == ChallengeResult.challenge_failed or not target_action.can_be_countered:
+            # Challenge failed and the action is still resolved, or the action can't be countered
+            yield from self._execute_action(target_action, target_player)
+            return
+
+        # Opportunity to counter
+        countering_player, counter = yield from self._counter_phase(other_players, target_action)
+
+        # Opportunity to challenge counter
+        counter_challenge_result = ChallengeResult.no_challenge
+        if countering_player and counter:
+            players_without_countering_player = self._players_without_player(countering_player)
+            counter_challenge_result = yield from self._challenge_phase(
+                other_players=players_without_countering_player,
+                player_being_challenged=countering_player,
+                action_being_challenged=counter,
+            )
 
-                # Successfully countered and counter not challenged
-                if counter and counter_challenge_result in [
-                    ChallengeResult.no_challenge,
-                    ChallengeResult.challenge_failed,
-                ]:
-                    self._execute_action(target_action, target_player, countered=True)
-                # No counter occurred
-                else:
-                    self._execute_action(target_action, target_player)
+        # Successfully countered and counter not challenged
+        if counter and counter_challenge_result in [
+            ChallengeResult.no_challenge,
+            ChallengeResult.challenge_failed,
+        ]:
+            yield from self._execute_action(target_action, target_player, countered=True)
+        # No counter occurred
+        else:
+            yield from self._execute_action(target_action, target_player)
 
-        # Is any player out of the game?
+    def _defeat_phase(self) -> TurnSteps[bool]:
+        """Take the defeated players out of the game. Returns whether our defeated human ends the game"""
         while player := self._remove_defeated_player():
             if player.is_ai:
                 message = f"{player} was defeated! :skull: :skull: :skull:"
-                self._log_player_message(player, "defeated", None)
+                yield from self._log_player_message(player, "defeated", None)
                 captured_output = self._capture_print_output(print_text, message, with_markup=True)
                 self._current_turn_messages.append(captured_output)
             else:
@@ -466,31 +816,31 @@ class ResistanceCoupGameHandler:
                 message = "You were defeated! :skull: :skull: :skull:"
                 captured_output = self._capture_print_output(print_text, message, with_markup=True)
                 self._current_turn_messages.append(captured_output)
-                end_game = print_confirm("Do you want to end the game early?")
+                end_game = yield PlayerDecision(player, "determine_end_game")
                 if end_game:
+                    yield from self._narrate_turn()
+                    if self._speculation:
+                        self._end_speculation()
                     return True
+        return False
 
-        # Have we reached a winner?
-        if self._determine_win_state():
-            message = f":raising_hands: Congratulations {self.remaining_player}! You are the final survivor!"
-            captured_output = self._capture_print_output(print_text, message, with_markup=True)
-            self._log_player_message(self.remaining_player, "survival", None)
-            self._current_turn_messages.append(captured_output)
-            self._record_final_state()
-            return True
-
+    def _win_phase(self) -> TurnSteps[None]:
+        message = f":raising_hands: Congratulations {self.remaining_player}! You are the final survivor!"
+        captured_output = self._capture_print_output(print_text, message, with_markup=True)
+        yield from self._log_player_message(self.remaining_player, "survival", None)
+        self._current_turn_messages.append(captured_output)
+        yield from self._narrate_turn()
         self._record_final_state()
-        self._next_player()
-
-        # Record the messages for the completed turn
-        self._game_history.history[-1].messages = self._current_turn_messages
-
-        # No winner yet
-        return False
+        if self._game_recorder:
+            self._game_recorder.on_game_end(self.remaining_player.name, self._turn_count)
+        if self._decision_recorder:
+            self._decision_recorder.on_game_end(self.remaining_player.name)
+        if self._speculation:
+            self._end_speculation()
 
     def print_game_history(self):
         """Prints the game history in a readable format."""
-        for record in self._game_history.history:
+        for record in self._game_history.records():
             print(f"Turn {record.turn}:")
             print(f"  Current Player: {record.current_player}")
             for message in record.messages:
@@ -499,7 +849,9 @@ class ResistanceCoupGameHandler:
                 print("  Final State:")
                 for player_state in record.final_state.player_states:
                     print(
-                        f"    {player_state.name}: Coins - {player_state.number_of_coins}, Cards - {player_state.number_of_cards}")
+                        f"    {player_state.name}: Coins - {player_state.number_of_coins}, "
+                        f"Cards - {player_state.number_of_cards}"
+                    )
                 print(f"    Deck: {record.final_state.number_of_cards_in_deck} cards")
                 print(f"    Treasury: {record.final_state.number_of_coins_in_treasury} coins")
 
@@ -515,7 +867,9 @@ class ResistanceCoupGameHandler:
                 print("  Final State:")
                 for player_state in last_record.final_state.player_states:
                     print(
-                        f"    {player_state.name}: Coins - {player_state.number_of_coins}, Cards - {player_state.number_of_cards}")
+                        f"    {player_state.name}: Coins - {player_state.number_of_coins}, "
+                        f"Cards - {player_state.number_of_cards}"
+                    )
                 print(f"    Deck: {last_record.final_state.number_of_cards_in_deck} cards")
                 print(f"    Treasury: {last_record.final_state.number_of_coins_in_treasury} coins")
         else:
@@ -525,9 +879,31 @@ class ResistanceCoupGameHandler:
         """Logs a message to the current turn's history."""
         self._current_turn_messages.append(message)
 
-    def _log_player_message(self, player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer]):
+    def _log_player_message(
+            self, player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer]
+    ) -> TurnSteps[None]:
+        if not self._narration:
+            return
+        if self._batch_narration:
+            self._turn_narrations.append(Narration(player, action, target_player, self._game_history))
+            return
+
         history = self._game_history
         history.history[-1].messages = self._current_turn_messages
-        player_message = generate_message(player, action, target_player, history)
-        print(f"{player} said: {player_message}")
+        player_message = yield Narration(player, action, target_player, history, stream=self._stream_narration)
+        if not self._stream_narration:
+            print_text(f"{player} said: {player_message}")
         self._current_turn_messages.append(f"{player} said: {player_message}")
+
+    def _narrate_turn(self) -> TurnSteps[None]:
+        """Say the table talk collected during the turn, generated in one call now that the turn is played"""
+        if not self._turn_narrations:
+            return
+
+        narrations, self._turn_narrations = self._turn_narrations, []
+        history = self._game_history
+        history.history[-1].messages = self._current_turn_messages
+        player_messages = yield TurnNarration(narrations, history)
+        for player_name, player_message in player_messages:
+            print_text(f"{player_name} said: {player_message}")
+            self._current_turn_messages.append(f"{player_name} said: {player_message}")
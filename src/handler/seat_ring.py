@@ -0,0 +1,63 @@
+from typing import Iterator, List
+
+
+class SeatRing:
+    """The seats still in the game, in turn order, as a circular doubly linked list.
+
+    Finding the next seat and removing a seat both take constant time, however many
+    seats have been removed already.
+    """
+
+    __slots__ = ("_next", "_previous", "_active", "_size", "_any_seat")
+
+    def __init__(self, number_of_seats: int):
+        self._next: List[int] = [(seat + 1) % number_of_seats for seat in range(number_of_seats)]
+        self._previous: List[int] = [(seat - 1) % number_of_seats for seat in range(number_of_seats)]
+        self._active: List[bool] = [True] * number_of_seats
+        self._size = number_of_seats
+        self._any_seat = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, seat: int) -> bool:
+        return self._active[seat]
+
+    def next(self, seat: int) -> int:
+        """The first seat after this one that is still in the game"""
+        seat = self._next[seat]
+        # A removed seat keeps pointing at its old neighbour, which may have been removed since
+        while not self._active[seat]:
+            seat = self._next[seat]
+        return seat
+
+    def remove(self, seat: int) -> None:
+        if not self._active[seat]:
+            return
+
+        previous_seat, next_seat = self._previous[seat], self._next[seat]
+        self._next[previous_seat] = next_seat
+        self._previous[next_seat] = previous_seat
+        self._active[seat] = False
+        self._size -= 1
+        if self._any_seat == seat:
+            self._any_seat = next_seat
+
+    def first(self) -> int:
+        """Any seat that is still in the game, e.g. the last one standing"""
+        return self._any_seat
+
+    def __iter__(self) -> Iterator[int]:
+        """Every seat still in the game, in turn order"""
+        seat = self._any_seat
+        for _ in range(self._size):
+            yield seat
+            seat = self._next[seat]
+
+    def seats_after(self, seat: int) -> Iterator[int]:
+        """Every other seat still in the game, in turn order starting after this one"""
+        number_of_other_seats = self._size - 1 if self._active[seat] else self._size
+        other_seat = seat
+        for _ in range(number_of_other_seats):
+            other_seat = self.next(other_seat)
+            yield other_seat
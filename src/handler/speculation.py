@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from pydantic import BaseModel
+
+from src.models.players.llm_player.scheduler import Priority, lowered_priority
+
+# Returned by `take` when there is no usable speculation for the decision
+MISS = object()
+
+
+class SpeculationStats(BaseModel):
+    issued: int = 0
+    hits: int = 0
+    wasted: int = 0
+    # Speculations discarded before they ever reached the model
+    cancelled: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.issued if self.issued else 0.0
+
+
+class SpeculativeDecisionEngine:
+    """Runs likely upcoming decisions in the background, while the table waits on something else.
+
+    A speculation is stored under a key built from every piece of game state the decision
+    depends on. When the real decision comes, the result is only used if the key matches.
+    """
+
+    def __init__(self, max_in_flight: int = 4):
+        self._max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Future] = {}
+        self._stats = SpeculationStats()
+
+    @property
+    def stats(self) -> SpeculationStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+    def _run_in_background(self, decision: Callable[[], Any]) -> Any:
+        with lowered_priority(Priority.speculation):
+            return decision()
+
+    def speculate(self, key: Hashable, decision: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self._max_in_flight:
+                return
+            self._pending[key] = self._executor.submit(
+                contextvars.copy_context().run, self._run_in_background, decision
+            )
+            self._stats.issued += 1
+
+    def take(self, key: Hashable) -> Any:
+        """Returns the speculated decision for this exact state, or MISS"""
+        with self._lock:
+            future = self._pending.pop(key, None)
+        if future is None:
+            return MISS
+
+        try:
+            # Already under way, so waiting for it is never slower than starting over
+            result = future.result()
+        except Exception:
+            return self._record_miss()
+        return self._record_hit(result)
+
+    async def atake(self, key: Hashable) -> Any:
+        """Like `take`, but waits for a speculation that is still running without blocking the event loop"""
+        with self._lock:
+            future = self._pending.pop(key, None)
+        if future is None:
+            return MISS
+
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception:
+            return self._record_miss()
+        return self._record_hit(result)
+
+    def _record_hit(self, result: Any) -> Any:
+        with self._lock:
+            self._stats.hits += 1
+        return result
+
+    def _record_miss(self) -> Any:
+        with self._lock:
+            self._stats.wasted += 1
+        return MISS
+
+    def discard_stale(self) -> None:
+        """Drop every speculation that was not used. Ones that have not started are never sent"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if future.cancel():
+                    self._stats.cancelled += 1
+                self._stats.wasted += 1
+
+    def shutdown(self) -> None:
+        self.discard_stale()
+        self._executor.shutdown(wait=False)
+
+
+def decision_key(kind: str, player, table_state: Tuple, *details: Hashable) -> Tuple:
+    """Key of a decision: the deciding player's hand and coins, the table and the decision itself"""
+    hand = tuple(sorted(card.card_type.value for card in player.cards))
+    return kind, player.name, hand, player.coins, table_state, *details
@@ -0,0 +1,121 @@
+from typing import Any, Hashable, List, Optional, TypeVar
+
+from src.handler.speculation import MISS, SpeculativeDecisionEngine
+from src.models.action import Action, CounterAction
+from src.models.game_history import GameHistory
+from src.models.players.base import BasePlayer
+from src.utils.print import SpeechPrinter
+from src.utils.steps import Steps
+
+T = TypeVar("T")
+
+
+class PlayerDecision:
+    """A decision the turn waits on, made with the player's blocking method or its async variant"""
+
+    __slots__ = ("player", "method", "args")
+
+    def __init__(self, player: BasePlayer, method: str, *args: Any):
+        self.player = player
+        self.method = method
+        self.args = args
+
+    def run(self) -> Any:
+        return getattr(self.player, self.method)(*self.args)
+
+    async def arun(self) -> Any:
+        return await getattr(self.player, f"a{self.method}")(*self.args)
+
+
+class SpeculatedDecision:
+    """A decision that may already have been made in the background for this exact state"""
+
+    __slots__ = ("speculation", "key", "decision")
+
+    def __init__(self, speculation: SpeculativeDecisionEngine, key: Hashable, decision: PlayerDecision):
+        self.speculation = speculation
+        self.key = key
+        self.decision = decision
+
+    def run(self) -> Any:
+        result = self.speculation.take(self.key)
+        return self.decision.run() if result is MISS else result
+
+    async def arun(self) -> Any:
+        result = await self.speculation.atake(self.key)
+        return await self.decision.arun() if result is MISS else result
+
+
+class Narration:
+    """What a player says at the table, generated by the LLM.
+
+    Streamed narration is printed while it is generated, and only returned once it is complete.
+    """
+
+    __slots__ = ("player", "action", "target_player", "game_history", "stream")
+
+    def __init__(
+            self,
+            player: BasePlayer,
+            action: Action | CounterAction | str,
+            target_player: Optional[BasePlayer],
+            game_history: GameHistory,
+            stream: bool = False,
+    ):
+        self.player = player
+        self.action = action
+        self.target_player = target_player
+        self.game_history = game_history
+        self.stream = stream
+
+    def run(self) -> str:
+        # The LLM stack (langchain, langgraph) is only imported once narration is actually used
+        from src.models.players.llm_player.llm_player import generate_message
+
+        if not self.stream:
+            return generate_message(self.player, self.action, self.target_player, self.game_history)
+
+        speech = SpeechPrinter(str(self.player))
+        message = generate_message(self.player, self.action, self.target_player, self.game_history, speech.update)
+        speech.finish(message)
+        return message
+
+    async def arun(self) -> str:
+        from src.models.players.llm_player.llm_player import agenerate_message
+
+        if not self.stream:
+            return await agenerate_message(self.player, self.action, self.target_player, self.game_history)
+
+        speech = SpeechPrinter(str(self.player))
+        message = await agenerate_message(
+            self.player, self.action, self.target_player, self.game_history, speech.update
+        )
+        speech.finish(message)
+        return message
+
+
+class TurnNarration:
+    """Everything players say in a turn, generated by the LLM in one call once the turn is played"""
+
+    __slots__ = ("narrations", "game_history")
+
+    def __init__(self, narrations: List[Narration], game_history: GameHistory):
+        self.narrations = narrations
+        self.game_history = game_history
+
+    def _moments(self) -> list:
+        return [(narration.player, narration.action, narration.target_player) for narration in self.narrations]
+
+    def run(self) -> List[tuple]:
+        from src.models.players.llm_player.llm_player import generate_turn_messages
+
+        return generate_turn_messages(self._moments(), self.game_history)
+
+    async def arun(self) -> List[tuple]:
+        from src.models.players.llm_player.llm_player import agenerate_turn_messages
+
+        return await agenerate_turn_messages(self._moments(), self.game_history)
+
+
+# A turn yields these steps, see `src.utils.steps`
+TurnSteps = Steps[T]
@@ -0,0 +1,231 @@
+from itertools import combinations_with_replacement
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.models.card import Card, CardType
+from src.models.deck import BASE_COPIES_PER_TYPE, CARD_TYPE_INDEX, CARD_TYPES
+
+# Every hand a player can hold, as sorted tuples of card type indices: 5 single cards and 15 pairs
+HAND_SHAPES: Tuple[Tuple[int, ...], ...] = tuple(
+    (ind,) for ind in range(len(CARD_TYPES))
+) + tuple(combinations_with_replacement(range(len(CARD_TYPES)), 2))
+HAND_SHAPE_INDEX: Dict[Tuple[int, ...], int] = {hand: ind for ind, hand in enumerate(HAND_SHAPES)}
+SINGLE_HANDS = range(len(CARD_TYPES))
+PAIR_HANDS = range(len(CARD_TYPES), len(HAND_SHAPES))
+
+# How likely a claim is when the player does not hold the card, relative to when they do
+DEFAULT_BLUFF_LIKELIHOOD = 0.35
+
+
+class _PlayerBelief:
+    __slots__ = ("probabilities", "number_of_cards", "claims", "discards")
+
+    def __init__(self, probabilities: List[float], number_of_cards: int):
+        self.probabilities = probabilities
+        self.number_of_cards = number_of_cards
+        self.claims = [0] * len(CARD_TYPES)
+        self.discards: List[CardType] = []
+
+
+class BeliefTracker:
+    """Tracks a probability distribution over the hidden hand of every player.
+
+    The distribution only uses public information (claims, challenges, revealed and
+    discarded cards, exchanges). A player's own hand is taken into account at query time,
+    by passing them as the observer. Every update touches a fixed number of hand shapes,
+    so it costs the same no matter how long the game has been running.
+    """
+
+    def __init__(self, bluff_likelihood: float = DEFAULT_BLUFF_LIKELIHOOD):
+        self._bluff_likelihood = bluff_likelihood
+        self._unseen_counts: List[int] = [0] * len(CARD_TYPES)
+        self._beliefs: Dict[str, _PlayerBelief] = {}
+
+    def reset(self, player_names: Iterable[str], copies_per_type: int = BASE_COPIES_PER_TYPE) -> None:
+        """Start a new game where every player holds 2 unknown cards"""
+        self._unseen_counts = [copies_per_type] * len(CARD_TYPES)
+        prior = self._prior(self._unseen_counts, 2)
+        self._beliefs = {name: _PlayerBelief(prior.copy(), 2) for name in player_names}
+
+    @staticmethod
+    def _prior(unseen_counts: List[int], number_of_cards: int) -> List[float]:
+        """Probability of every hand shape when dealing from the unseen cards"""
+        probabilities = [0.0] * len(HAND_SHAPES)
+        total = sum(unseen_counts)
+        if number_of_cards == 1 and total:
+            for ind in SINGLE_HANDS:
+                probabilities[ind] = unseen_counts[ind] / total
+        elif number_of_cards == 2 and total > 1:
+            pairs = total * (total - 1)
+            for hand_ind in PAIR_HANDS:
+                first, second = HAND_SHAPES[hand_ind]
+                if first == second:
+                    probabilities[hand_ind] = unseen_counts[first] * (unseen_counts[first] - 1) / pairs
+                else:
+                    probabilities[hand_ind] = 2 * unseen_counts[first] * unseen_counts[second] / pairs
+        return probabilities
+
+    def _set_normalized(self, belief: _PlayerBelief, probabilities: List[float]) -> None:
+        total = sum(probabilities)
+        if total <= 0:
+            # The evidence contradicts itself (e.g. lucky draws), fall back to the prior
+            belief.probabilities = self._prior(self._unseen_counts, belief.number_of_cards)
+            return
+        belief.probabilities = [probability / total for probability in probabilities]
+
+    def on_claim(self, player_name: str, card_type: CardType) -> None:
+        """A player claimed influence over a card, through an action or a counter"""
+        belief = self._beliefs[player_name]
+        card_ind = CARD_TYPE_INDEX[card_type]
+        belief.claims[card_ind] += 1
+        self._set_normalized(
+            belief,
+            [
+                probability if card_ind in HAND_SHAPES[hand_ind] else probability * self._bluff_likelihood
+                for hand_ind, probability in enumerate(belief.probabilities)
+            ],
+        )
+
+    def on_challenge_succeeded(self, player_name: str, card_type: CardType) -> None:
+        """A player was caught bluffing, so they do not hold the claimed card"""
+        belief = self._beliefs[player_name]
+        card_ind = CARD_TYPE_INDEX[card_type]
+        self._set_normalized(
+            belief,
+            [
+                0.0 if card_ind in HAND_SHAPES[hand_ind] else probability
+                for hand_ind, probability in enumerate(belief.probabilities)
+            ],
+        )
+
+    def on_card_replaced(self, player_name: str, card_type: CardType) -> None:
+        """A player revealed a card to win a challenge and drew a replacement from the deck"""
+        belief = self._beliefs[player_name]
+        card_ind = CARD_TYPE_INDEX[card_type]
+        replacement = self._prior(self._unseen_counts, 1)
+
+        if belief.number_of_cards == 1:
+            belief.probabilities = replacement
+            return
+
+        # The card kept in hand follows the old belief, the new card is a fresh draw
+        probabilities = [0.0] * len(HAND_SHAPES)
+        for hand_ind in PAIR_HANDS:
+            hand = HAND_SHAPES[hand_ind]
+            if card_ind not in hand or not belief.probabilities[hand_ind]:
+                continue
+            kept = hand[1] if hand[0] == card_ind else hand[0]
+            for drawn in SINGLE_HANDS:
+                new_hand = HAND_SHAPE_INDEX[tuple(sorted((kept, drawn)))]
+                probabilities[new_hand] += belief.probabilities[hand_ind] * replacement[drawn]
+        self._set_normalized(belief, probabilities)
+
+    def on_discard(self, player_name: str, card_type: CardType) -> None:
+        """A player lost influence and revealed the discarded card to everyone"""
+        belief = self._beliefs[player_name]
+        card_ind = CARD_TYPE_INDEX[card_type]
+        belief.discards.append(card_type)
+        self._unseen_counts[card_ind] = max(self._unseen_counts[card_ind] - 1, 0)
+
+        belief.number_of_cards -= 1
+        if belief.number_of_cards <= 0:
+            belief.number_of_cards = 0
+            belief.probabilities = [0.0] * len(HAND_SHAPES)
+            return
+
+        probabilities = [0.0] * len(HAND_SHAPES)
+        for hand_ind in PAIR_HANDS:
+            hand = HAND_SHAPES[hand_ind]
+            if card_ind in hand:
+                kept = hand[1] if hand[0] == card_ind else hand[0]
+                probabilities[kept] += belief.probabilities[hand_ind]
+        self._set_normalized(belief, probabilities)
+
+    def on_exchange(self, player_name: str) -> None:
+        """A player shuffled their hand with the deck, so nothing is known about it anymore"""
+        belief = self._beliefs[player_name]
+        belief.probabilities = self._prior(self._unseen_counts, belief.number_of_cards)
+
+    def hand_distribution(
+        self, player_name: str, observer_cards: Optional[List[Card]] = None
+    ) -> Dict[Tuple[CardType, ...], float]:
+        """Probability of every possible hand of a player, optionally as seen by an observer"""
+        belief = self._beliefs[player_name]
+        probabilities = belief.probabilities
+        if observer_cards and belief.number_of_cards:
+            probabilities = self._condition_on_observer(belief, observer_cards)
+
+        return {
+            tuple(CARD_TYPES[ind] for ind in HAND_SHAPES[hand_ind]): probability
+            for hand_ind, probability in enumerate(probabilities)
+            if probability > 0
+        }
+
+    def _condition_on_observer(self, belief: _PlayerBelief, observer_cards: List[Card]) -> List[float]:
+        # Reweight with the observer's own cards taken out of the unseen pool
+        observer_unseen = self._unseen_counts.copy()
+        for card in observer_cards:
+            card_ind = CARD_TYPE_INDEX[card.card_type]
+            observer_unseen[card_ind] = max(observer_unseen[card_ind] - 1, 0)
+
+        public_prior = self._prior(self._unseen_counts, belief.number_of_cards)
+        observer_prior = self._prior(observer_unseen, belief.number_of_cards)
+        probabilities = [
+            probability * observer_prior[hand_ind] / public_prior[hand_ind] if public_prior[hand_ind] else 0.0
+            for hand_ind, probability in enumerate(belief.probabilities)
+        ]
+        total = sum(probabilities)
+        if total <= 0:
+            return belief.probabilities
+        return [probability / total for probability in probabilities]
+
+    def card_probabilities(
+        self, player_name: str, observer_cards: Optional[List[Card]] = None
+    ) -> Dict[CardType, float]:
+        """Probability that a player holds at least one card of every type"""
+        card_probabilities = {card_type: 0.0 for card_type in CARD_TYPES}
+        for hand, probability in self.hand_distribution(player_name, observer_cards).items():
+            for card_type in set(hand):
+                card_probabilities[card_type] += probability
+        return card_probabilities
+
+    def discard_counts(self) -> Dict[CardType, int]:
+        """Cards of every type that have been discarded face up, by all players"""
+        counts = {card_type: 0 for card_type in CARD_TYPES}
+        for belief in self._beliefs.values():
+            for card_type in belief.discards:
+                counts[card_type] += 1
+        return counts
+
+    def claim_counts(self, player_name: str) -> Dict[CardType, int]:
+        belief = self._beliefs[player_name]
+        return {card_type: belief.claims[ind] for ind, card_type in enumerate(CARD_TYPES)}
+
+    def summarize(self, observer_name: str, observer_cards: Optional[List[Card]] = None) -> str:
+        """Returns a compact, prompt-friendly summary of what is known about the other players"""
+        lines = ["What is known about the other players' hidden cards:"]
+        for player_name, belief in self._beliefs.items():
+            if player_name == observer_name:
+                continue
+            if not belief.number_of_cards:
+                lines.append(f"  {player_name}: defeated")
+                continue
+
+            card_probabilities = self.card_probabilities(player_name, observer_cards)
+            likely_cards = ", ".join(
+                f"{card_type.value} {probability:.0%}"
+                for card_type, probability in sorted(
+                    card_probabilities.items(), key=lambda item: item[1], reverse=True
+                )
+            )
+            line = f"  {player_name} ({belief.number_of_cards} cards): {likely_cards}"
+
+            claims = ", ".join(
+                f"{CARD_TYPES[ind].value} x{count}" for ind, count in enumerate(belief.claims) if count
+            )
+            if claims:
+                line += f"; claimed {claims}"
+            if belief.discards:
+                line += f"; discarded {', '.join(card_type.value for card_type in belief.discards)}"
+            lines.append(line)
+
+        return "\n".join(lines)
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Dict, List
+from typing import Dict
 
 from pydantic import BaseModel
 
@@ -42,28 +42,9 @@ class Card(BaseModel):
         return f"{self.card_type.value}"
 
 
-def build_deck() -> List[Card]:
-    def _create_card(card_type: CardType):
-        return Card(
-            foreground_color=CARD_FOREGROUND_COLOR_MAP.get(card_type),
-            background_color=CARD_BACKGROUND_COLOR_MAP.get(card_type),
-            card_type=card_type,
-        )
-
-    return [
-        _create_card(CardType.contessa),
-        _create_card(CardType.contessa),
-        _create_card(CardType.contessa),
-        _create_card(CardType.duke),
-        _create_card(CardType.duke),
-        _create_card(CardType.duke),
-        _create_card(CardType.assassin),
-        _create_card(CardType.assassin),
-        _create_card(CardType.assassin),
-        _create_card(CardType.ambassador),
-        _create_card(CardType.ambassador),
-        _create_card(CardType.ambassador),
-        _create_card(CardType.captain),
-        _create_card(CardType.captain),
-        _create_card(CardType.captain),
-    ]
+def create_card(card_type: CardType) -> Card:
+    return Card(
+        foreground_color=CARD_FOREGROUND_COLOR_MAP.get(card_type),
+        background_color=CARD_BACKGROUND_COLOR_MAP.get(card_type),
+        card_type=card_type,
+    )
@@ -0,0 +1,99 @@
+import math
+import random
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.models.card import Card, CardType, create_card
+
+CARD_TYPES: Tuple[CardType, ...] = tuple(CardType)
+CARD_TYPE_INDEX: Dict[CardType, int] = {card_type: ind for ind, card_type in enumerate(CARD_TYPES)}
+
+# The base game has 3 copies of every card, enough for up to 6 players
+BASE_COPIES_PER_TYPE = 3
+
+# Cards that must stay in the deck after dealing, so an exchange can always draw 2
+MIN_CARDS_LEFT_AFTER_DEALING = 3
+
+
+def copies_per_type_for(number_of_players: int) -> int:
+    """How many copies of every card a table of this size needs, e.g. 5 for 9 or 10 players"""
+    cards_needed = 2 * number_of_players + MIN_CARDS_LEFT_AFTER_DEALING
+    return max(BASE_COPIES_PER_TYPE, math.ceil(cards_needed / len(CARD_TYPES)))
+
+
+# Cards carry no per-copy state, so every draw of a given type can hand out the same instance
+_CARD_BY_TYPE: Dict[CardType, Card] = {card_type: create_card(card_type) for card_type in CARD_TYPES}
+
+
+class Deck:
+    """The court deck, stored as a count per card type instead of an ordered list of cards.
+
+    Drawing picks a uniformly random card from the remaining ones, which gives the same
+    probabilities as drawing from the top of a freshly shuffled deck, without ever shuffling.
+    """
+
+    __slots__ = ("_counts", "_size")
+
+    def __init__(self, counts: Optional[Sequence[int]] = None):
+        if counts is None:
+            counts = [0] * len(CARD_TYPES)
+        if len(counts) != len(CARD_TYPES):
+            raise ValueError(f"Expected {len(CARD_TYPES)} card counts, got {len(counts)}")
+        if any(count < 0 for count in counts):
+            raise ValueError("Card counts can't be negative")
+
+        self._counts = list(counts)
+        self._size = sum(self._counts)
+
+    @classmethod
+    def full(cls, copies_per_type: int = BASE_COPIES_PER_TYPE) -> "Deck":
+        """Build a complete deck with the given number of copies of every card type"""
+        return cls([copies_per_type] * len(CARD_TYPES))
+
+    @classmethod
+    def from_counts(cls, counts: Sequence[int]) -> "Deck":
+        return cls(counts)
+
+    def to_counts(self) -> Tuple[int, ...]:
+        """Serialize the deck as one count per card type, in `CardType` order"""
+        return tuple(self._counts)
+
+    def copy(self) -> "Deck":
+        deck = Deck.__new__(Deck)
+        deck._counts = self._counts.copy()
+        deck._size = self._size
+        return deck
+
+    def count(self, card_type: CardType) -> int:
+        return self._counts[CARD_TYPE_INDEX[card_type]]
+
+    def draw(self) -> Card:
+        """Remove and return a uniformly random card from the deck"""
+        if not self._size:
+            raise IndexError("draw from an empty deck")
+
+        position = random.randrange(self._size)
+        for ind, count in enumerate(self._counts):
+            if position < count:
+                self._counts[ind] -= 1
+                self._size -= 1
+                return _CARD_BY_TYPE[CARD_TYPES[ind]]
+            position -= count
+
+        raise AssertionError("Deck counts are out of sync with the deck size")
+
+    def put_back(self, card: Card) -> None:
+        """Return a card to the deck. No shuffle is needed, draws are always uniformly random"""
+        self._counts[CARD_TYPE_INDEX[card.card_type]] += 1
+        self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Deck) and self._counts == other._counts
+
+    def __repr__(self) -> str:
+        counts = ", ".join(
+            f"{card_type.value}={count}" for card_type, count in zip(CARD_TYPES, self._counts)
+        )
+        return f"Deck({counts})"
@@ -1,5 +1,14 @@
-from typing import List, Optional
-from pydantic import BaseModel
+import tempfile
+import threading
+from bisect import bisect_right
+from typing import IO, Iterator, List, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+# Turns kept in memory, older ones are spilled to disk
+MAX_IN_MEMORY_TURNS = 32
+
+READ_CHUNK_SIZE = 64 * 1024
 
 
 class PlayerState(BaseModel):
@@ -21,5 +30,102 @@ class HistoryRecord(BaseModel):
     final_state: Optional[FinalState] = None  # Made Optional
 
 
+class HistorySpill:
+    """Append-only store of finished turns, one JSON line each, in an anonymous temporary file.
+
+    The game appends turns while speculative decisions read them from other threads, so the file
+    position is only moved under a lock. Where every record starts is kept, so a range of records
+    is read without going through the ones before it.
+    """
+
+    def __init__(self):
+        # Unbuffered, so reads and writes can't see each other's stale buffers
+        self._file: IO[bytes] = tempfile.TemporaryFile(mode="w+b", buffering=0)
+        self._lock = threading.Lock()
+        # Where every record starts, and where the next one will
+        self._offsets: List[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, record: HistoryRecord) -> None:
+        line = record.model_dump_json(exclude_none=True).encode() + b"\n"
+        with self._lock:
+            self._file.seek(self._offsets[-1])
+            self._file.write(line)
+            self._offsets.append(self._offsets[-1] + len(line))
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[HistoryRecord]:
+        """Records `start` up to `stop`, read in chunks of whole records"""
+        index = start
+        while index < (len(self) if stop is None else stop):
+            with self._lock:
+                end = len(self) if stop is None else stop
+                # As many records as fit in a chunk, and at least one
+                chunk_end = bisect_right(self._offsets, self._offsets[index] + READ_CHUNK_SIZE, index + 1, end + 1) - 1
+                chunk_end = max(chunk_end, index + 1)
+                self._file.seek(self._offsets[index])
+                chunk = self._file.read(self._offsets[chunk_end] - self._offsets[index])
+            for line in chunk.splitlines():
+                yield HistoryRecord.model_validate_json(line)
+            index = chunk_end
+
+    def close(self) -> None:
+        self._file.close()
+
+
 class GameHistory(BaseModel):
-    history: List[HistoryRecord]
\ No newline at end of file
+    """The turns of a game. Only the latest turns are kept in `history`, older ones are spilled to disk.
+
+    Memory stays flat however long the game runs. Use `records()` to go through the full history.
+    """
+
+    history: List[HistoryRecord]
+    max_in_memory_turns: int = MAX_IN_MEMORY_TURNS
+
+    _spill: Optional[HistorySpill] = PrivateAttr(default=None)
+    _spilled_turns: int = PrivateAttr(default=0)
+
+    def __len__(self) -> int:
+        return self._spilled_turns + len(self.history)
+
+    def append(self, record: HistoryRecord) -> None:
+        """Add a turn. The latest turn is still being played, so it always stays in memory"""
+        self.history.append(record)
+        while len(self.history) > max(self.max_in_memory_turns, 1):
+            if self._spill is None:
+                self._spill = HistorySpill()
+            self._spill.append(self.history.pop(0))
+            self._spilled_turns += 1
+
+    def records(self) -> Iterator[HistoryRecord]:
+        """Every turn from the start of the game, spilled turns are loaded lazily"""
+        in_memory = list(self.history)
+        if self._spill is not None:
+            yield from self._spill.records(0, self._spilled_turns)
+        yield from in_memory
+
+    def recent(self, number_of_turns: int) -> List[HistoryRecord]:
+        """The latest turns, read back from disk only when more are asked for than are kept in memory"""
+        in_memory = list(self.history)
+        if number_of_turns <= len(in_memory):
+            return in_memory[len(in_memory) - number_of_turns:]
+        if self._spill is None:
+            return in_memory
+        spilled_turns = self._spilled_turns
+        start = max(spilled_turns - (number_of_turns - len(in_memory)), 0)
+        return [*self._spill.records(start, spilled_turns), *in_memory]
+
+    def with_latest(self, record: HistoryRecord) -> "GameHistory":
+        """The same history with another version of the latest turn. Spilled turns are shared, not copied"""
+        history = GameHistory(history=[*self.history[:-1], record], max_in_memory_turns=self.max_in_memory_turns)
+        history._spill = self._spill
+        history._spilled_turns = self._spilled_turns
+        return history
+
+    def close(self) -> None:
+        """Drop the spilled turns"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            self._spilled_turns = 0
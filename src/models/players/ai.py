@@ -8,9 +8,59 @@ from src.models.players.base import BasePlayer
 from src.utils.print import print_text, print_texts
 
 
+def choose_random_action(
+    player: BasePlayer, other_players: List[BasePlayer]
+) -> Tuple[Action, Optional[BasePlayer]]:
+    """Pick any available action (might be a bluff), with a valid target if it needs one"""
+
+    available_actions = player.available_actions()
+
+    # Coup is only option
+    if len(available_actions) == 1:
+        target_player = random.choice(other_players)
+        return available_actions[0], target_player
+
+    # Pick any other random choice (might be a bluff), among the valid action/player combinations.
+    # Weighted as if the action and then its target were picked at random
+    choices = []
+    weights = []
+    for target_action in available_actions:
+        if not target_action.requires_target:
+            choices.append((target_action, None))
+            weights.append(len(other_players))
+            continue
+        for target_player in other_players:
+            if player._validate_action(target_action, target_player):
+                choices.append((target_action, target_player))
+                weights.append(1)
+
+    return random.choices(choices, weights=weights)[0]
+
+
+def determine_random_challenge() -> bool:
+    # 20% chance of challenging
+    return random.randint(0, 4) == 0
+
+
+def determine_random_counter() -> bool:
+    # 10% chance of countering
+    return random.randint(0, 9) == 0
+
+
+def choose_random_card(cards: List[Card]) -> Card:
+    return random.choice(cards)
+
+
+def choose_random_exchange_cards(cards: List[Card]) -> Tuple[Card, Card]:
+    first_card, second_card = random.sample(cards, 2)
+    return first_card, second_card
+
+
 class AIPlayer(BasePlayer):
     is_ai: bool = True
     cards: List[Card] = []
+    # Pause before every action, so humans can follow along. Set to 0 for simulations
+    think_time: float = 1.0
 
     def __init__(self, name: str, game_handler: 'ResistanceCoupGameHandler', **data):
         super().__init__(name=name, is_ai=True, **data)
@@ -19,50 +69,28 @@ class AIPlayer(BasePlayer):
     def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
         """Choose the next action to perform"""
 
-        available_actions = self.available_actions()
-
         message = f"[bold magenta]{self}[/] is thinking..."
         print_text(message, with_markup=True)
         self._game_handler.log_message(message)
-        time.sleep(1)
-
-        # Coup is only option
-        if len(available_actions) == 1:
-            player = random.choice(other_players)
-            return available_actions[0], player
-
-        # Pick any other random choice (might be a bluff)
-        target_action = random.choice(available_actions)
-        target_player = None
-
-        if target_action.requires_target:
-            target_player = random.choice(other_players)
-
-        # Make sure we have a valid action/player combination
-        while not self._validate_action(target_action, target_player):
-            target_action = random.choice(available_actions)
-            if target_action.requires_target:
-                target_player = random.choice(other_players)
+        time.sleep(self.think_time)
 
-        return target_action, target_player
+        return choose_random_action(self, other_players)
 
     def determine_challenge(self, player: BasePlayer) -> bool:
         """Choose whether to challenge the current player"""
 
-        # 20% chance of challenging
-        return random.randint(0, 4) == 0
+        return determine_random_challenge()
 
     def determine_counter(self, player: BasePlayer) -> bool:
         """Choose whether to counter the current player's action"""
 
-        # 10% chance of countering
-        return random.randint(0, 9) == 0
+        return determine_random_counter()
 
     def remove_card(self) -> None:
         """Choose a card and remove it from your hand"""
 
         # Remove a random card
-        discarded_card = self.cards.pop(random.randrange(len(self.cards)))
+        discarded_card = self.cards.pop(self.cards.index(choose_random_card(self.cards)))
         message = f"{self} discards their {discarded_card} card"
         print_texts(f"{self} discards their ", (f"{discarded_card}", discarded_card.style), " card")
         self._game_handler.log_message(message)
@@ -71,9 +99,11 @@ class AIPlayer(BasePlayer):
         """Perform the exchange action. Pick which 2 cards to send back to the deck"""
 
         self.cards += exchange_cards
-        random.shuffle(self.cards)
+        first_card, second_card = choose_random_exchange_cards(self.cards)
+        self.cards.remove(first_card)
+        self.cards.remove(second_card)
         message = f"{self} exchanges 2 cards"
         print_text(message)
         self._game_handler.log_message(message)
 
-        return self.cards.pop(), self.cards.pop()
\ No newline at end of file
+        return first_card, second_card
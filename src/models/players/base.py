@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Optional, Tuple
 
@@ -89,3 +90,23 @@ class BasePlayer(BaseModel, ABC):
     def choose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
         """Perform the exchange action. Pick which 2 cards to send back to the deck"""
         pass
+
+    # Async variants of the decisions. Players that only implement the blocking methods are run
+    # in a worker thread, players that wait on I/O (like the LLM player) override these natively
+
+    async def achoose_action(
+        self, other_players: List["BasePlayer"]
+    ) -> Tuple[Action, Optional["BasePlayer"]]:
+        return await asyncio.to_thread(self.choose_action, other_players)
+
+    async def adetermine_challenge(self, player: "BasePlayer") -> bool:
+        return await asyncio.to_thread(self.determine_challenge, player)
+
+    async def adetermine_counter(self, player: "BasePlayer") -> bool:
+        return await asyncio.to_thread(self.determine_counter, player)
+
+    async def aremove_card(self) -> None:
+        await asyncio.to_thread(self.remove_card)
+
+    async def achoose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
+        return await asyncio.to_thread(self.choose_exchange_cards, exchange_cards)
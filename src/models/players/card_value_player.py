@@ -0,0 +1,39 @@
+import random
+from typing import Tuple
+
+from src.models.card import Card
+from src.models.deck import CARD_TYPE_INDEX
+from src.models.players.ai import AIPlayer
+from src.policies.endgame import CARD_VALUE, card_to_lose
+from src.utils.print import print_text, print_texts
+
+
+class CardValuePlayer(AIPlayer):
+    """Plays like `AIPlayer`, but keeps its most valuable cards, with the same rule the endgame
+    policies are trained with (see `src.policies.endgame`).
+    """
+
+    def remove_card(self) -> None:
+        """Choose a card and remove it from your hand"""
+
+        # Give up the least valuable card
+        card_ind = card_to_lose(tuple(CARD_TYPE_INDEX[card.card_type] for card in self.cards))
+        discarded_card = next(card for card in self.cards if CARD_TYPE_INDEX[card.card_type] == card_ind)
+        self.cards.remove(discarded_card)
+        message = f"{self} discards their {discarded_card} card"
+        print_texts(f"{self} discards their ", (f"{discarded_card}", discarded_card.style), " card")
+        self._game_handler.log_message(message)
+
+    def choose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
+        """Perform the exchange action. Pick which 2 cards to send back to the deck"""
+
+        self.cards += exchange_cards
+        # Keep the most valuable cards, ties broken at random
+        random.shuffle(self.cards)
+        self.cards.sort(key=lambda card: CARD_VALUE[CARD_TYPE_INDEX[card.card_type]])
+        first_card, second_card = self.cards.pop(0), self.cards.pop(0)
+        message = f"{self} exchanges 2 cards"
+        print_text(message)
+        self._game_handler.log_message(message)
+
+        return first_card, second_card
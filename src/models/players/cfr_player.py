@@ -0,0 +1,99 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.models.action import Action, CounterAction
+from src.models.deck import CARD_TYPE_INDEX
+from src.models.players.base import BasePlayer
+from src.models.players.card_value_player import CardValuePlayer
+from src.policies.cfr import DEFAULT_POLICY_PATH, EndgamePolicy
+from src.policies.endgame import (
+    ACT,
+    ACTION_INDEX,
+    ACTIONS,
+    CHALLENGE_ACTION,
+    CHALLENGE_COUNTER,
+    COUNTER,
+    RESPOND,
+    information_set_key,
+    legal_decisions,
+)
+
+
+@lru_cache(maxsize=None)
+def load_endgame_policy(path: str) -> Optional[EndgamePolicy]:
+    """Loaded once per process and shared by every player. None if it has not been trained yet"""
+    if not Path(path).exists():
+        return None
+    return EndgamePolicy.load(path)
+
+
+class CFRPlayer(CardValuePlayer):
+    """Plays heads-up endgames from a policy trained with CFR (see `src.policies.cfr`).
+
+    With more than one opponent left, or without a trained policy, it plays like `CardValuePlayer`.
+    """
+
+    policy_path: str = DEFAULT_POLICY_PATH
+
+    def _heads_up_opponent(self) -> Optional[BasePlayer]:
+        active_players = self._game_handler.get_active_players()
+        if len(active_players) != 2:
+            return None
+        return active_players[0] if active_players[1] is self else active_players[1]
+
+    def _claims(self, player: BasePlayer) -> int:
+        claim_counts = self._game_handler.get_belief_tracker().claim_counts(player.name)
+        return sum(1 << CARD_TYPE_INDEX[card_type] for card_type, count in claim_counts.items() if count)
+
+    def _decide(self, phase: int, action: Action) -> Optional[int]:
+        """Sample a decision from the policy, or None when it does not apply"""
+        policy = load_endgame_policy(self.policy_path)
+        opponent = self._heads_up_opponent()
+        if policy is None or opponent is None or not self.cards or not opponent.cards:
+            return None
+
+        key = information_set_key(
+            phase,
+            ACTION_INDEX[action.action_type],
+            tuple(sorted(CARD_TYPE_INDEX[card.card_type] for card in self.cards)),
+            self.coins,
+            opponent.coins,
+            min(len(opponent.cards), 2),
+            self._claims(opponent),
+        )
+        return policy.sample(key, legal_decisions(phase, self.coins, opponent.coins))
+
+    def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
+        """Choose the next action to perform"""
+
+        decision = self._decide(ACT, ACTIONS[0])
+        if decision is None:
+            return super().choose_action(other_players)
+
+        target_action = ACTIONS[decision].model_copy()
+        return target_action, other_players[0] if target_action.requires_target else None
+
+    def determine_challenge(self, player: BasePlayer) -> bool:
+        """Choose whether to challenge the current player"""
+
+        claim = self._game_handler.get_pending_claim()
+        current_action = self._game_handler.get_current_action()
+        if isinstance(claim, CounterAction):
+            decision = self._decide(CHALLENGE_COUNTER, current_action)
+        elif claim is not None:
+            decision = self._decide(CHALLENGE_ACTION, claim)
+        else:
+            decision = None
+
+        if decision is None:
+            return super().determine_challenge(player)
+        return decision == RESPOND
+
+    def determine_counter(self, player: BasePlayer) -> bool:
+        """Choose whether to counter the current player's action"""
+
+        decision = self._decide(COUNTER, self._game_handler.get_current_action())
+        if decision is None:
+            return super().determine_counter(player)
+        return decision == RESPOND
@@ -1,27 +1,101 @@
-from typing import List, Optional, Tuple
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple, TypeVar
 
 from src.models.action import Action
 from src.models.card import Card
 from src.models.players.base import BasePlayer
 from src.utils.print import (
+    aprint_confirm,
+    aprint_prompt,
     print_confirm,
     print_prompt,
     print_text,
     print_texts,
     print_tree,
 )
+from src.utils.steps import Steps, arun_steps, run_steps
+
+T = TypeVar("T")
+
+# When the decision being made has to be made by, in `time.monotonic()` seconds
+_decision_deadline: ContextVar[Optional[float]] = ContextVar("decision_deadline", default=None)
+
+
+def get_decision_deadline() -> Optional[float]:
+    return _decision_deadline.get()
+
+
+class Question:
+    """Ask the human something and wait for their answer"""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+    def run(self) -> str:
+        return print_prompt(self.content)
+
+    async def arun(self) -> str:
+        return await aprint_prompt(self.content, get_decision_deadline())
+
+
+class Confirmation:
+    """Ask the human a yes or no question"""
+
+    __slots__ = ("content",)
+
+    def __init__(self, content: str):
+        self.content = content
+
+    def run(self) -> bool:
+        return print_confirm(self.content)
+
+    async def arun(self) -> bool:
+        return await aprint_confirm(self.content, get_decision_deadline())
 
 
 class HumanPlayer(BasePlayer):
+    """A player at the terminal.
+
+    The blocking methods wait for as long as the human takes. The async ones don't hold up the
+    event loop, and with a `decision_timeout` (in seconds) a decision that isn't made in time
+    falls back to a safe default: income, no challenge, no counter.
+    """
+
     is_ai: bool = False
+    decision_timeout: Optional[float] = None
 
     def __init__(self, name: str, game_handler: 'ResistanceCoupGameHandler', **data):
         super().__init__(name=name, is_ai=False, **data)
         self._game_handler = game_handler
 
+    async def _adecide(self, steps: Steps[T], default: Callable[[], T]) -> T:
+        if self.decision_timeout is None:
+            return await arun_steps(steps)
+
+        token = _decision_deadline.set(time.monotonic() + self.decision_timeout)
+        try:
+            return await asyncio.wait_for(arun_steps(steps), self.decision_timeout)
+        except asyncio.TimeoutError:
+            print_text(f"Time's up! {self} didn't decide in time", style="bold red")
+            return default()
+        finally:
+            _decision_deadline.reset(token)
+
+    @staticmethod
+    def _ask_number(content: str, count: int) -> Steps[int]:
+        while True:
+            answer = (yield Question(content)).strip()
+            if answer.isdigit() and int(answer) < count:
+                return int(answer)
+            print_text(f"Provide a number between 0 and {count - 1}...")
+
     def _choose_action(
         self, other_players: List[BasePlayer]
-    ) -> Tuple[Action, Optional[BasePlayer]]:
+    ) -> Steps[Tuple[Action, Optional[BasePlayer]]]:
 
         available_actions = self.available_actions()
 
@@ -30,8 +104,10 @@ class HumanPlayer(BasePlayer):
             [f"{ind} - {str(action)}" for ind, action in enumerate(available_actions)],
         )
 
-        target_action_ind = print_prompt("What action do you want to take? (provide the number)")
-        target_action = available_actions[min(int(target_action_ind), len(available_actions) - 1)]
+        target_action_ind = yield from self._ask_number(
+            "What action do you want to take? (provide the number)", len(available_actions)
+        )
+        target_action = available_actions[target_action_ind]
         target_player = None
 
         # Only certain actions can target players
@@ -47,62 +123,69 @@ class HumanPlayer(BasePlayer):
                     ],
                 )
 
-                target_player_ind = print_prompt(
-                    "Which player are you targeting? (provide the number)"
+                target_player_ind = yield from self._ask_number(
+                    "Which player are you targeting? (provide the number)", len(other_players)
                 )
-                target_player = other_players[int(target_player_ind)]
+                target_player = other_players[target_player_ind]
             else:
                 target_player = other_players[0]
 
         return target_action, target_player
 
-    def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
-        """Choose the next action to perform"""
-
-        target_action, target_player = self._choose_action(other_players)
+    def _action_steps(
+        self, other_players: List[BasePlayer]
+    ) -> Steps[Tuple[Action, Optional[BasePlayer]]]:
+        target_action, target_player = yield from self._choose_action(other_players)
 
         # Make sure we have a valid action/player combination
         while not self._validate_action(target_action, target_player):
             print_text("Invalid action for the target player...")
 
-            target_action, target_player = self._choose_action(other_players)
+            target_action, target_player = yield from self._choose_action(other_players)
 
         return target_action, target_player
 
-    def determine_challenge(self, player: BasePlayer) -> bool:
-        """Choose whether to challenge the current player"""
-
-        challenge = print_confirm(f"Do you wish to challenge {str(player)}?")
-        return challenge
+    def _default_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
+        # The first valid action: income, or the coup that is forced at 10 coins
+        available_actions = self.available_actions()
+        for target_action in available_actions:
+            if not target_action.requires_target:
+                return target_action, None
+            for target_player in other_players:
+                if self._validate_action(target_action, target_player):
+                    return target_action, target_player
+        return available_actions[0], other_players[0]
 
-    def determine_counter(self, player: BasePlayer) -> bool:
-        """Choose whether to counter the current player's action"""
+    def _challenge_steps(self, player: BasePlayer) -> Steps[bool]:
+        return (yield Confirmation(f"Do you wish to challenge {str(player)}?"))
 
-        challenge = print_confirm(f"Do you wish to counter {str(player)}?")
-        return challenge
+    def _counter_steps(self, player: BasePlayer) -> Steps[bool]:
+        return (yield Confirmation(f"Do you wish to counter {str(player)}?"))
 
-    def remove_card(self) -> None:
-        """Choose a card and remove it from your hand"""
+    def _end_game_steps(self) -> Steps[bool]:
+        return (yield Confirmation("Do you want to end the game early?"))
 
+    def _discard_steps(self) -> Steps[int]:
         print_text("Unfortunately you have to discard a card...")
 
         # You only have 1 card
         if len(self.cards) == 1:
-            chosen_card_ind = 0
-        else:
-            print_tree(
-                "You have the following cards in your hand:",
-                [
-                    f"{ind} - [{card.foreground_color} on {card.background_color}]{card}"
-                    for ind, card in enumerate(self.cards)
-                ],
-            )
+            return 0
 
-            chosen_card_ind = print_prompt(
-                "Which card do you want to discard? (provide the number)"
-            )
+        print_tree(
+            "You have the following cards in your hand:",
+            [
+                f"{ind} - [{card.foreground_color} on {card.background_color}]{card}"
+                for ind, card in enumerate(self.cards)
+            ],
+        )
+
+        return (yield from self._ask_number(
+            "Which card do you want to discard? (provide the number)", len(self.cards)
+        ))
 
-        discarded_card = self.cards.pop(int(chosen_card_ind))
+    def _discard(self, chosen_card_ind: int) -> None:
+        discarded_card = self.cards.pop(chosen_card_ind)
 
         message = f"{self} discarded their {discarded_card} card"
         print_texts(
@@ -110,35 +193,86 @@ class HumanPlayer(BasePlayer):
         )
         self._game_handler.log_message(message)
 
+    def _exchange_steps(self, exchange_cards: list[Card]) -> Steps[Tuple[int, int]]:
+        """Pick the 2 cards to send back, as positions in the hand followed by the drawn cards"""
+
+        print_text("You drew 2 cards from the deck, but you have to give 2 back...")
+        positions = list(range(len(self.cards) + len(exchange_cards)))
+        hand = self.cards + exchange_cards
+
+        chosen = []
+        for question in (
+            "What is the first card you want to discard? (provide the number)",
+            "What is the second card you want to discard? (provide the number)",
+        ):
+            print_tree(
+                "You have the following cards in your hand:",
+                [
+                    f"{ind} - [{hand[pos].foreground_color} on {hand[pos].background_color}]{hand[pos]}"
+                    for ind, pos in enumerate(positions)
+                ],
+            )
+            chosen.append(positions.pop((yield from self._ask_number(question, len(positions)))))
+
+        return chosen[0], chosen[1]
+
+    def _exchange(self, exchange_cards: list[Card], chosen: Tuple[int, int]) -> Tuple[Card, Card]:
+        hand = self.cards + exchange_cards
+        self.cards = [card for pos, card in enumerate(hand) if pos not in chosen]
+        return hand[chosen[0]], hand[chosen[1]]
+
+    def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
+        """Choose the next action to perform"""
+
+        return run_steps(self._action_steps(other_players))
+
+    def determine_challenge(self, player: BasePlayer) -> bool:
+        """Choose whether to challenge the current player"""
+
+        return run_steps(self._challenge_steps(player))
+
+    def determine_counter(self, player: BasePlayer) -> bool:
+        """Choose whether to counter the current player's action"""
+
+        return run_steps(self._counter_steps(player))
+
+    def determine_end_game(self) -> bool:
+        """Choose whether to end the game early after being defeated"""
+
+        return run_steps(self._end_game_steps())
+
+    def remove_card(self) -> None:
+        """Choose a card and remove it from your hand"""
+
+        self._discard(run_steps(self._discard_steps()))
+
     def choose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
         """Perform the exchange action. Pick which 2 cards to send back to the deck"""
 
-        print_text("You drew 2 cards from the deck, but you have to give 2 back...")
-        self.cards += exchange_cards
+        return self._exchange(exchange_cards, run_steps(self._exchange_steps(exchange_cards)))
 
-        print_tree(
-            "You have the following cards in your hand:",
-            [
-                f"{ind} - [{card.foreground_color} on {card.background_color}]{card}"
-                for ind, card in enumerate(self.cards)
-            ],
+    async def achoose_action(
+        self, other_players: List[BasePlayer]
+    ) -> Tuple[Action, Optional[BasePlayer]]:
+        return await self._adecide(
+            self._action_steps(other_players), lambda: self._default_action(other_players)
         )
 
-        first_card_ind = print_prompt(
-            "What is the first card you want to discard? (provide the number)"
-        )
-        first_card = self.cards.pop(int(first_card_ind))
+    async def adetermine_challenge(self, player: BasePlayer) -> bool:
+        return await self._adecide(self._challenge_steps(player), lambda: False)
 
-        print_tree(
-            "You have the following cards in your hand:",
-            [
-                f"{ind} - [{card.foreground_color} on {card.background_color}]{card}"
-                for ind, card in enumerate(self.cards)
-            ],
-        )
-        second_card_ind = print_prompt(
-            "What is the second card you want to discard? (provide the number)"
-        )
-        second_card = self.cards.pop(int(second_card_ind))
+    async def adetermine_counter(self, player: BasePlayer) -> bool:
+        return await self._adecide(self._counter_steps(player), lambda: False)
 
-        return first_card, second_card
\ No newline at end of file
+    async def adetermine_end_game(self) -> bool:
+        return await self._adecide(self._end_game_steps(), lambda: False)
+
+    async def aremove_card(self) -> None:
+        self._discard(await self._adecide(self._discard_steps(), lambda: 0))
+
+    async def achoose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
+        # Without an answer the drawn cards go back to the deck
+        drawn = (len(self.cards), len(self.cards) + 1)
+        return self._exchange(
+            exchange_cards, await self._adecide(self._exchange_steps(exchange_cards), lambda: drawn)
+        )
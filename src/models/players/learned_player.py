@@ -0,0 +1,131 @@
+import random
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.models.action import Action, CounterAction, get_counter_action
+from src.models.card import CardType
+from src.models.players.base import BasePlayer
+from src.models.players.card_value_player import CardValuePlayer
+from src.policies.endgame import (
+    ACT,
+    ACTION_INDEX,
+    ACTIONS,
+    CHALLENGE_ACTION,
+    CHALLENGE_COUNTER,
+    COUNTER,
+    NUMBER_OF_ACTIONS,
+)
+from src.policies.learned import DEFAULT_POLICY_PATH, LearnedPolicy, encode_observations
+from src.stats.training_data import observe
+from src.utils.print import print_text
+
+
+@lru_cache(maxsize=None)
+def load_learned_policy(path: str) -> Optional[LearnedPolicy]:
+    """Loaded once per process and shared by every player. None if it has not been trained yet"""
+    if not Path(path).exists():
+        return None
+    return LearnedPolicy.load(path)
+
+
+class LearnedPlayer(CardValuePlayer):
+    """Plays from a small model trained on recorded decisions (see `src.policies.learned`).
+
+    A decision is a single forward pass through the model on the CPU. Without a trained
+    model it plays like `CardValuePlayer`.
+    """
+
+    policy_path: str = DEFAULT_POLICY_PATH
+    # 0 always plays the most likely move
+    temperature: float = 1.0
+
+    def _opponents(self) -> List[BasePlayer]:
+        """The other players still in the game, in turn order after this player"""
+        active_players = self._game_handler.get_active_players()
+        seat = active_players.index(self)
+        return active_players[seat + 1:] + active_players[:seat]
+
+    def _sample(self, probabilities: np.ndarray) -> int:
+        if self.temperature == 0:
+            return int(probabilities.argmax())
+        if self.temperature != 1:
+            probabilities = probabilities ** (1 / self.temperature)
+        return random.choices(range(len(probabilities)), weights=probabilities)[0]
+
+    def _respond(self, phase: int, claimed_card: CardType, claimant: BasePlayer) -> Optional[bool]:
+        policy = load_learned_policy(self.policy_path)
+        opponents = self._opponents()
+        if policy is None or claimant not in opponents:
+            return None
+
+        observation = observe(
+            phase, self, opponents, self._game_handler.get_belief_tracker(), claimed_card, claimant
+        )
+        probability = policy.response_probabilities(
+            encode_observations(np.array([observation])), np.array([phase])
+        )[0]
+        if self.temperature == 0:
+            return bool(probability > 0.5)
+        return random.random() < probability
+
+    def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
+        """Choose the next action to perform"""
+
+        policy = load_learned_policy(self.policy_path)
+        if policy is None:
+            return super().choose_action(other_players)
+
+        message = f"[bold magenta]{self}[/] is thinking..."
+        print_text(message, with_markup=True)
+        self._game_handler.log_message(message)
+        time.sleep(self.think_time)
+
+        legal_moves = np.zeros((1, NUMBER_OF_ACTIONS), dtype=bool)
+        for action in self.available_actions():
+            legal_moves[0, ACTION_INDEX[action.action_type]] = any(
+                self._validate_action(action, player) for player in other_players
+            ) if action.requires_target else True
+
+        observation = observe(ACT, self, other_players, self._game_handler.get_belief_tracker())
+        features = encode_observations(np.array([observation]))
+        action_ind = self._sample(policy.action_probabilities(features, legal_moves)[0])
+        target_action = ACTIONS[action_ind].model_copy()
+        if not target_action.requires_target:
+            return target_action, None
+
+        target_probabilities = policy.target_probabilities(
+            np.array([action_ind]),
+            np.array([[player.coins for player in other_players]]),
+            np.array([[len(player.cards) for player in other_players]]),
+        )[0]
+        return target_action, other_players[self._sample(target_probabilities)]
+
+    def determine_challenge(self, player: BasePlayer) -> bool:
+        """Choose whether to challenge the current player"""
+
+        claim = self._game_handler.get_pending_claim()
+        decision = None
+        if claim is not None and claim.associated_card_type is not None:
+            phase = CHALLENGE_COUNTER if isinstance(claim, CounterAction) else CHALLENGE_ACTION
+            decision = self._respond(phase, claim.associated_card_type, player)
+
+        if decision is None:
+            return super().determine_challenge(player)
+        return decision
+
+    def determine_counter(self, player: BasePlayer) -> bool:
+        """Choose whether to counter the current player's action"""
+
+        current_action = self._game_handler.get_current_action()
+        decision = None
+        if current_action is not None and current_action.can_be_countered:
+            counter_card = get_counter_action(current_action.action_type).associated_card_type
+            decision = self._respond(COUNTER, counter_card, player)
+
+        if decision is None:
+            return super().determine_counter(player)
+        return decision
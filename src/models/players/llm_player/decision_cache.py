@@ -0,0 +1,165 @@
+"""Reuses LLM decisions across strategically equivalent situations.
+
+Exact prompts rarely repeat, since the game history differs in every game, but situations do:
+the same hand and coins, facing the same claim from a player who has made it as often before.
+A situation is reduced to an abstract key, and the answers the model gave in it are counted.
+A decision in a known situation replays the most common answer, except for a share of them
+that still go to the model, so that the answers keep being refined.
+"""
+import random
+import threading
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from enum import Enum
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from src.models.beliefs import BeliefTracker
+from src.models.card import CardType
+from src.models.deck import CARD_TYPE_INDEX
+
+# Returned by `lookup` when the decision has to go to the model
+MISS = object()
+
+# Coins are bucketed at the amounts that change what a player can do: assassinate, coup, must coup
+COIN_THRESHOLDS = (3, 7, 10)
+# Claim counts are capped, a third claim of a card says little more than the second
+MAX_CLAIM_COUNT = 2
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_EXPLORATION_RATE = 0.1
+
+
+class CacheGranularity(str, Enum):
+    # The hand, bucketed coins, the decision and how often the claim was made before
+    coarse = "coarse"
+    # Also every claim of the claimant, and the bucketed coins and cards of every opponent
+    normal = "normal"
+    # Exact coins and claim counts, and the cards discarded face up
+    fine = "fine"
+
+
+class DecisionCacheStats(BaseModel):
+    lookups: int = 0
+    hits: int = 0
+    # Lookups of a known situation that were sent to the model anyway
+    explored: int = 0
+    stored: int = 0
+    entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class CachedDecision(NamedTuple):
+    """A decision's situation, and how its result is turned into an answer and back"""
+    key: Hashable
+    to_answer: Callable[[Any], Hashable] = _identity
+    # None when the answer can't be played in the current situation
+    from_answer: Callable[[Hashable], Any] = _identity
+
+
+def _coins(coins: int, granularity: CacheGranularity) -> int:
+    return coins if granularity == CacheGranularity.fine else bisect_right(COIN_THRESHOLDS, coins)
+
+
+def _claims(beliefs: BeliefTracker, player_name: str, granularity: CacheGranularity) -> Tuple[int, ...]:
+    counts = beliefs.claim_counts(player_name).values()
+    if granularity == CacheGranularity.fine:
+        return tuple(counts)
+    return tuple(min(count, MAX_CLAIM_COUNT) for count in counts)
+
+
+def opponent_profile(opponent, granularity: CacheGranularity) -> Tuple[int, int]:
+    """What tells opponents apart in a situation, also used to pick the target of a cached action"""
+    return _coins(opponent.coins, granularity), len(opponent.cards)
+
+
+def situation_key(
+        decision: str,
+        player,
+        opponents: Sequence,
+        beliefs: BeliefTracker,
+        granularity: CacheGranularity,
+        claimant=None,
+        claimed_card: Optional[CardType] = None,
+        details: Tuple[Hashable, ...] = (),
+) -> Tuple:
+    """Abstract key of a decision, equal for every situation that should get the same answer"""
+    hand = tuple(sorted(card.card_type.value for card in player.cards))
+    key: Tuple = (decision, granularity.value, hand, _coins(player.coins, granularity), len(opponents), *details)
+    if claimant is not None:
+        claims = _claims(beliefs, claimant.name, granularity)
+        if granularity == CacheGranularity.coarse:
+            return *key, claimed_card.value, claims[CARD_TYPE_INDEX[claimed_card]]
+        key += (claimed_card.value, claims, opponent_profile(claimant, granularity))
+    if granularity == CacheGranularity.coarse:
+        return key
+
+    key += (tuple(sorted(opponent_profile(opponent, granularity) for opponent in opponents)),)
+    if granularity == CacheGranularity.fine:
+        key += (_claims(beliefs, player.name, granularity), tuple(beliefs.discard_counts().values()))
+    return key
+
+
+class DecisionCache:
+    """The model's answers by situation, keeping the most recently used situations"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Counter]" = OrderedDict()
+        self._stats = DecisionCacheStats()
+
+    @property
+    def stats(self) -> DecisionCacheStats:
+        with self._lock:
+            return self._stats.model_copy(update={"entries": len(self._entries)})
+
+    def lookup(
+            self, key: Hashable, exploration_rate: float = 0.0, from_answer: Callable[[Hashable], Any] = _identity
+    ) -> Any:
+        """The most common answer in this situation, or MISS to ask the model"""
+        with self._lock:
+            self._stats.lookups += 1
+            answers = self._entries.get(key)
+            if answers is None:
+                return MISS
+            if random.random() < exploration_rate:
+                self._stats.explored += 1
+                return MISS
+            self._entries.move_to_end(key)
+            answer = answers.most_common(1)[0][0]
+
+        result = from_answer(answer)
+        if result is None:
+            return MISS
+        with self._lock:
+            self._stats.hits += 1
+        return result
+
+    def store(self, key: Hashable, answer: Hashable) -> None:
+        with self._lock:
+            answers = self._entries.get(key)
+            if answers is None:
+                answers = self._entries[key] = Counter()
+                if len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            answers[answer] += 1
+            self._stats.stored += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = DecisionCacheStats()
+
+
+# Shared by every LLM player in the process, so situations carry over from game to game
+decision_cache = DecisionCache()
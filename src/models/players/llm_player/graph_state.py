@@ -1,15 +1,35 @@
-from typing import List, Optional, Tuple
-from pydantic import BaseModel, Field
-from src.models.game_history import GameHistory
+from typing import List, NamedTuple, Optional
+
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel
+
 from src.models.action import Action
+from src.models.game_history import GameHistory
 from src.models.players.base import BasePlayer
 
 
 class ChooseActionGraphState(BaseModel):
-    game_history: GameHistory
-    player: BasePlayer
-    available_actions: List[Action]
+    """What the choose_action graph passes from node to node: names and the choices made so far.
+
+    LangGraph handles the state around every node, so the players and the game history stay
+    out of it. Nodes look them up by reference in the `ChooseActionContext` of the run's config.
+    """
+    player_name: str
+    coins: int
+    other_player_names: List[str]
     selected_action: Optional[Action] = None
-    other_players: Optional[List[BasePlayer]] = None
-    selected_target: Optional[BasePlayer] = None
-    message: Optional[str] = None
+    selected_target: Optional[str] = None
+
+
+class ChooseActionContext(NamedTuple):
+    player: BasePlayer
+    other_players: List[BasePlayer]
+    game_history: GameHistory
+
+
+def choose_action_config(context: ChooseActionContext) -> RunnableConfig:
+    return {"configurable": {"choose_action_context": context}}
+
+
+def get_choose_action_context(config: RunnableConfig) -> ChooseActionContext:
+    return config["configurable"]["choose_action_context"]
@@ -1,117 +1,538 @@
 import random
-from typing import List, Optional, Tuple
-from pydantic import BaseModel
+import threading
+from functools import partial
+from typing import Callable, List, Optional, Tuple
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph
+from pydantic import ConfigDict
 
-from src.models.action import Action
-from src.models.card import Card
+from src.models.action import Action, ActionType, CounterAction, get_counter_action
+from src.models.beliefs import BeliefTracker
+from src.models.card import Card, CardType
+from src.models.game_history import GameHistory
+from src.models.players.ai import (
+    choose_random_action,
+    choose_random_card,
+    choose_random_exchange_cards,
+    determine_random_challenge,
+    determine_random_counter,
+)
 from src.models.players.base import BasePlayer
 from src.utils.print import print_text, print_texts
-from .graph_state import ChooseActionGraphState
+from .decision_cache import (
+    DEFAULT_EXPLORATION_RATE,
+    MISS,
+    CacheGranularity,
+    CachedDecision,
+    decision_cache,
+    opponent_profile,
+    situation_key,
+)
+from .graph_state import ChooseActionContext, ChooseActionGraphState, choose_action_config
+from .resilience import adecide_with_deadline, decide_with_deadline
+from .session import ConversationSession, SessionCompaction, SessionReset
 
 from src.models.players.llm_player.nodes import (
     entry_node,
     check_coup,
     select_coup_target_node,
+    aselect_coup_target_node,
     select_action_node,
+    aselect_action_node,
     check_require_target,
     select_target_node,
+    aselect_target_node,
     validate_action_node,
     validate_action,
     parse_action_node,
     determine_challenge,
+    adetermine_challenge,
     determine_counter,
+    adetermine_counter,
     remove_card,
+    aremove_card,
     choose_exchange_cards,
-    generate_message
+    achoose_exchange_cards,
+    generate_message as _generate_message,
+    agenerate_message as _agenerate_message,
+    generate_turn_messages as _generate_turn_messages,
+    agenerate_turn_messages as _agenerate_turn_messages,
+    model_name_for,
+    MODEL_NAME,
 )
 
+# Table talk is not worth waiting for, it is skipped when the model is slow
+NARRATION_DEADLINE_SECONDS = 10
+NARRATION_FALLBACK = "..."
+
+_choose_action_graph = None
+_choose_action_graph_lock = threading.Lock()
+
+
+def generate_message(
+        player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer],
+        game_history: GameHistory, on_text: Optional[Callable[[str], None]] = None
+) -> str:
+    """Generate what the player says at the table, or a placeholder if the model fails to answer in time.
+
+    With `on_text` the message is streamed, which gets the message so far every time it grows.
+    """
+    return decide_with_deadline(
+        decision="generate_message",
+        player_name=player.name,
+        llm_call=partial(_generate_message, player, action, target_player, game_history, on_text),
+        fallback=lambda: NARRATION_FALLBACK,
+        model_name=model_name_for(player),
+        deadline=NARRATION_DEADLINE_SECONDS,
+        max_retries=0,
+    )
+
+
+async def agenerate_message(
+        player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer],
+        game_history: GameHistory, on_text: Optional[Callable[[str], None]] = None
+) -> str:
+    """Like `generate_message`, awaiting the model."""
+    return await adecide_with_deadline(
+        decision="generate_message",
+        player_name=player.name,
+        llm_call=partial(_agenerate_message, player, action, target_player, game_history, on_text),
+        fallback=lambda: NARRATION_FALLBACK,
+        model_name=model_name_for(player),
+        deadline=NARRATION_DEADLINE_SECONDS,
+        max_retries=0,
+    )
+
+
+def _turn_narration_fallback(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]]
+) -> List[Tuple[str, str]]:
+    return [(player.name, NARRATION_FALLBACK) for player, _, _ in moments]
+
+
+def generate_turn_messages(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]],
+        game_history: GameHistory
+) -> List[Tuple[str, str]]:
+    """Generate what every player says this turn in one call, as (player name, message) in the order of the moments."""
+    speaker = moments[0][0]
+    return decide_with_deadline(
+        decision="generate_turn_messages",
+        player_name=speaker.name,
+        llm_call=partial(_generate_turn_messages, moments, game_history),
+        fallback=partial(_turn_narration_fallback, moments),
+        model_name=model_name_for(speaker),
+        deadline=NARRATION_DEADLINE_SECONDS,
+        max_retries=0,
+    )
+
+
+async def agenerate_turn_messages(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]],
+        game_history: GameHistory
+) -> List[Tuple[str, str]]:
+    """Like `generate_turn_messages`, awaiting the model."""
+    speaker = moments[0][0]
+    return await adecide_with_deadline(
+        decision="generate_turn_messages",
+        player_name=speaker.name,
+        llm_call=partial(_agenerate_turn_messages, moments, game_history),
+        fallback=partial(_turn_narration_fallback, moments),
+        model_name=model_name_for(speaker),
+        deadline=NARRATION_DEADLINE_SECONDS,
+        max_retries=0,
+    )
+
+
+def _build_choose_action_graph():
+    """Builds and compiles the StateGraph for choose_action."""
+    workflow: StateGraph = StateGraph(state_schema=ChooseActionGraphState)
+    workflow.add_node("entry_node", entry_node)
+    # Nodes that call the model have an async variant, so the graph also runs with `ainvoke`
+    workflow.add_node(
+        "select_coup_target_node", RunnableLambda(select_coup_target_node, afunc=aselect_coup_target_node)
+    )
+    workflow.add_node("select_action_node", RunnableLambda(select_action_node, afunc=aselect_action_node))
+    workflow.add_node("select_target_node", RunnableLambda(select_target_node, afunc=aselect_target_node))
+    workflow.add_node("validate_action_node", validate_action_node)
+    workflow.add_node("parse_action_node", parse_action_node)
+
+    workflow.add_conditional_edges("entry_node", check_coup, {
+        True: "select_coup_target_node",
+        False: "select_action_node"
+    })
+
+    workflow.add_conditional_edges("select_action_node", check_require_target, {
+        True: "select_target_node",
+        False: "validate_action_node"
+    })
+
+    workflow.add_edge("select_target_node", "validate_action_node")
+
+    workflow.add_conditional_edges("validate_action_node", validate_action, {
+        True: "parse_action_node",
+        False: "select_action_node"
+    })
+
+    workflow.add_edge("select_coup_target_node", "parse_action_node")
+    workflow.set_entry_point("entry_node")
+    workflow.set_finish_point("parse_action_node")
+
+    return workflow.compile()  # Compile the graph
+
+
+def get_choose_action_graph():
+    """Returns the compiled choose_action graph, built once and shared by every LLMPlayer in the process."""
+    global _choose_action_graph
+    with _choose_action_graph_lock:
+        if _choose_action_graph is None:
+            _choose_action_graph = _build_choose_action_graph()
+        return _choose_action_graph
+
 
 class LLMPlayer(BasePlayer):
+    model_config = ConfigDict(protected_namespaces=())
+
     is_ai: bool = True
     cards: List[Card] = []
-    _choose_action_graph: Optional[StateGraph] = None
+    model_name: str = MODEL_NAME
+    # Prompt with a compact summary of the belief tracker instead of the full game history
+    use_belief_summary: bool = False
+    # Hard upper bound on the time spent on one decision, before falling back to the AIPlayer heuristics
+    decision_deadline: float = 20.0
+    max_retries: int = 2
+    # Replay the model's past answers in equivalent situations, see `decision_cache`. None always asks the model
+    cache_granularity: Optional[CacheGranularity] = None
+    # Share of the decisions in a known situation that still go to the model
+    cache_exploration_rate: float = DEFAULT_EXPLORATION_RATE
+    # Messages kept in a conversation with the model that is only sent what happened since the
+    # previous call, see `session`. None sends the whole game with every call
+    conversation_window: Optional[int] = None
+    conversation_reset: SessionReset = SessionReset.game
+    conversation_compaction: SessionCompaction = SessionCompaction.drop
 
     def __init__(self, name: str, game_handler: 'ResistanceCoupGameHandler', **data):
         super().__init__(name=name, is_ai=True, **data)
         self._game_handler = game_handler
-        self._build_choose_action_graph()
+        self._conversation_session = None
+        if self.conversation_window:
+            self._conversation_session = ConversationSession(
+                self.conversation_window, self.conversation_compaction, self._summarize_beliefs
+            )
+
+    @property
+    def conversation_session(self) -> Optional[ConversationSession]:
+        return self._conversation_session
+
+    def _summarize_beliefs(self) -> str:
+        return self._game_handler.get_belief_tracker().summarize(self.name, self.cards)
+
+    def reset_player(self):
+        super().reset_player()
+        if self._conversation_session is not None and self.conversation_reset == SessionReset.game:
+            self._conversation_session.reset()
+
+    @property
+    def belief_tracker(self) -> Optional[BeliefTracker]:
+        if not self.use_belief_summary:
+            return None
+        return self._game_handler.get_belief_tracker()
+
+    def _opponents(self) -> List[BasePlayer]:
+        return [player for player in self._game_handler.get_active_players() if player is not self]
+
+    def _cached_decision(
+            self,
+            decision: str,
+            opponents: Optional[List[BasePlayer]] = None,
+            claimant: Optional[BasePlayer] = None,
+            claimed_card: Optional[CardType] = None,
+            details: Tuple = (),
+            **conversions,
+    ) -> Optional[CachedDecision]:
+        if self.cache_granularity is None:
+            return None
+        key = situation_key(
+            decision,
+            self,
+            self._opponents() if opponents is None else opponents,
+            self._game_handler.get_belief_tracker(),
+            self.cache_granularity,
+            claimant,
+            claimed_card,
+            details,
+        )
+        # Models answer differently, they don't share answers
+        return CachedDecision((self.model_name, *key), **conversions)
+
+    def _lookup(self, cached: Optional[CachedDecision]):
+        if cached is None:
+            return MISS
+        return decision_cache.lookup(cached.key, self.cache_exploration_rate, cached.from_answer)
+
+    @staticmethod
+    def _remembering(cached: Optional[CachedDecision], is_valid):
+        """`is_valid`, also storing every valid answer of the model in the cache"""
+        if cached is None:
+            return is_valid
+
+        def remember_if_valid(result) -> bool:
+            if not is_valid(result):
+                return False
+            decision_cache.store(cached.key, cached.to_answer(result))
+            return True
+
+        return remember_if_valid
+
+    def _decide(
+            self, decision: str, llm_call, fallback, is_valid=lambda result: result is not None,
+            cached: Optional[CachedDecision] = None,
+    ):
+        result = self._lookup(cached)
+        if result is not MISS:
+            return result
+        return decide_with_deadline(
+            decision=decision,
+            player_name=self.name,
+            llm_call=llm_call,
+            fallback=fallback,
+            model_name=self.model_name,
+            deadline=self.decision_deadline,
+            max_retries=self.max_retries,
+            is_valid=self._remembering(cached, is_valid),
+        )
+
+    async def _adecide(
+            self, decision: str, llm_call, fallback, is_valid=lambda result: result is not None,
+            cached: Optional[CachedDecision] = None,
+    ):
+        result = self._lookup(cached)
+        if result is not MISS:
+            return result
+        return await adecide_with_deadline(
+            decision=decision,
+            player_name=self.name,
+            llm_call=llm_call,
+            fallback=fallback,
+            model_name=self.model_name,
+            deadline=self.decision_deadline,
+            max_retries=self.max_retries,
+            is_valid=self._remembering(cached, is_valid),
+        )
 
-    def _get_initial_state(self) -> ChooseActionGraphState:
+    def _initial_action_state(self, other_players: List[BasePlayer]) -> ChooseActionGraphState:
         return ChooseActionGraphState(
-            game_history=self._game_handler.get_game_history(),
-            player=self,
-            available_actions=[]
+            player_name=self.name,
+            coins=self.coins,
+            other_player_names=[str(player) for player in other_players],
         )
 
-    def _build_choose_action_graph(self):
-        """Builds and compiles the StateGraph for choose_action."""
-        workflow: StateGraph = StateGraph(state_schema=ChooseActionGraphState)
-        workflow.add_node("entry_node", entry_node)
-        workflow.add_node("select_coup_target_node", select_coup_target_node)
-        workflow.add_node("select_action_node", select_action_node)
-        workflow.add_node("select_target_node", select_target_node)
-        workflow.add_node("validate_action_node", validate_action_node)
-        workflow.add_node("parse_action_node", parse_action_node)
+    def _action_config(self, other_players: List[BasePlayer]):
+        return choose_action_config(
+            ChooseActionContext(self, other_players, self._game_handler.get_game_history())
+        )
+
+    @staticmethod
+    def _selected_choice(result, other_players: List[BasePlayer]) -> Tuple[Optional[Action], Optional[BasePlayer]]:
+        selected_action = result.get("selected_action")
+        if selected_action is None or not selected_action.requires_target:
+            return selected_action, None
+
+        selected_target_name = result.get("selected_target")
+        return selected_action, next(
+            (player for player in other_players if str(player) == selected_target_name), None
+        )
+
+    def _is_valid_choice(self, choice: Tuple[Optional[Action], Optional[BasePlayer]]) -> bool:
+        selected_action, selected_target = choice
+        if selected_action is None:
+            return False
+        if selected_action.requires_target and selected_target is None:
+            return False
+        return self._validate_action(selected_action, selected_target)
 
-        workflow.add_conditional_edges("entry_node", check_coup, {
-            True: "select_coup_target_node",
-            False: "select_action_node"
-        })
+    def _cached_action(self, other_players: List[BasePlayer]) -> Optional[CachedDecision]:
+        """A cached action targets an opponent in the same position as the one targeted before"""
+        def to_answer(choice: Tuple[Action, Optional[BasePlayer]]) -> Tuple[ActionType, Optional[Tuple]]:
+            action, target = choice
+            return action.action_type, opponent_profile(target, self.cache_granularity) if target else None
 
-        workflow.add_conditional_edges("select_action_node", check_require_target, {
-            True: "select_target_node",
-            False: "validate_action_node"
-        })
+        def from_answer(answer: Tuple[ActionType, Optional[Tuple]]) -> Optional[Tuple[Action, Optional[BasePlayer]]]:
+            action_type, target_profile = answer
+            action = next((action for action in self.available_actions() if action.action_type == action_type), None)
+            if action is None or not action.requires_target:
+                return (action, None) if action else None
+            targets = [
+                player for player in other_players
+                if opponent_profile(player, self.cache_granularity) == target_profile
+                if self._validate_action(action, player)
+            ]
+            return (action, random.choice(targets)) if targets else None
 
-        workflow.add_edge("select_target_node", "validate_action_node")
+        return self._cached_decision("choose_action", other_players, to_answer=to_answer, from_answer=from_answer)
 
-        workflow.add_conditional_edges("validate_action_node", validate_action, {
-            True: "parse_action_node",
-            False: "select_action_node"
-        })
+    def _cached_response(
+            self, decision: str, claim: Optional[Action | CounterAction], claimant: BasePlayer,
+            claimed_card: Optional[CardType],
+    ) -> Optional[CachedDecision]:
+        if claim is None or claimed_card is None:
+            return None
+        return self._cached_decision(decision, claimant=claimant, claimed_card=claimed_card, details=(str(claim),))
 
-        workflow.add_edge("select_action_node", "parse_action_node")
-        workflow.set_entry_point("entry_node")
-        workflow.set_finish_point("parse_action_node")
+    def _cached_challenge(self, player: BasePlayer) -> Optional[CachedDecision]:
+        claim = self._game_handler.get_pending_claim()
+        return self._cached_response("determine_challenge", claim, player, claim and claim.associated_card_type)
 
-        self._choose_action_graph = workflow.compile()  # Compile the graph
+    def _cached_counter(self, player: BasePlayer) -> Optional[CachedDecision]:
+        action = self._game_handler.get_current_action()
+        counter_card = (
+            get_counter_action(action.action_type).associated_card_type
+            if action is not None and action.can_be_countered else None
+        )
+        return self._cached_response("determine_counter", action, player, counter_card)
+
+    def _card_in_hand(self, card_type: CardType) -> Optional[Card]:
+        """A card of this type in the hand, left there: `_discard` takes it out"""
+        return next((card for card in self.cards if card.card_type == card_type), None)
+
+    def _cached_discard(self) -> Optional[CachedDecision]:
+        return self._cached_decision(
+            "remove_card", to_answer=lambda card: card.card_type, from_answer=self._card_in_hand
+        )
+
+    def _cached_exchange(self, exchange_cards: List[Card]) -> Optional[CachedDecision]:
+        """The answer is the types of the 2 cards sent back"""
+        def from_answer(card_types: Tuple[CardType, ...]) -> Optional[Tuple[Card, Card]]:
+            chosen_cards = []
+            for card_type in card_types:
+                card = next(
+                    (card for card in self.cards + exchange_cards
+                     if card.card_type == card_type and not any(card is chosen for chosen in chosen_cards)),
+                    None,
+                )
+                if card is None:
+                    return None
+                chosen_cards.append(card)
+            return chosen_cards[0], chosen_cards[1]
+
+        return self._cached_decision(
+            "choose_exchange_cards",
+            details=(tuple(sorted(card.card_type.value for card in exchange_cards)),),
+            to_answer=lambda chosen_cards: tuple(sorted(card.card_type for card in chosen_cards)),
+            from_answer=from_answer,
+        )
 
     def choose_action(self, other_players: List['BasePlayer']) -> Tuple[Action, Optional['BasePlayer']]:
         """Choose the next action to perform using a LangChain StateGraph."""
-        initial_state = self._get_initial_state()
-        initial_state.other_players = other_players
 
-        result = self._choose_action_graph.invoke(initial_state)
-        if "selected_target" in result.keys():
-            selected_target = result["selected_target"]
-        else:
-            selected_target = None
-        return result["selected_action"], selected_target
+        def choose_with_graph() -> Tuple[Optional[Action], Optional[BasePlayer]]:
+            result = get_choose_action_graph().invoke(
+                self._initial_action_state(other_players), self._action_config(other_players)
+            )
+            return self._selected_choice(result, other_players)
+
+        return self._decide(
+            "choose_action", choose_with_graph, partial(choose_random_action, self, other_players),
+            self._is_valid_choice, self._cached_action(other_players),
+        )
+
+    async def achoose_action(self, other_players: List['BasePlayer']) -> Tuple[Action, Optional['BasePlayer']]:
+        async def choose_with_graph() -> Tuple[Optional[Action], Optional[BasePlayer]]:
+            result = await get_choose_action_graph().ainvoke(
+                self._initial_action_state(other_players), self._action_config(other_players)
+            )
+            return self._selected_choice(result, other_players)
+
+        return await self._adecide(
+            "choose_action", choose_with_graph, partial(choose_random_action, self, other_players),
+            self._is_valid_choice, self._cached_action(other_players),
+        )
 
     def determine_challenge(self, player: BasePlayer) -> bool:
         """Choose whether to challenge the current player"""
         game_history = self._game_handler.get_game_history()
-        return determine_challenge(self, player, game_history)
+        return self._decide(
+            "determine_challenge",
+            partial(determine_challenge, self, player, game_history),
+            determine_random_challenge,
+            cached=self._cached_challenge(player),
+        )
+
+    async def adetermine_challenge(self, player: BasePlayer) -> bool:
+        game_history = self._game_handler.get_game_history()
+        return await self._adecide(
+            "determine_challenge",
+            partial(adetermine_challenge, self, player, game_history),
+            determine_random_challenge,
+            cached=self._cached_challenge(player),
+        )
 
     def determine_counter(self, player: BasePlayer) -> bool:
         """Choose whether to counter the current player's action"""
         game_history = self._game_handler.get_game_history()
-        return determine_counter(self, player, game_history)
+        return self._decide(
+            "determine_counter",
+            partial(determine_counter, self, player, game_history),
+            determine_random_counter,
+            cached=self._cached_counter(player),
+        )
+
+    async def adetermine_counter(self, player: BasePlayer) -> bool:
+        game_history = self._game_handler.get_game_history()
+        return await self._adecide(
+            "determine_counter",
+            partial(adetermine_counter, self, player, game_history),
+            determine_random_counter,
+            cached=self._cached_counter(player),
+        )
+
+    def speculative_action(self, other_players: List[BasePlayer]) -> Callable[[], Tuple[Action, Optional[BasePlayer]]]:
+        """The choose_action call of an upcoming turn, to be run in the background"""
+        return partial(self.choose_action, list(other_players))
+
+    def speculative_challenge(self, player: BasePlayer, game_history: GameHistory) -> Callable[[], bool]:
+        """The determine_challenge call against a claim that has not been made yet, to be run in the background"""
+        return partial(
+            self._decide,
+            "determine_challenge",
+            partial(determine_challenge, self, player, game_history),
+            determine_random_challenge,
+        )
 
     def remove_card(self) -> None:
         """Choose a card and remove it from your hand"""
         game_history = self._game_handler.get_game_history()
         # Remove a random card
         if len(self.cards) == 1:
-            discarded_card = self.cards.pop()
+            discarded_card = self.cards[0]
+        else:
+            discarded_card = self._decide(
+                "remove_card",
+                partial(remove_card, self, game_history),
+                partial(choose_random_card, self.cards),
+                cached=self._cached_discard(),
+            )
+        self._discard(discarded_card)
+
+    async def aremove_card(self) -> None:
+        game_history = self._game_handler.get_game_history()
+        if len(self.cards) == 1:
+            discarded_card = self.cards[0]
         else:
-            discarded_card = remove_card(self, game_history)
-            for i, card in enumerate(self.cards):
-                if str(card) == str(discarded_card):
-                    del self.cards[i]
-                    break
+            discarded_card = await self._adecide(
+                "remove_card",
+                partial(aremove_card, self, game_history),
+                partial(choose_random_card, self.cards),
+                cached=self._cached_discard(),
+            )
+        self._discard(discarded_card)
+
+    def _discard(self, discarded_card: Card) -> None:
+        for i, card in enumerate(self.cards):
+            if str(card) == str(discarded_card):
+                del self.cards[i]
+                break
         message = f"{self} discards their {discarded_card} card"
         print_texts(f"{self} discards their ", (f"{discarded_card}", discarded_card.style), " card")
         self._game_handler.log_message(message)
@@ -120,7 +541,32 @@ class LLMPlayer(BasePlayer):
         """Perform the exchange action. Pick which 2 cards to send back to the deck"""
         game_history = self._game_handler.get_game_history()
 
-        first_card, second_card = choose_exchange_cards(self, exchange_cards, game_history)
+        first_card, second_card = self._decide(
+            "choose_exchange_cards",
+            partial(choose_exchange_cards, self, exchange_cards, game_history),
+            partial(choose_random_exchange_cards, self.cards + exchange_cards),
+            is_valid=lambda chosen_cards: None not in chosen_cards,
+            cached=self._cached_exchange(exchange_cards),
+        )
+        return self._exchange(exchange_cards, first_card, second_card)
+
+    async def achoose_exchange_cards(self, exchange_cards: list[Card]) -> Tuple[Card, Card]:
+        game_history = self._game_handler.get_game_history()
+
+        first_card, second_card = await self._adecide(
+            "choose_exchange_cards",
+            partial(achoose_exchange_cards, self, exchange_cards, game_history),
+            partial(choose_random_exchange_cards, self.cards + exchange_cards),
+            is_valid=lambda chosen_cards: None not in chosen_cards,
+            cached=self._cached_exchange(exchange_cards),
+        )
+        return self._exchange(exchange_cards, first_card, second_card)
+
+    def _exchange(self, exchange_cards: list[Card], first_card: Card, second_card: Card) -> Tuple[Card, Card]:
+        self.cards += exchange_cards
+        self.cards.remove(first_card)
+        self.cards.remove(second_card)
+
         message = f"{self} exchanges 2 cards"
         print_text(message)
         self._game_handler.log_message(message)
@@ -1,14 +1,37 @@
-from typing import List, Tuple, Optional
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Generator, Iterable, List, NamedTuple, Optional, Tuple, TypeVar
 
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import AIMessageChunk, BaseMessage, SystemMessage, ToolCall
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
-from .graph_state import ChooseActionGraphState
-from src.models.game_history import GameHistory
+from .graph_state import ChooseActionContext, ChooseActionGraphState, get_choose_action_context
+from .scheduler import Priority, get_llm_scheduler
+from .session import ConversationSession
+from .tool_schemas import SCHEMA_CACHE_SIZE, ToolTemplate, tool_schema, tool_template
+from src.models.game_history import GameHistory, HistoryRecord
 from src.models.players.base import BasePlayer
 from src.models.card import Card
 from src.models.action import Action, TaxAction, CoupAction, ForeignAidAction, StealAction, CounterAction, IncomeAction, ExchangeAction, AssassinateAction
 
+T = TypeVar("T")
+
+MODEL_NAME = "gpt-4o-2024-08-06"
+# Retries are handled per decision, so a single request never outlives its decision's deadline
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Rough size of a tool call answer, used to reserve tokens before the real usage is known
+ESTIMATED_COMPLETION_TOKENS = 100
+
+# Turns still sent verbatim when the belief summary replaces the full history
+BELIEF_SUMMARY_RECENT_TURNS = 2
+
+# Put between the instruction and the game history in a prompt
+HISTORY_INTRO = "Here are previous game histories. You need to analyze this history and make the best decision\n"
+NARRATION_HISTORY_INTRO = "Here are previous game histories.\n"
+# Turns sent with the table talk of a whole turn, which is about the turn being played
+NARRATION_RECENT_TURNS = 2
+
 generate_message_function = [
     {
         "type": "function",
@@ -29,6 +52,43 @@ generate_message_function = [
     }
 ]
 
+generate_turn_messages_function = [
+    {
+        "type": "function",
+        "function": {
+            "name": "generate_turn_messages",
+            "description": (
+                "This function is called to generate the text messages of every player who says something this turn, "
+                "one for each moment and in the same order."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "messages": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "player": {
+                                    "type": "string",
+                                    "enum": [],
+                                    "description": "This property returns the name of the player saying the message."
+                                },
+                                "message": {
+                                    "type": "string",
+                                    "description": "This property returns the message of the player."
+                                }
+                            },
+                            "required": ["player", "message"]
+                        }
+                    }
+                },
+                "required": ["messages"]
+            }
+        }
+    }
+]
+
 choose_action_function = [
     {
         "type": "function",
@@ -161,53 +221,192 @@ choose_exchange_cards_function = [
     }
 ]
 
+generate_message_tool = tool_template(generate_message_function)
+generate_turn_messages_tool = tool_template(
+    generate_turn_messages_function, ("messages", "items", "properties", "player")
+)
+choose_action_tool = tool_template(choose_action_function, ("action",))
+choose_target_player_tool = tool_template(choose_target_player_function, ("player",))
+determine_challenge_tool = tool_template(determine_challenge_function)
+determine_counter_tool = tool_template(determine_counter_function)
+remove_card_tool = tool_template(remove_card_function, ("card",))
+choose_exchange_cards_tool = tool_template(choose_exchange_cards_function, ("first",), ("second",))
+
+
+@lru_cache(maxsize=None)
+def chat_model(model_name: str, stream_usage: bool = False) -> ChatOpenAI:
+    """The client of a model, shared by every call to it"""
+    return ChatOpenAI(
+        model=model_name,
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        max_retries=0,
+        # Token usage of a streamed answer only comes with its last chunk when asked for
+        stream_usage=stream_usage,
+    )
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def tool_model(
+        model_name: str, template: ToolTemplate, choices: Tuple[Tuple[str, ...], ...] = (), stream_usage: bool = False
+):
+    """The model bound to a tool with these choices. Bound models don't change, so calls can share them"""
+    return chat_model(model_name, stream_usage).bind_tools(tool_schema(template, choices), tool_choice=template.name)
+
+
+def model_name_for(player: BasePlayer) -> str:
+    """Returns the model a player is configured with; players without one use the default model."""
+    return getattr(player, "model_name", MODEL_NAME)
+
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(len(message.content) for message in messages) // 4 + ESTIMATED_COMPLETION_TOKENS
+
+
+def _remember_answer(
+        session: Optional[ConversationSession], messages: List[BaseMessage], tool_calls: List[ToolCall]
+) -> None:
+    if session is not None and tool_calls:
+        session.record_answer(messages, tool_calls[0])
+
+
+def _add_chunk(
+        response: Optional[AIMessageChunk], chunk: AIMessageChunk, on_partial: Callable[[Dict[str, Any]], None]
+) -> AIMessageChunk:
+    response = chunk if response is None else response + chunk
+    if response.tool_calls:
+        on_partial(response.tool_calls[0]["args"])
+    return response
+
+
+def invoke_tool_model(
+        model, messages: List[BaseMessage], priority: Priority = Priority.decision,
+        session: Optional[ConversationSession] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[ToolCall]:
+    """Invokes a tool-bound model once the process-wide LLM scheduler admits the call.
+
+    With `on_partial` the answer is streamed, and the arguments parsed so far are passed on after every chunk.
+    """
+    estimated_tokens = _estimate_tokens(messages)
+    with get_llm_scheduler().slot(priority, estimated_tokens) as usage:
+        if on_partial is None:
+            response = model.invoke(messages)
+        else:
+            response = None
+            for chunk in model.stream(messages):
+                response = _add_chunk(response, chunk, on_partial)
+        usage.record(response.usage_metadata)
+    _remember_answer(session, messages, response.tool_calls)
+    return response.tool_calls
+
+
+async def ainvoke_tool_model(
+        model, messages: List[BaseMessage], priority: Priority = Priority.decision,
+        session: Optional[ConversationSession] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[ToolCall]:
+    """Like `invoke_tool_model`, but awaits the model instead of blocking a thread on it."""
+    estimated_tokens = _estimate_tokens(messages)
+    async with get_llm_scheduler().aslot(priority, estimated_tokens) as usage:
+        if on_partial is None:
+            response = await model.ainvoke(messages)
+        else:
+            response = None
+            async for chunk in model.astream(messages):
+                response = _add_chunk(response, chunk, on_partial)
+        usage.record(response.usage_metadata)
+    _remember_answer(session, messages, response.tool_calls)
+    return response.tool_calls
+
+
+class ToolModelCall(NamedTuple):
+    model: Any
+    messages: List[BaseMessage]
+    priority: Priority = Priority.decision
+    # The conversation the messages belong to, which keeps the answer
+    session: Optional[ConversationSession] = None
+    # Streams the answer, getting its arguments as far as they have been generated. Only for table
+    # talk: decisions are only acted on once they are complete
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
 
-def entry_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
-    return state
+
+# Every decision below is written once, as a generator that yields its model calls and
+# receives their tool calls. It is run either blocking (`invoke`) or async (`ainvoke`)
+ToolSteps = Generator[ToolModelCall, List[ToolCall], T]
+
+
+def run_tool_steps(steps: ToolSteps[T]) -> T:
+    try:
+        call = next(steps)
+        while True:
+            call = steps.send(invoke_tool_model(*call))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def arun_tool_steps(steps: ToolSteps[T]) -> T:
+    try:
+        call = next(steps)
+        while True:
+            call = steps.send(await ainvoke_tool_model(*call))
+    except StopIteration as stop:
+        return stop.value
+
+
+# Nodes return only the fields they change, and read the players and the game history from
+# the context in the run's config. Their cost doesn't depend on how long the game has been going
+
+
+def entry_node(state: ChooseActionGraphState) -> dict:
+    return {}
 
 
 def check_coup(state: ChooseActionGraphState) -> bool:
     """Checks if the player's coins are greater than or equal to 10."""
-    return state.player.coins >= 10
+    return state.coins >= 10
 
 
-def select_coup_target_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
+def _select_coup_target_node(context: ChooseActionContext) -> ToolSteps[dict]:
     """Selects a target player for the Coup action."""
-    other_player_names = [str(player) for player in state.other_players]
-    selected_action = state.player.available_actions()[0]
-    cards = [str(card) for card in state.player.cards]
-    coins = state.player.coins
-    game_history = game_history_to_str(state.game_history)
+    other_player_names = [str(player) for player in context.other_players]
+    selected_action = context.player.available_actions()[0]
+    cards = [str(card) for card in context.player.cards]
+    coins = context.player.coins
 
     prompt = (
-        f"You are professional coup game player called {state.player}. You selected target player for coup action. And now you need to determine target player.\n"
+        f"You are professional coup game player called {context.player}. You selected target player for coup "
+        "action. And now you need to determine target player.\n"
         f"You need to choose one player from {other_player_names}\n"
         f"You have {cards} on the hand and {coins} coins."
-
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
     )
 
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
+    choose_target_model = tool_model(
+        model_name_for(context.player), choose_target_player_tool, (tuple(other_player_names),)
     )
+    messages = decision_messages(context.player, context.game_history, prompt)
 
-    choose_target_player_function[0]["function"]["parameters"]["properties"]["player"]["enum"] = other_player_names
-    choose_target_model = model.bind_tools(choose_target_player_function, tool_choice="choose_player")
-    messages = [SystemMessage(prompt)]
-
-    tool_call = choose_target_model.invoke(messages).tool_calls
+    tool_call = yield ToolModelCall(choose_target_model, messages, session=conversation_session(context.player))
     selected_player_name = tool_call[0]['args']['player']
-    selected_target = next((player for player in state.other_players if str(player) == selected_player_name), None)
-    state.selected_target = selected_target
-    state.selected_action = selected_action
-    return state
+    selected_target = selected_player_name if selected_player_name in other_player_names else None
+    return {"selected_action": selected_action, "selected_target": selected_target}
+
+
+def select_coup_target_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return run_tool_steps(_select_coup_target_node(get_choose_action_context(config)))
+
+
+async def aselect_coup_target_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return await arun_tool_steps(_select_coup_target_node(get_choose_action_context(config)))
 
 
 def game_history_to_str(game_history: GameHistory) -> str:
     """Returns the game history as a readable string."""
+    return turns_to_str(game_history.records())
+
+
+def turns_to_str(records: Iterable[HistoryRecord]) -> str:
     output = ""
-    for record in game_history.history:
+    for record in records:
         output += f"Turn {record.turn}:\n"
         output += f"  Current Player: {record.current_player}\n"
         for message in record.messages:
@@ -222,40 +421,62 @@ def game_history_to_str(game_history: GameHistory) -> str:
     return output
 
 
-def select_action_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
+def game_context_to_str(player: BasePlayer, game_history: GameHistory) -> str:
+    """Returns the game context for a prompt: the full history, or a belief summary and the latest turns."""
+    belief_tracker = getattr(player, "belief_tracker", None)
+    if belief_tracker is None:
+        return game_history_to_str(game_history)
+
+    belief_summary = belief_tracker.summarize(player.name, player.cards)
+    return f"{belief_summary}\nMost recent turns:\n{turns_to_str(game_history.recent(BELIEF_SUMMARY_RECENT_TURNS))}"
+
+
+def conversation_session(player: BasePlayer) -> Optional[ConversationSession]:
+    return getattr(player, "conversation_session", None)
+
+
+def decision_messages(
+        player: BasePlayer, game_history: GameHistory, instruction: str, history_intro: str = HISTORY_INTRO,
+        closing: str = "",
+) -> List[BaseMessage]:
+    """The messages of a call: a single prompt with the game so far, or the next ones of the player's conversation"""
+    session = conversation_session(player)
+    if session is None:
+        return [SystemMessage(f"{instruction}{history_intro}{game_context_to_str(player, game_history)}{closing}")]
+    return session.request(
+        game_history, f"{instruction}{closing}", partial(game_context_to_str, player, game_history), turns_to_str
+    )
+
+
+def _select_action_node(context: ChooseActionContext) -> ToolSteps[dict]:
     """Selects an action from the available actions."""
-    available_actions = state.player.available_actions()
-    state.selected_action = None
-    state.other_players = None
-    state.selected_target = None
+    available_actions = context.player.available_actions()
 
-    game_history = game_history_to_str(state.game_history)
     action_names = [str(action) for action in available_actions]
-    cards = [str(card) for card in state.player.cards]
-    coins = state.player.coins
+    cards = [str(card) for card in context.player.cards]
+    coins = context.player.coins
 
     prompt = (
-        f"You are professional coup game player called {state.player}. And now is your turn. You need to choose an action from {action_names}\n"
+        f"You are professional coup game player called {context.player}. And now is your turn. You need to choose "
+        f"an action from {action_names}\n"
         f"You have {cards} on the hand and {coins} coins."
-
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
-    )
-
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
     )
 
-    choose_action_function[0]["function"]["parameters"]["properties"]["action"]["enum"] = action_names
-    choose_action_model = model.bind_tools(choose_action_function, tool_choice="choose_action")
-    messages = [SystemMessage(prompt)]
+    choose_action_model = tool_model(model_name_for(context.player), choose_action_tool, (tuple(action_names),))
+    messages = decision_messages(context.player, context.game_history, prompt)
 
-    tool_call = choose_action_model.invoke(messages).tool_calls
+    tool_call = yield ToolModelCall(choose_action_model, messages, session=conversation_session(context.player))
     selected_action_str = tool_call[0]['args']['action']
     selected_action = next((action for action in available_actions if str(action) == selected_action_str), None)
+    return {"selected_action": selected_action, "selected_target": None}
+
+
+def select_action_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return run_tool_steps(_select_action_node(get_choose_action_context(config)))
+
 
-    state.selected_action = selected_action
-    return state
+async def aselect_action_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return await arun_tool_steps(_select_action_node(get_choose_action_context(config)))
 
 
 def check_require_target(state: ChooseActionGraphState) -> bool:
@@ -263,59 +484,53 @@ def check_require_target(state: ChooseActionGraphState) -> bool:
     return state.selected_action.requires_target
 
 
-def select_target_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
+def _select_target_node(context: ChooseActionContext, selected_action: Action) -> ToolSteps[dict]:
     """Selects a target player for the action."""
-    other_player_names = [str(player) for player in state.other_players]
-    selected_action = state.selected_action
-    cards = [str(card) for card in state.player.cards]
-    coins = state.player.coins
-    game_history = game_history_to_str(state.game_history)
+    other_player_names = [str(player) for player in context.other_players]
+    cards = [str(card) for card in context.player.cards]
+    coins = context.player.coins
 
     prompt = (
-        f"You are professional coup game player called {state.player}. You selected action {selected_action} and now you need to determine target player.\n"
+        f"You are professional coup game player called {context.player}. You selected action {selected_action} and "
+        "now you need to determine target player.\n"
         f"You need to choose one player from {other_player_names}\n"
         f"You have {cards} on the hand and {coins} coins."
-
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
     )
 
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
+    choose_target_model = tool_model(
+        model_name_for(context.player), choose_target_player_tool, (tuple(other_player_names),)
     )
+    messages = decision_messages(context.player, context.game_history, prompt)
 
-    choose_target_player_function[0]["function"]["parameters"]["properties"]["player"]["enum"] = other_player_names
-    choose_target_model = model.bind_tools(choose_target_player_function, tool_choice="choose_player")
-    messages = [SystemMessage(prompt)]
-
-    tool_call = choose_target_model.invoke(messages).tool_calls
+    tool_call = yield ToolModelCall(choose_target_model, messages, session=conversation_session(context.player))
     selected_player_name = tool_call[0]['args']['player']
-    selected_target = next((player for player in state.other_players if str(player) == selected_player_name), None)
-    state.selected_target = selected_target
+    selected_target = selected_player_name if selected_player_name in other_player_names else None
+    return {"selected_target": selected_target}
 
-    return state
 
+def select_target_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return run_tool_steps(_select_target_node(get_choose_action_context(config), state.selected_action))
 
-def determine_challenge(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+
+async def aselect_target_node(state: ChooseActionGraphState, config: RunnableConfig) -> dict:
+    return await arun_tool_steps(_select_target_node(get_choose_action_context(config), state.selected_action))
+
+
+def _determine_challenge(
+        player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory
+) -> ToolSteps[bool]:
     cards = [str(card) for card in player.cards]
     coins = player.coins
-    game_history = game_history_to_str(game_history)
 
     prompt = (
         f"You are professional coup game player called {player}. This is the {challenged_player}'s turn. You need to determine weather challenge {str(challenged_player)} or not.\n"
         f"You have {cards} on the hand and {coins} coins.\n"
         "Please be carefully while challenging other because if you lose the callenge, you need to discard one of your card. Please make safe decisions."
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
-    )
-
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
     )
 
-    determine_challenge_model = model.bind_tools(determine_challenge_function, tool_choice="determine_challenge")
-    messages = [SystemMessage(prompt)]
-    tool_call = determine_challenge_model.invoke(messages).tool_calls
+    determine_challenge_model = tool_model(model_name_for(player), determine_challenge_tool)
+    messages = decision_messages(player, game_history, prompt)
+    tool_call = yield ToolModelCall(determine_challenge_model, messages, session=conversation_session(player))
 
     determine_challenge_str = tool_call[0]['args']['challenge']
 
@@ -325,25 +540,26 @@ def determine_challenge(player: BasePlayer, challenged_player: BasePlayer, game_
         return False
 
 
-def determine_counter(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+def determine_challenge(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+    return run_tool_steps(_determine_challenge(player, challenged_player, game_history))
+
+
+async def adetermine_challenge(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+    return await arun_tool_steps(_determine_challenge(player, challenged_player, game_history))
+
+
+def _determine_counter(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> ToolSteps[bool]:
     cards = [str(card) for card in player.cards]
     coins = player.coins
-    game_history = game_history_to_str(game_history)
 
     prompt = (
         f"You are professional coup game player called {player}. This is the {challenged_player}'s turn. You need to determine weather counter {str(challenged_player)}'s action or not.\n"
         f"You have {cards} on the hand and {coins} coins."
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
-    )
-
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
     )
 
-    determine_counter_model = model.bind_tools(determine_counter_function, tool_choice="determine_counter")
-    messages = [SystemMessage(prompt)]
-    tool_call = determine_counter_model.invoke(messages).tool_calls
+    determine_counter_model = tool_model(model_name_for(player), determine_counter_tool)
+    messages = decision_messages(player, game_history, prompt)
+    tool_call = yield ToolModelCall(determine_counter_model, messages, session=conversation_session(player))
 
     determine_counter_str = tool_call[0]['args']['counter']
 
@@ -353,27 +569,26 @@ def determine_counter(player: BasePlayer, challenged_player: BasePlayer, game_hi
         return False
 
 
-def remove_card(player: BasePlayer, game_history: GameHistory) -> Card:
+def determine_counter(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+    return run_tool_steps(_determine_counter(player, challenged_player, game_history))
+
+
+async def adetermine_counter(player: BasePlayer, challenged_player: BasePlayer, game_history: GameHistory) -> bool:
+    return await arun_tool_steps(_determine_counter(player, challenged_player, game_history))
+
+
+def _remove_card(player: BasePlayer, game_history: GameHistory) -> ToolSteps[Card]:
     cards = [str(card) for card in player.cards]
     coins = player.coins
-    game_history = game_history_to_str(game_history)
 
     prompt = (
         f"You are professional coup game player called {player}. Now, you need to discard one of your card."
         f"You have {cards} on the hand and {coins} coins. You must choose one card to be discarded"
-
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
     )
 
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
-    )
-
-    remove_card_function[0]["function"]["parameters"]["properties"]["card"]["enum"] = cards
-    remove_card_model = model.bind_tools(remove_card_function, tool_choice="remove_card")
-    messages = [SystemMessage(prompt)]
-    tool_call = remove_card_model.invoke(messages).tool_calls
+    remove_card_model = tool_model(model_name_for(player), remove_card_tool, (tuple(cards),))
+    messages = decision_messages(player, game_history, prompt)
+    tool_call = yield ToolModelCall(remove_card_model, messages, session=conversation_session(player))
 
     discarded_card_name = tool_call[0]['args']['card']
     discarded_card = next((card for card in player.cards if str(card) == discarded_card_name), None)
@@ -381,31 +596,33 @@ def remove_card(player: BasePlayer, game_history: GameHistory) -> Card:
     return discarded_card
 
 
-def choose_exchange_cards(player: BasePlayer, exchange_cards: List[Card], game_history: GameHistory) -> Tuple[Card, Card]:
-    cards = player.cards
-    cards += exchange_cards
+def remove_card(player: BasePlayer, game_history: GameHistory) -> Card:
+    return run_tool_steps(_remove_card(player, game_history))
+
+
+async def aremove_card(player: BasePlayer, game_history: GameHistory) -> Card:
+    return await arun_tool_steps(_remove_card(player, game_history))
+
+
+def _choose_exchange_cards(
+        player: BasePlayer, exchange_cards: List[Card], game_history: GameHistory
+) -> ToolSteps[Tuple[Card, Card]]:
+    # Work on a copy, the player only takes the new hand once the decision is made
+    cards = player.cards + exchange_cards
     card_names = [str(card) for card in cards]
 
     coins = player.coins
-    game_history = game_history_to_str(game_history)
 
     prompt = (
         f"You are professional coup game player called {player}. Now, you need to select two cards to turn back to the deck."
         f"You have {card_names} and {coins} coins. You must choose two cards to turn back to the deck."
-
-        "Here are previous game histories. You need to analyze this history and make the best decision\n"
-        f"{game_history}"
     )
 
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
+    choose_exchange_model = tool_model(
+        model_name_for(player), choose_exchange_cards_tool, (tuple(card_names), tuple(card_names))
     )
-
-    choose_exchange_cards_function[0]["function"]["parameters"]["properties"]["first"]["enum"] = card_names
-    choose_exchange_cards_function[0]["function"]["parameters"]["properties"]["second"]["enum"] = card_names
-    choose_exchange_model = model.bind_tools(choose_exchange_cards_function, tool_choice="choose_exchange_card")
-    messages = [SystemMessage(prompt)]
-    tool_call = choose_exchange_model.invoke(messages).tool_calls
+    messages = decision_messages(player, game_history, prompt)
+    tool_call = yield ToolModelCall(choose_exchange_model, messages, session=conversation_session(player))
 
     first_card_name = tool_call[0]['args']['first']
     second_card_name = tool_call[0]['args']['second']
@@ -425,103 +642,153 @@ def choose_exchange_cards(player: BasePlayer, exchange_cards: List[Card], game_h
     return first_card, second_card
 
 
-def validate_action_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
+def choose_exchange_cards(
+        player: BasePlayer, exchange_cards: List[Card], game_history: GameHistory
+) -> Tuple[Card, Card]:
+    return run_tool_steps(_choose_exchange_cards(player, exchange_cards, game_history))
+
+
+async def achoose_exchange_cards(
+        player: BasePlayer, exchange_cards: List[Card], game_history: GameHistory
+) -> Tuple[Card, Card]:
+    return await arun_tool_steps(_choose_exchange_cards(player, exchange_cards, game_history))
+
+
+def validate_action_node(state: ChooseActionGraphState) -> dict:
     """Validates the selected action and target player."""
-    return state
+    return {}
 
 
 def validate_action(state: ChooseActionGraphState) -> bool:
-    """Gets the target player object from the selected target name."""
+    """Checks that an action was selected, with one of the other players as its target if it needs one."""
     selected_action = state.selected_action
-    selected_target_name = str(state.selected_target)
-    other_players = state.other_players
-    selected_target = next((player for player in other_players if str(player) == selected_target_name), None)
 
     is_valid = selected_action is not None and (
-        selected_target is not None if selected_action.requires_target else True)
+        state.selected_target in state.other_player_names if selected_action.requires_target else True)
 
     return is_valid
 
 
-def parse_action_node(state: ChooseActionGraphState) -> ChooseActionGraphState:
-    return state
+def parse_action_node(state: ChooseActionGraphState) -> dict:
+    return {}
 
 
-def generate_message(player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer], game_history: GameHistory) -> str:
-    game_history = game_history_to_str(game_history)
-    prompt = ""
+def narration_moment(
+        action: Action | CounterAction | str, target_player: Optional[BasePlayer]
+) -> Optional[Tuple[str, str]]:
+    """What a player says something about, and how they are asked for it"""
     if isinstance(action, IncomeAction) or isinstance(action, ForeignAidAction) or isinstance(action, TaxAction) or isinstance(action, ExchangeAction):
-        prompt = (
-            f"You are professional coup game player called {player}. It is your turn and you make decision to preceed with {str(action)}\n"    
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say while you proceed the action."
-        )
+        return f"It is your turn and you make decision to preceed with {str(action)}", " while you proceed the action."
 
     elif isinstance(action, CoupAction) or isinstance(action, AssassinateAction) or isinstance(action, StealAction):
-        prompt = (
-            f"You are professional coup game player called {player}. It is your turn and you make decision to preceed with {str(action)} targeted to {target_player}\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say while you proceed the action."
+        return (
+            f"It is your turn and you make decision to preceed with {str(action)} targeted to {target_player}",
+            " while you proceed the action.",
         )
 
     elif isinstance(action, CounterAction):
-        prompt = (
-            f"You are professional coup game player called {player}. You make decision to counter the action of {target_player}\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say while you proceed."
-        )
+        return f"You make decision to counter the action of {target_player}", " while you proceed."
 
     elif action == "challenge":
-        prompt = (
-            f"You are professional coup game player called {player}. You are now challenging the action of {target_player}\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say."
-        )
+        return f"You are now challenging the action of {target_player}", "."
 
     elif action == "challenge_failed":
-        prompt = (
-            f"You are professional coup game player called {player}. You make decision to challenge the action of {target_player}, but challenge has been failed.\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say."
-        )
+        return f"You make decision to challenge the action of {target_player}, but challenge has been failed.", "."
 
     elif action == "challenge_succeed":
-        prompt = (
-            f"You are professional coup game player called {player}. You got challenged from other player and have failed cause you bluffed\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say."
-        )
+        return "You got challenged from other player and have failed cause you bluffed", "."
 
     elif action == "defeated":
-        prompt = (
-            f"You are professional coup game player called {player}. But you defeated from the game\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say."
-        )
+        return "But you defeated from the game", "."
 
     elif action == "survival":
-        prompt = (
-            f"You are professional coup game player called {player}. You finally become the last survival of the game\n"
-            "Here are previous game histories.\n"
-            f"{game_history}"
-            "\n\n\nPlease generate message to say."
-        )
+        return "You finally become the last survival of the game", "."
 
-    model = ChatOpenAI(
-        model="gpt-4o-2024-08-06",
-    )
+    return None
+
+
+def _pass_message_text(on_text: Callable[[str], None], args: Dict[str, Any]) -> None:
+    on_text(args.get("message", ""))
 
-    generate_message_model = model.bind_tools(generate_message_function, tool_choice="generate_message")
-    messages = [SystemMessage(prompt)]
-    tool_call = generate_message_model.invoke(messages).tool_calls
+
+def _generate_message(
+        player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer],
+        game_history: GameHistory, on_text: Optional[Callable[[str], None]] = None,
+) -> ToolSteps[str]:
+    prompt = ""
+    closing = ""
+    moment = narration_moment(action, target_player)
+    if moment is not None:
+        situation, request = moment
+        prompt = f"You are professional coup game player called {player}. {situation}\n"
+        closing = f"\n\n\nPlease generate message to say{request}"
+
+    on_partial = partial(_pass_message_text, on_text) if on_text is not None else None
+    generate_message_model = tool_model(model_name_for(player), generate_message_tool, stream_usage=on_text is not None)
+    messages = decision_messages(player, game_history, prompt, NARRATION_HISTORY_INTRO, closing)
+    tool_call = yield ToolModelCall(
+        generate_message_model, messages, Priority.narration, conversation_session(player), on_partial
+    )
 
     message = tool_call[0]['args']['message']
 
     return message
+
+
+def generate_message(
+        player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer],
+        game_history: GameHistory, on_text: Optional[Callable[[str], None]] = None,
+) -> str:
+    return run_tool_steps(_generate_message(player, action, target_player, game_history, on_text))
+
+
+async def agenerate_message(
+        player: BasePlayer, action: Action | CounterAction | str, target_player: Optional[BasePlayer],
+        game_history: GameHistory, on_text: Optional[Callable[[str], None]] = None,
+) -> str:
+    return await arun_tool_steps(_generate_message(player, action, target_player, game_history, on_text))
+
+
+def _generate_turn_messages(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]], game_history: GameHistory
+) -> ToolSteps[List[Tuple[str, str]]]:
+    speakers = list(dict.fromkeys(str(player) for player, _, _ in moments))
+    moment_lines = []
+    for number, (player, action, target_player) in enumerate(moments, start=1):
+        moment = narration_moment(action, target_player)
+        if moment is not None:
+            moment_lines.append(f"{number}. {player}: {moment[0]}")
+
+    moments_text = "\n".join(moment_lines)
+    prompt = (
+        "You are voicing the players of a coup game. This turn, these players have something to say, each moment "
+        f"told as if to its player:\n{moments_text}\n"
+    )
+    closing = (
+        "\n\n\nPlease generate one message for every moment, in the same order, to be said by its player."
+    )
+
+    generate_turn_messages_model = tool_model(
+        model_name_for(moments[0][0]), generate_turn_messages_tool, (tuple(speakers),)
+    )
+    recent_turns = turns_to_str(game_history.recent(NARRATION_RECENT_TURNS))
+    messages = [SystemMessage(f"{prompt}{NARRATION_HISTORY_INTRO}{recent_turns}{closing}")]
+    tool_call = yield ToolModelCall(generate_turn_messages_model, messages, Priority.narration)
+
+    return [
+        (line['player'], line['message'])
+        for line in tool_call[0]['args']['messages']
+        if line.get('player') in speakers
+    ]
+
+
+def generate_turn_messages(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]], game_history: GameHistory
+) -> List[Tuple[str, str]]:
+    return run_tool_steps(_generate_turn_messages(moments, game_history))
+
+
+async def agenerate_turn_messages(
+        moments: List[Tuple[BasePlayer, Action | CounterAction | str, Optional[BasePlayer]]], game_history: GameHistory
+) -> List[Tuple[str, str]]:
+    return await arun_tool_steps(_generate_turn_messages(moments, game_history))
@@ -0,0 +1,254 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from enum import Enum
+from typing import Awaitable, Callable, Deque, Dict, List, TypeVar
+
+from pydantic import BaseModel
+
+from .scheduler import AbandonableCalls, abandonable
+
+T = TypeVar("T")
+
+# First pause between two attempts, doubled after every failed attempt
+BASE_BACKOFF_SECONDS = 0.5
+MAX_FALLBACK_RECORDS = 1000
+
+# LLM calls run on these workers, so a decision can give up on a call that never returns
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_DECISION_WORKERS", 64)), thread_name_prefix="llm-decision"
+)
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a model after repeated failures, and tries again after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CircuitState.closed
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == CircuitState.closed:
+                return True
+            if self._state == CircuitState.open and time.monotonic() - self._opened_at >= self._reset_timeout:
+                # Let a single trial call through
+                self._state = CircuitState.half_open
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CircuitState.closed
+            self._consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == CircuitState.half_open or self._consecutive_failures >= self._failure_threshold:
+                self._state = CircuitState.open
+                self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """The trial call was dropped before reaching the model, so the next request may try instead"""
+        with self._lock:
+            if self._state == CircuitState.half_open:
+                self._state = CircuitState.open
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model_name: str) -> CircuitBreaker:
+    with _circuit_breakers_lock:
+        if model_name not in _circuit_breakers:
+            _circuit_breakers[model_name] = CircuitBreaker()
+        return _circuit_breakers[model_name]
+
+
+class FallbackRecord(BaseModel):
+    player: str
+    decision: str
+    reason: str
+    timestamp: float
+
+
+class FallbackLog:
+    """Keeps count of every decision that fell back to the local policy"""
+
+    def __init__(self, max_records: int = MAX_FALLBACK_RECORDS):
+        self._lock = threading.Lock()
+        self._records: Deque[FallbackRecord] = deque(maxlen=max_records)
+        self._counts: Counter = Counter()
+
+    def record(self, player: str, decision: str, reason: str) -> None:
+        with self._lock:
+            self._records.append(
+                FallbackRecord(player=player, decision=decision, reason=reason, timestamp=time.time())
+            )
+            self._counts[decision] += 1
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    @property
+    def records(self) -> List[FallbackRecord]:
+        """The most recent fallbacks, oldest first"""
+        with self._lock:
+            return list(self._records)
+
+
+fallback_log = FallbackLog()
+
+
+def _call_abandonable(calls: AbandonableCalls, llm_call: Callable[[], T]) -> T:
+    with abandonable(calls):
+        return llm_call()
+
+
+async def _acall_abandonable(calls: AbandonableCalls, llm_call: Callable[[], Awaitable[T]]) -> T:
+    with abandonable(calls):
+        return await llm_call()
+
+
+def _deadline_exceeded(calls: AbandonableCalls, circuit_breaker: CircuitBreaker) -> str:
+    """Give up on the calls, blaming the model only if a request to it was taking too long"""
+    if calls.abandon():
+        circuit_breaker.record_failure()
+        return "deadline exceeded"
+    circuit_breaker.release_trial()
+    return "deadline exceeded waiting for the rate limit"
+
+
+def decide_with_deadline(
+    decision: str,
+    player_name: str,
+    llm_call: Callable[[], T],
+    fallback: Callable[[], T],
+    model_name: str,
+    deadline: float,
+    max_retries: int,
+    is_valid: Callable[[T], bool] = lambda result: result is not None,
+) -> T:
+    """Make a decision with the LLM within the deadline, or with the fallback policy.
+
+    Failed or invalid answers are retried with exponential backoff while time is left. Once the
+    deadline has passed, calls still waiting for the scheduler are dropped; a request already sent
+    runs to completion and its answer is ignored.
+    """
+    circuit_breaker = get_circuit_breaker(model_name)
+    expires_at = time.monotonic() + deadline
+    reason = "circuit open"
+    attempt = 0
+
+    while circuit_breaker.allow_request():
+        calls = AbandonableCalls()
+        # Run in a copy of the caller's context, so settings like the call priority carry over
+        future = _executor.submit(contextvars.copy_context().run, _call_abandonable, calls, llm_call)
+        try:
+            result = future.result(timeout=max(expires_at - time.monotonic(), 0))
+        except FutureTimeoutError:
+            reason = _deadline_exceeded(calls, circuit_breaker)
+            break
+        except Exception as e:
+            circuit_breaker.record_failure()
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            if is_valid(result):
+                circuit_breaker.record_success()
+                return result
+            circuit_breaker.record_failure()
+            reason = "invalid answer"
+
+        attempt += 1
+        if attempt > max_retries:
+            break
+        backoff = _backoff_seconds(attempt)
+        if time.monotonic() + backoff >= expires_at:
+            reason = f"{reason} (no time left to retry)"
+            break
+        time.sleep(backoff)
+
+    fallback_log.record(player=player_name, decision=decision, reason=reason)
+    return fallback()
+
+
+async def adecide_with_deadline(
+    decision: str,
+    player_name: str,
+    llm_call: Callable[[], Awaitable[T]],
+    fallback: Callable[[], T],
+    model_name: str,
+    deadline: float,
+    max_retries: int,
+    is_valid: Callable[[T], bool] = lambda result: result is not None,
+) -> T:
+    """Like `decide_with_deadline`, for an async LLM call. A call that runs out of time is cancelled"""
+    circuit_breaker = get_circuit_breaker(model_name)
+    expires_at = time.monotonic() + deadline
+    reason = "circuit open"
+    attempt = 0
+
+    while circuit_breaker.allow_request():
+        calls = AbandonableCalls()
+        call = asyncio.ensure_future(_acall_abandonable(calls, llm_call))
+        try:
+            await asyncio.wait({call}, timeout=max(expires_at - time.monotonic(), 0))
+        except asyncio.CancelledError:
+            call.cancel()
+            circuit_breaker.release_trial()
+            raise
+        if not call.done():
+            reason = _deadline_exceeded(calls, circuit_breaker)
+            call.cancel()
+            break
+        try:
+            result = call.result()
+        except Exception as e:
+            circuit_breaker.record_failure()
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            if is_valid(result):
+                circuit_breaker.record_success()
+                return result
+            circuit_breaker.record_failure()
+            reason = "invalid answer"
+
+        attempt += 1
+        if attempt > max_retries:
+            break
+        backoff = _backoff_seconds(attempt)
+        if time.monotonic() + backoff >= expires_at:
+            reason = f"{reason} (no time left to retry)"
+            break
+        await asyncio.sleep(backoff)
+
+    fallback_log.record(player=player_name, decision=decision, reason=reason)
+    return fallback()
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return BASE_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
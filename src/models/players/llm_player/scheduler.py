@@ -0,0 +1,460 @@
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel
+
+# Fraction of the per-minute budget that may be spent in a single burst
+BURST_FRACTION = 1 / 6
+
+
+class Priority(IntEnum):
+    """Lower values are served first"""
+
+    decision = 0
+    narration = 1
+    speculation = 2
+
+
+# Lowers the priority of every call made in the current context, e.g. for background work
+_priority_floor: ContextVar[Priority] = ContextVar("priority_floor", default=Priority.decision)
+
+
+@contextmanager
+def lowered_priority(priority: Priority) -> Iterator[None]:
+    token = _priority_floor.set(priority)
+    try:
+        yield
+    finally:
+        _priority_floor.reset(token)
+
+
+class CallAbandoned(Exception):
+    """The decision an LLM call was made for gave up on it before it was admitted"""
+
+
+class AbandonableCalls:
+    """The LLM calls made for one decision, so it can stop the ones not made yet when it gives up"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._abandoned = False
+        self._in_flight = 0
+        self._waiters: List["_Waiter"] = []
+
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned
+
+    def abandon(self) -> bool:
+        """Stop admitting the calls. Returns whether one of them was being made"""
+        with self._lock:
+            self._abandoned = True
+            waiters, self._waiters = self._waiters, []
+            in_flight = self._in_flight > 0
+        for waiter in waiters:
+            waiter.wake()
+        return in_flight
+
+    def _watch(self, waiter: "_Waiter") -> None:
+        with self._lock:
+            if not self._abandoned:
+                self._waiters.append(waiter)
+                return
+        waiter.wake()
+
+    def _admit(self, try_consume: Callable[[], float]) -> float:
+        with self._lock:
+            if self._abandoned:
+                raise CallAbandoned()
+            delay = try_consume()
+            if not delay:
+                self._in_flight += 1
+            return delay
+
+    def _finished(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+_abandonable_calls: ContextVar[Optional[AbandonableCalls]] = ContextVar("abandonable_calls", default=None)
+
+
+def calls_abandoned() -> bool:
+    """Whether the decision the current LLM calls are made for has given up on them"""
+    calls = _abandonable_calls.get()
+    return calls is not None and calls.abandoned
+
+
+@contextmanager
+def abandonable(calls: AbandonableCalls) -> Iterator[None]:
+    """Make the LLM calls of the current context part of `calls`"""
+    token = _abandonable_calls.set(calls)
+    try:
+        yield
+    finally:
+        _abandonable_calls.reset(token)
+
+
+class PriorityStats(BaseModel):
+    requests: int = 0
+    # Calls the rate limit kept waiting at least once
+    throttled: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class SchedulerStats(BaseModel):
+    in_flight: int
+    waiting: int
+    tokens_used: int
+    by_priority: Dict[str, PriorityStats]
+
+
+class _Budget:
+    """Requests-per-minute and tokens-per-minute token buckets for a single process"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._rates = (requests_per_minute / 60, tokens_per_minute / 60)
+        self._capacities = (
+            max(requests_per_minute * BURST_FRACTION, 1),
+            max(tokens_per_minute * BURST_FRACTION, 1),
+        )
+        self._levels = list(self._capacities)
+        self._updated = time.monotonic()
+
+    def _refill(self, levels: List[float], elapsed: float) -> List[float]:
+        return [
+            min(level + rate * elapsed, capacity)
+            for level, rate, capacity in zip(levels, self._rates, self._capacities)
+        ]
+
+    def _take(self, levels: List[float], tokens: int) -> Tuple[List[float], float]:
+        """Take one request and the tokens from the levels, or return how long to wait"""
+        needed = (1, min(tokens, self._capacities[1]))
+        delay = max(
+            (amount - level) / rate if level < amount else 0.0
+            for amount, level, rate in zip(needed, levels, self._rates)
+        )
+        if delay > 0:
+            return levels, delay
+        return [level - amount for level, amount in zip(levels, needed)], 0.0
+
+    def try_consume(self, tokens: int) -> float:
+        now = time.monotonic()
+        self._levels, delay = self._take(self._refill(self._levels, now - self._updated), tokens)
+        self._updated = now
+        return delay
+
+    def adjust_tokens(self, token_delta: int) -> None:
+        """Correct the token bucket once the real usage of a request is known"""
+        self._levels[1] = min(self._levels[1] - token_delta, self._capacities[1])
+
+
+class _SharedBudget(_Budget):
+    """The same budgets, shared by every process that points at the same state file"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, state_path: str):
+        try:
+            import fcntl
+        except ImportError as error:
+            raise ImportError(
+                "Sharing the rate limits through a state file needs fcntl, which this platform doesn't have"
+            ) from error
+
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self._fcntl = fcntl
+        self._state_path = state_path
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, float]]:
+        fcntl = self._fcntl
+        with open(self._state_path, "a+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                content = state_file.read()
+                state = json.loads(content) if content else {
+                    "requests": self._capacities[0],
+                    "tokens": self._capacities[1],
+                    "updated": time.time(),
+                }
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(state))
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def try_consume(self, tokens: int) -> float:
+        with self._locked_state() as state:
+            now = time.time()
+            levels = self._refill([state["requests"], state["tokens"]], now - state["updated"])
+            (state["requests"], state["tokens"]), delay = self._take(levels, tokens)
+            state["updated"] = now
+        return delay
+
+    def adjust_tokens(self, token_delta: int) -> None:
+        with self._locked_state() as state:
+            state["tokens"] = min(state["tokens"] - token_delta, self._capacities[1])
+
+
+class _Usage:
+    def __init__(self):
+        self.total_tokens: Optional[int] = None
+
+    def record(self, usage_metadata: Optional[Dict[str, int]]) -> None:
+        if usage_metadata:
+            self.total_tokens = usage_metadata.get("total_tokens")
+
+
+class _ThreadWaiter:
+    """A call waiting for admission in a thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def wake(self) -> None:
+        self._event.set()
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    def wait(self, timeout: float) -> None:
+        self._event.wait(None if math.isinf(timeout) else timeout)
+
+
+class _LoopWaiter:
+    """A call waiting for admission on an event loop, woken from any thread without holding one"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # The event loop is closed, nobody is waiting anymore
+            pass
+
+    def clear(self) -> None:
+        self._event.clear()
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._event.wait(), None if math.isinf(timeout) else timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+_Waiter = Union[_ThreadWaiter, _LoopWaiter]
+
+
+class LLMScheduler:
+    """Admits LLM calls within a requests/tokens per minute budget and a concurrency cap.
+
+    Waiting calls are served by priority, so the decisions a table is blocked on go
+    before narration. Budgets can be shared across processes through a state file;
+    the concurrency cap always applies per process.
+
+    Only the first call in line is woken: when a call finishes, when the call ahead of it leaves
+    the line, or when enough of the budget has been refilled for it. Calls from an event loop wait
+    on the loop itself, so any number of them can wait without tying up threads.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 30000,
+        max_concurrency: int = 8,
+        state_path: Optional[str] = None,
+    ):
+        if state_path:
+            self._budget = _SharedBudget(requests_per_minute, tokens_per_minute, state_path)
+        else:
+            self._budget = _Budget(requests_per_minute, tokens_per_minute)
+        self._max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple[int, int]] = []
+        self._waiters: Dict[Tuple[int, int], _Waiter] = {}
+        self._tickets = itertools.count()
+        self._in_flight = 0
+        self._tokens_used = 0
+        self._stats = {priority: PriorityStats() for priority in Priority}
+        self._throttled_tickets: Set[Tuple[int, int]] = set()
+
+    def _enqueue(self, priority: Priority, waiter: _Waiter) -> Tuple[int, int]:
+        ticket = (priority.value, next(self._tickets))
+        with self._lock:
+            heapq.heappush(self._waiting, ticket)
+            self._waiters[ticket] = waiter
+        return ticket
+
+    def _wake_first(self) -> None:
+        if self._waiting:
+            self._waiters[self._waiting[0]].wake()
+
+    def _try_admit(
+            self, ticket: Tuple[int, int], estimated_tokens: int, started: float, calls: Optional[AbandonableCalls]
+    ) -> float:
+        """0 once the call is admitted, otherwise how long to wait before trying again unless woken"""
+        with self._lock:
+            if calls is not None and calls.abandoned:
+                raise CallAbandoned()
+            if self._waiting[0] != ticket or self._in_flight >= self._max_concurrency:
+                return math.inf
+            if calls is None:
+                delay = self._budget.try_consume(estimated_tokens)
+            else:
+                delay = calls._admit(lambda: self._budget.try_consume(estimated_tokens))
+            if delay:
+                if ticket not in self._throttled_tickets:
+                    self._throttled_tickets.add(ticket)
+                    self._stats[Priority(ticket[0])].throttled += 1
+                return delay
+
+            heapq.heappop(self._waiting)
+            del self._waiters[ticket]
+            self._throttled_tickets.discard(ticket)
+            self._in_flight += 1
+            waited = time.monotonic() - started
+            stats = self._stats[Priority(ticket[0])]
+            stats.requests += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            self._wake_first()
+            return 0.0
+
+    def _leave(self, ticket: Tuple[int, int]) -> None:
+        """Take a call that gave up waiting out of the line"""
+        with self._lock:
+            if self._waiters.pop(ticket, None) is None:
+                return
+            self._throttled_tickets.discard(ticket)
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._wake_first()
+
+    def _acquire(self, priority: Priority, estimated_tokens: int, calls: Optional[AbandonableCalls]) -> None:
+        waiter = _ThreadWaiter()
+        started = time.monotonic()
+        ticket = self._enqueue(priority, waiter)
+        if calls is not None:
+            calls._watch(waiter)
+        try:
+            while True:
+                # Cleared before trying, so a wake up in between isn't lost
+                waiter.clear()
+                delay = self._try_admit(ticket, estimated_tokens, started, calls)
+                if not delay:
+                    return
+                waiter.wait(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    async def _aacquire(self, priority: Priority, estimated_tokens: int, calls: Optional[AbandonableCalls]) -> None:
+        waiter = _LoopWaiter(asyncio.get_running_loop())
+        started = time.monotonic()
+        ticket = self._enqueue(priority, waiter)
+        if calls is not None:
+            calls._watch(waiter)
+        try:
+            while True:
+                waiter.clear()
+                delay = self._try_admit(ticket, estimated_tokens, started, calls)
+                if not delay:
+                    return
+                await waiter.wait(delay)
+        except BaseException:
+            self._leave(ticket)
+            raise
+
+    def _release(self, estimated_tokens: int, usage: _Usage, calls: Optional[AbandonableCalls] = None) -> None:
+        if calls is not None:
+            calls._finished()
+        with self._lock:
+            self._in_flight -= 1
+            used_tokens = estimated_tokens if usage.total_tokens is None else usage.total_tokens
+            self._tokens_used += used_tokens
+            if used_tokens != estimated_tokens:
+                self._budget.adjust_tokens(used_tokens - estimated_tokens)
+            self._wake_first()
+
+    @contextmanager
+    def slot(self, priority: Priority, estimated_tokens: int) -> Iterator[_Usage]:
+        """Wait for permission to make one LLM call, and record its real token usage.
+
+        Raises `CallAbandoned` once the decision the call is made for has given up on it.
+        """
+        priority = max(priority, _priority_floor.get())
+        calls = _abandonable_calls.get()
+        self._acquire(priority, estimated_tokens, calls)
+        usage = _Usage()
+        try:
+            yield usage
+        finally:
+            self._release(estimated_tokens, usage, calls)
+
+    @asynccontextmanager
+    async def aslot(self, priority: Priority, estimated_tokens: int) -> AsyncIterator[_Usage]:
+        """Like `slot`, waiting for admission on the event loop"""
+        priority = max(priority, _priority_floor.get())
+        calls = _abandonable_calls.get()
+        await self._aacquire(priority, estimated_tokens, calls)
+        usage = _Usage()
+        try:
+            yield usage
+        finally:
+            self._release(estimated_tokens, usage, calls)
+
+    def stats(self) -> SchedulerStats:
+        with self._lock:
+            return SchedulerStats(
+                in_flight=self._in_flight,
+                waiting=len(self._waiting),
+                tokens_used=self._tokens_used,
+                by_priority={
+                    priority.name: stats.model_copy() for priority, stats in self._stats.items()
+                },
+            )
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def configure_llm_scheduler(**settings) -> LLMScheduler:
+    """Replace the process-wide scheduler, e.g. with the limits of a different account tier"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = LLMScheduler(**settings)
+        return _scheduler
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Returns the process-wide scheduler, configured from the environment on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500)),
+                tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", 30000)),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+                state_path=os.getenv("LLM_RATE_LIMIT_STATE_FILE"),
+            )
+        return _scheduler
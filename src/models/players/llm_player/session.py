@@ -0,0 +1,140 @@
+import json
+import threading
+from enum import Enum
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolCall,
+)
+
+from .scheduler import calls_abandoned
+from src.models.game_history import GameHistory, HistoryRecord
+
+DEFAULT_WINDOW = 8
+
+
+class SessionReset(str, Enum):
+    # Start a new conversation with every game
+    game = "game"
+    # Keep one conversation across games, earlier games only live on in the window
+    never = "never"
+
+
+class SessionCompaction(str, Enum):
+    # Forget the oldest messages once the window is full
+    drop = "drop"
+    # Also restate what is known about every player, in place of the forgotten turns
+    summary = "summary"
+
+
+class _PendingRequest(NamedTuple):
+    """The conversation as it becomes once the request is answered"""
+    system: SystemMessage
+    messages: List[BaseMessage]
+    turns_sent: int
+
+
+class ConversationSession:
+    """The running conversation of one LLM player with its model.
+
+    The first call sends the game so far. Every later call only sends the turns finished since
+    the previous call, and the turn in progress, while the earlier calls and answers stay in a
+    window of recent messages. A call costs about the same at any point of the game, so the
+    prompt tokens of a game grow linearly with its length instead of quadratically.
+
+    A request only becomes part of the conversation once its answer is recorded, so a call that
+    fails or runs out of time leaves the conversation as it was.
+    """
+
+    def __init__(
+            self,
+            window: int = DEFAULT_WINDOW,
+            compaction: SessionCompaction = SessionCompaction.drop,
+            summarize: Optional[Callable[[], str]] = None,
+    ):
+        self._window = window
+        self._compaction = compaction
+        self._summarize = summarize
+        self._lock = threading.Lock()
+        self._system: Optional[SystemMessage] = None
+        self._messages: List[BaseMessage] = []
+        # Finished turns already sent. The turn in progress is sent again until it is finished
+        self._turns_sent = 0
+        # Requests waiting for their answer, by their last message
+        self._pending: Dict[int, _PendingRequest] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._system = None
+            self._messages = []
+            self._turns_sent = 0
+            self._pending = {}
+
+    def request(
+            self,
+            game_history: GameHistory,
+            instruction: str,
+            context: Callable[[], str],
+            format_turns: Callable[[List[HistoryRecord]], str],
+    ) -> List[BaseMessage]:
+        """The messages of the next call: the conversation so far, then what happened since and the instruction"""
+        with self._lock:
+            system = self._system
+            messages = list(self._messages)
+            turns_sent = self._turns_sent
+            if len(game_history) < turns_sent:
+                # A new game has started in the same conversation
+                turns_sent = 0
+                messages.append(HumanMessage("A new game has started."))
+
+            if system is None:
+                system = SystemMessage(f"Here are previous game histories.\n{context()}")
+                messages.append(HumanMessage(instruction))
+            else:
+                events = format_turns(game_history.recent(len(game_history) - turns_sent))
+                messages.append(HumanMessage(f"Since your last decision:\n{events}\n{instruction}"))
+
+            system, messages = self._compacted(system, messages)
+            self._pending[id(messages[-1])] = _PendingRequest(system, messages, self._finished_turns(game_history))
+            return [system, *messages]
+
+    def record_answer(self, messages: List[BaseMessage], tool_call: ToolCall) -> None:
+        """Add the request and the model's answer to the conversation, so later calls see what it decided.
+
+        An answer is left out once the conversation has moved on without it: when another request
+        was answered first, the session was reset, or the decision gave up waiting for it.
+        """
+        if calls_abandoned():
+            return
+        with self._lock:
+            pending = self._pending.get(id(messages[-1]))
+            if pending is None or pending.messages[-1] is not messages[-1]:
+                return
+            answer = AIMessage(f"{tool_call['name']}: {json.dumps(tool_call['args'])}")
+            self._system, self._messages = self._compacted(pending.system, [*pending.messages, answer])
+            self._turns_sent = pending.turns_sent
+            self._pending = {}
+
+    @staticmethod
+    def _finished_turns(game_history: GameHistory) -> int:
+        """The last turn is still being played unless its final state has been recorded"""
+        latest_turns = game_history.recent(1)
+        if latest_turns and latest_turns[0].final_state is None:
+            return len(game_history) - 1
+        return len(game_history)
+
+    def _compacted(
+            self, system: SystemMessage, messages: List[BaseMessage]
+    ) -> Tuple[SystemMessage, List[BaseMessage]]:
+        if len(messages) <= self._window:
+            return system, messages
+        messages = messages[len(messages) - self._window:]
+        if self._compaction == SessionCompaction.summary and self._summarize is not None:
+            system = SystemMessage(
+                f"Earlier turns have been left out. {self._summarize()}"
+            )
+        return system, messages
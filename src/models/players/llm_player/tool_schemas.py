@@ -0,0 +1,42 @@
+"""Tool schemas filled in with the choices of a decision, built once per distinct set of choices.
+
+The tool definitions in `nodes` are templates with empty `enum` lists. Filling those in place before
+every call raced between decisions made at the same time, and rebuilt the schema every time. A
+template is frozen as JSON instead, and every distinct set of choices gets a schema of its own.
+"""
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+# Distinct sets of choices kept, e.g. the target lists of every table a server hosts
+SCHEMA_CACHE_SIZE = 4096
+
+
+class ToolTemplate(NamedTuple):
+    """A tool schema frozen as JSON, with the `enum` lists that are filled in per decision"""
+    name: str
+    schema_json: str
+    # Path of every filled in property, from the tool's parameter properties
+    enum_paths: Tuple[Tuple[str, ...], ...] = ()
+
+
+def tool_template(schema: List[Dict[str, Any]], *enum_paths: Tuple[str, ...]) -> ToolTemplate:
+    return ToolTemplate(schema[0]["function"]["name"], json.dumps(schema), enum_paths)
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def tool_schema(template: ToolTemplate, choices: Tuple[Tuple[str, ...], ...] = ()) -> List[Dict[str, Any]]:
+    """The template with the choices in its `enum` lists, in the order of its paths.
+
+    The schema is shared by every call with the same choices, it must not be changed.
+    """
+    if len(choices) != len(template.enum_paths):
+        raise ValueError(f"{template.name} takes {len(template.enum_paths)} lists of choices, got {len(choices)}")
+
+    schema = json.loads(template.schema_json)
+    for path, values in zip(template.enum_paths, choices):
+        node = schema[0]["function"]["parameters"]["properties"]
+        for key in path:
+            node = node[key]
+        node["enum"] = list(values)
+    return schema
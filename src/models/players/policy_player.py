@@ -0,0 +1,72 @@
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.action import Action, get_counter_action
+from src.models.deck import CARD_TYPE_INDEX
+from src.models.players.ai import AIPlayer
+from src.models.players.base import BasePlayer
+from src.policies.batched import ACTIONS, BatchedPolicy, ObservationBatch, make_policy
+from src.utils.print import print_text
+
+if TYPE_CHECKING:
+    from src.handler.game_handler import ResistanceCoupGameHandler
+
+
+class PolicyPlayer(AIPlayer):
+    """Plays with a batched policy from `src.policies.batched`, one decision at a time.
+
+    Simulations can evaluate the same policy for many games in a single call instead.
+    """
+
+    policy_name: str = "card_counting"
+    policy_params: Dict[str, Any] = {}
+
+    def __init__(self, name: str, game_handler: 'ResistanceCoupGameHandler', **data):
+        super().__init__(name=name, game_handler=game_handler, **data)
+        self._policy: BatchedPolicy = make_policy(self.policy_name, **self.policy_params)
+        self._rng = np.random.default_rng()
+
+    def _observe(self, other_players: Optional[List[BasePlayer]] = None) -> ObservationBatch:
+        if other_players is None:
+            other_players = [
+                player for player in self._game_handler.get_active_players() if player is not self
+            ]
+        return ObservationBatch.from_players(
+            self, other_players, self._game_handler.get_belief_tracker().discard_counts()
+        )
+
+    def choose_action(self, other_players: List[BasePlayer]) -> Tuple[Action, Optional[BasePlayer]]:
+        """Choose the next action to perform"""
+
+        message = f"[bold magenta]{self}[/] is thinking..."
+        print_text(message, with_markup=True)
+        self._game_handler.log_message(message)
+        time.sleep(self.think_time)
+
+        actions, targets = self._policy.choose_actions(self._observe(other_players), self._rng)
+        target_action = ACTIONS[actions[0]].model_copy()
+        target_player = other_players[targets[0]] if target_action.requires_target else None
+        return target_action, target_player
+
+    def determine_challenge(self, player: BasePlayer) -> bool:
+        """Choose whether to challenge the current player"""
+
+        claim = self._game_handler.get_pending_claim()
+        if claim is None or claim.associated_card_type is None:
+            return super().determine_challenge(player)
+
+        claimed_cards = np.array([CARD_TYPE_INDEX[claim.associated_card_type]])
+        return bool(self._policy.challenge(self._observe(), claimed_cards, self._rng)[0])
+
+    def determine_counter(self, player: BasePlayer) -> bool:
+        """Choose whether to counter the current player's action"""
+
+        current_action = self._game_handler.get_current_action()
+        if current_action is None or not current_action.can_be_countered:
+            return super().determine_counter(player)
+
+        counter = get_counter_action(current_action.action_type)
+        counter_cards = np.array([CARD_TYPE_INDEX[counter.associated_card_type]])
+        return bool(self._policy.counter(self._observe(), counter_cards, self._rng)[0])
@@ -0,0 +1,58 @@
+import importlib
+from importlib.metadata import entry_points
+from typing import Callable, Dict, List, Union
+
+from src.models.players.base import BasePlayer
+
+# Third party strategies register themselves under this entry point group
+ENTRY_POINT_GROUP = "coup.strategies"
+
+# Strategies are referenced by import path, so only the selected ones are ever imported
+_strategies: Dict[str, Union[str, Callable[..., BasePlayer]]] = {
+    "human": "src.models.players.human:HumanPlayer",
+    "ai": "src.models.players.ai:AIPlayer",
+    "llm": "src.models.players.llm_player.llm_player:LLMPlayer",
+    "cfr": "src.models.players.cfr_player:CFRPlayer",
+    "policy": "src.models.players.policy_player:PolicyPlayer",
+    "learned": "src.models.players.learned_player:LearnedPlayer",
+}
+_entry_points_loaded = False
+
+
+class UnknownStrategyError(KeyError):
+    pass
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        _strategies.setdefault(entry_point.name, entry_point.value)
+
+
+def register_strategy(name: str, strategy: Union[str, Callable[..., BasePlayer]]) -> None:
+    """Register a player class, or the "module:attribute" path to one, under a name"""
+    _strategies[name] = strategy
+
+
+def available_strategies() -> List[str]:
+    _load_entry_points()
+    return sorted(_strategies)
+
+
+def resolve_strategy(name: str) -> Callable[..., BasePlayer]:
+    """Returns the player class registered under the name, importing it on first use"""
+    _load_entry_points()
+    if name not in _strategies:
+        raise UnknownStrategyError(
+            f"Unknown strategy '{name}', available strategies: {', '.join(available_strategies())}"
+        )
+
+    strategy = _strategies[name]
+    if isinstance(strategy, str):
+        module_name, _, attribute = strategy.partition(":")
+        strategy = getattr(importlib.import_module(module_name), attribute)
+        _strategies[name] = strategy
+    return strategy
@@ -0,0 +1,99 @@
+import json
+import tomllib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, model_validator
+
+HUMAN_STRATEGY = "human"
+
+
+class SeatSpec(BaseModel):
+    strategy: str
+    name: Optional[str] = None
+    count: int = 1
+    # Passed on to the player class, e.g. `model_name` for LLM players or `think_time` for AI players
+    params: Dict[str, Any] = {}
+    # Name of the strategy in stats and ratings, defaults to the strategy and its params
+    label: Optional[str] = None
+
+    @property
+    def display_label(self) -> str:
+        if self.label:
+            return self.label
+        if not self.params:
+            return self.strategy
+        params = ";".join(f"{key}={value}" for key, value in sorted(self.params.items()))
+        return f"{self.strategy}:{params}"
+
+
+class TableSpec(BaseModel):
+    seats: List[SeatSpec]
+    narration: bool = True
+    # One LLM call for all the table talk of a turn, said once the turn is played
+    batch_narration: bool = False
+    # Print table talk while it is generated. Doesn't apply to batched narration
+    stream_narration: bool = False
+    speculative_decisions: bool = False
+
+    @model_validator(mode="after")
+    def _check_seats(self) -> "TableSpec":
+        # Players are looked up by name, so every seat needs a name of its own
+        if self.number_of_players < 2:
+            raise ValueError(f"A table needs at least 2 seats, got {self.number_of_players}")
+        if sum(seat.count for seat in self.seats if seat.strategy == HUMAN_STRATEGY) > 1:
+            raise ValueError("A table can have at most one human seat")
+        names = [seat.name for seat in self.expanded_seats() if seat.name]
+        if len(names) != len(set(names)):
+            raise ValueError("Every named seat needs a name of its own")
+        return self
+
+    def expanded_seats(self) -> List[SeatSpec]:
+        """One seat per player, with the counts unrolled"""
+        return [
+            seat.model_copy(update={"count": 1})
+            for seat in self.seats
+            for _ in range(seat.count)
+        ]
+
+    @property
+    def number_of_players(self) -> int:
+        return sum(seat.count for seat in self.seats)
+
+    @property
+    def has_human(self) -> bool:
+        return any(seat.strategy == HUMAN_STRATEGY for seat in self.seats)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TableSpec":
+        """Load a table from a .toml or .json file"""
+        file_path = Path(path)
+        if file_path.suffix == ".toml":
+            with file_path.open("rb") as table_file:
+                return cls.model_validate(tomllib.load(table_file))
+        return cls.model_validate(json.loads(file_path.read_text()))
+
+    @classmethod
+    def from_cli_spec(cls, spec: str, **settings) -> "TableSpec":
+        """Parse a spec like `human,llm*2:model_name=gpt-4o-mini,ai*2:think_time=0`.
+
+        Seats are separated by commas, `*n` repeats a seat and `key=value` pairs after a colon
+        (separated by semicolons) are passed on to the player.
+        """
+        seats = []
+        for seat_spec in filter(None, (part.strip() for part in spec.split(","))):
+            head, _, raw_params = seat_spec.partition(":")
+            strategy, _, count = head.partition("*")
+            params = {}
+            for raw_param in filter(None, raw_params.split(";")):
+                key, _, value = raw_param.partition("=")
+                params[key.strip()] = _parse_value(value.strip())
+            seats.append(SeatSpec(strategy=strategy.strip(), count=int(count or 1), params=params))
+        return cls(seats=seats, **settings)
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
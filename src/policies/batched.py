@@ -0,0 +1,210 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from src.models.deck import BASE_COPIES_PER_TYPE, CARD_TYPE_INDEX, CARD_TYPES
+from src.policies.endgame import (
+    ACTIONS,
+    ASSASSINATE,
+    ASSASSINATE_COST,
+    CLAIMED_CARD,
+    COUP,
+    COUP_COST,
+    MUST_COUP_COINS,
+    NUMBER_OF_ACTIONS,
+    STEAL,
+)
+
+# Same odds as `AIPlayer`
+DEFAULT_CHALLENGE_PROBABILITY = 0.2
+DEFAULT_COUNTER_PROBABILITY = 0.1
+
+_REQUIRES_TARGET = np.array([action.requires_target for action in ACTIONS])
+
+
+class ObservationBatch:
+    """What a deciding player sees, for many games at once. Row i is one decision.
+
+    Opponents are padded to the same number of columns, with 0 cards for empty seats.
+    """
+
+    __slots__ = ("coins", "hands", "opponent_coins", "opponent_cards", "cards_seen")
+
+    def __init__(
+            self,
+            coins: np.ndarray,
+            hands: np.ndarray,
+            opponent_coins: np.ndarray,
+            opponent_cards: np.ndarray,
+            cards_seen: Optional[np.ndarray] = None,
+    ):
+        # (n,) coins of the deciding player
+        self.coins = coins
+        # (n, card types) cards of every type in the deciding player's hand
+        self.hands = hands
+        # (n, opponents) coins and number of cards of every opponent
+        self.opponent_coins = opponent_coins
+        self.opponent_cards = opponent_cards
+        # (n, card types) cards the player knows are not in the opponents' hands: their own and discards
+        self.cards_seen = hands.copy() if cards_seen is None else cards_seen
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    @classmethod
+    def from_players(cls, player, other_players, discard_counts: Optional[Dict] = None) -> "ObservationBatch":
+        """A batch of one, for a decision in a running game"""
+        hand = np.zeros((1, len(CARD_TYPES)), dtype=np.int64)
+        for card in player.cards:
+            hand[0, CARD_TYPE_INDEX[card.card_type]] += 1
+        cards_seen = hand.copy()
+        for card_type, count in (discard_counts or {}).items():
+            cards_seen[0, CARD_TYPE_INDEX[card_type]] += count
+
+        return cls(
+            coins=np.array([player.coins]),
+            hands=hand,
+            opponent_coins=np.array([[other_player.coins for other_player in other_players]]),
+            opponent_cards=np.array([[len(other_player.cards) for other_player in other_players]]),
+            cards_seen=cards_seen,
+        )
+
+
+def target_mask(batch: ObservationBatch, actions: np.ndarray) -> np.ndarray:
+    """(n, opponents) which opponents each chosen action can target"""
+    mask = batch.opponent_cards > 0
+    # Can't steal from a player with 0 coins
+    return mask & ~((actions == STEAL)[:, None] & (batch.opponent_coins == 0))
+
+
+def legal_action_mask(batch: ObservationBatch) -> np.ndarray:
+    """(n, actions) the actions every player can take, following `BasePlayer.available_actions`"""
+    mask = np.ones((len(batch), NUMBER_OF_ACTIONS), dtype=bool)
+    mask[:, COUP] = batch.coins >= COUP_COST
+    mask[:, ASSASSINATE] = batch.coins >= ASSASSINATE_COST
+    mask[:, STEAL] = ((batch.opponent_cards > 0) & (batch.opponent_coins > 0)).any(axis=1)
+    mask[:, _REQUIRES_TARGET] &= (batch.opponent_cards > 0).any(axis=1)[:, None]
+
+    # You must coup if you have 10 coins or more
+    must_coup = batch.coins >= MUST_COUP_COINS
+    mask[must_coup] = False
+    mask[must_coup, COUP] = True
+    return mask
+
+
+def sample_masked(weights: np.ndarray, mask: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Sample one column per row, in proportion to the weights, among the allowed columns only"""
+    cumulative = np.cumsum(np.where(mask, weights, 0.0), axis=1)
+    thresholds = rng.random((len(weights), 1)) * cumulative[:, -1:]
+    return np.minimum((cumulative <= thresholds).sum(axis=1), weights.shape[1] - 1)
+
+
+class BatchedPolicy(ABC):
+    """A policy that decides for a whole batch of games with a few array operations"""
+
+    @abstractmethod
+    def action_weights(self, batch: ObservationBatch) -> np.ndarray:
+        """(n, actions) relative weight of every action, illegal ones are masked out afterwards"""
+
+    @abstractmethod
+    def challenge_probabilities(self, batch: ObservationBatch, claimed_cards: np.ndarray) -> np.ndarray:
+        """(n,) chance to challenge a claim of the given card type index"""
+
+    @abstractmethod
+    def counter_probabilities(self, batch: ObservationBatch, counter_cards: np.ndarray) -> np.ndarray:
+        """(n,) chance to counter, claiming the given card type index"""
+
+    def choose_actions(self, batch: ObservationBatch, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Action indices into `ACTIONS` and target opponent columns (-1 for no target)"""
+        actions = sample_masked(self.action_weights(batch), legal_action_mask(batch), rng)
+        targets = sample_masked(
+            np.ones(batch.opponent_cards.shape), target_mask(batch, actions), rng
+        )
+        return actions, np.where(_REQUIRES_TARGET[actions], targets, -1)
+
+    def challenge(self, batch: ObservationBatch, claimed_cards: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return rng.random(len(batch)) < self.challenge_probabilities(batch, claimed_cards)
+
+    def counter(self, batch: ObservationBatch, counter_cards: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return rng.random(len(batch)) < self.counter_probabilities(batch, counter_cards)
+
+
+class RandomPolicy(BatchedPolicy):
+    """The `AIPlayer` heuristics: any legal action, and fixed odds to challenge or counter"""
+
+    def __init__(
+            self,
+            challenge_probability: float = DEFAULT_CHALLENGE_PROBABILITY,
+            counter_probability: float = DEFAULT_COUNTER_PROBABILITY,
+    ):
+        self.challenge_probability = challenge_probability
+        self.counter_probability = counter_probability
+
+    def action_weights(self, batch: ObservationBatch) -> np.ndarray:
+        return np.ones((len(batch), NUMBER_OF_ACTIONS))
+
+    def challenge_probabilities(self, batch: ObservationBatch, claimed_cards: np.ndarray) -> np.ndarray:
+        return np.full(len(batch), self.challenge_probability)
+
+    def counter_probabilities(self, batch: ObservationBatch, counter_cards: np.ndarray) -> np.ndarray:
+        return np.full(len(batch), self.counter_probability)
+
+
+class CardCountingPolicy(BatchedPolicy):
+    """Heuristics driven by the cards a player has seen.
+
+    The chance to challenge grows with the share of copies of the claimed card that are
+    already accounted for: `sigmoid(challenge_bias + challenge_weight * seen / copies)`.
+    Actions and counters backed by a card in hand are preferred over bluffs.
+    """
+
+    def __init__(
+            self,
+            challenge_bias: float = -2.0,
+            challenge_weight: float = 4.0,
+            honest_action_weight: float = 3.0,
+            honest_counter_probability: float = 0.9,
+            bluff_counter_probability: float = 0.05,
+            copies_per_type: int = BASE_COPIES_PER_TYPE,
+    ):
+        self.challenge_bias = challenge_bias
+        self.challenge_weight = challenge_weight
+        self.honest_action_weight = honest_action_weight
+        self.honest_counter_probability = honest_counter_probability
+        self.bluff_counter_probability = bluff_counter_probability
+        self.copies_per_type = copies_per_type
+
+    def action_weights(self, batch: ObservationBatch) -> np.ndarray:
+        weights = np.ones((len(batch), NUMBER_OF_ACTIONS))
+        for action, card in enumerate(CLAIMED_CARD):
+            if card is not None:
+                weights[batch.hands[:, card] > 0, action] = self.honest_action_weight
+        return weights
+
+    def challenge_probabilities(self, batch: ObservationBatch, claimed_cards: np.ndarray) -> np.ndarray:
+        seen = np.take_along_axis(batch.cards_seen, claimed_cards[:, None], axis=1)[:, 0]
+        # Every copy accounted for means the claim has to be a bluff
+        certain_bluff = seen >= self.copies_per_type
+        logits = self.challenge_bias + self.challenge_weight * seen / self.copies_per_type
+        return np.where(certain_bluff, 1.0, 1 / (1 + np.exp(-logits)))
+
+    def counter_probabilities(self, batch: ObservationBatch, counter_cards: np.ndarray) -> np.ndarray:
+        holds_card = np.take_along_axis(batch.hands, counter_cards[:, None], axis=1)[:, 0] > 0
+        return np.where(holds_card, self.honest_counter_probability, self.bluff_counter_probability)
+
+
+POLICIES: Dict[str, Type[BatchedPolicy]] = {
+    "random": RandomPolicy,
+    "card_counting": CardCountingPolicy,
+}
+
+
+def make_policy(name: str, **params) -> BatchedPolicy:
+    if name not in POLICIES:
+        raise KeyError(f"Unknown policy '{name}', available policies: {', '.join(POLICIES)}")
+    return POLICIES[name](**params)
+
+
+def available_policies() -> List[str]:
+    return sorted(POLICIES)
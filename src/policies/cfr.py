@@ -0,0 +1,296 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.policies.endgame import NUMBER_OF_ACTIONS, EndgameState
+
+DEFAULT_POLICY_PATH = "policies/endgame.npz"
+
+# Share of uniform exploration mixed into the sampling policy of the updating player
+EXPLORATION = 0.6
+
+# Probabilities are stored as bytes, in 1/255 steps
+PROBABILITY_SCALE = 255
+
+Table = Dict[int, List[float]]
+
+
+def regret_matching(regrets: Optional[List[float]], legal_actions: List[int]) -> List[float]:
+    """Play every legal action in proportion to its positive regret, uniformly if there is none"""
+    policy = [0.0] * NUMBER_OF_ACTIONS
+    if regrets:
+        positive_total = sum(max(regrets[action], 0.0) for action in legal_actions)
+        if positive_total > 0:
+            for action in legal_actions:
+                policy[action] = max(regrets[action], 0.0) / positive_total
+            return policy
+
+    for action in legal_actions:
+        policy[action] = 1 / len(legal_actions)
+    return policy
+
+
+class OutcomeSamplingCFR:
+    """Monte Carlo CFR with outcome sampling (Lanctot et al., 2009).
+
+    Every iteration plays a single sampled game, so an iteration costs the same however large
+    the game tree is. Regrets and the average policy are kept per information set.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.regrets: Table = {}
+        self.policy_sums: Table = {}
+        self._rng = random.Random(seed)
+
+    def _sample(self, policy: List[float]) -> int:
+        threshold = self._rng.random()
+        cumulative = 0.0
+        for action, probability in enumerate(policy):
+            cumulative += probability
+            if probability and threshold < cumulative:
+                return action
+        return max(range(NUMBER_OF_ACTIONS), key=policy.__getitem__)
+
+    def iterate(self, iterations: int) -> None:
+        for iteration in range(iterations):
+            self._episode(EndgameState.random(self._rng), iteration % 2, 1.0, 1.0, 1.0)
+
+    def _episode(
+            self, state: EndgameState, update_player: int, own_reach: float, other_reach: float, sample_reach: float
+    ) -> float:
+        if state.is_terminal():
+            return state.utility(update_player)
+
+        player = state.current_player
+        key = state.information_set()
+        legal_actions = state.legal_actions()
+        policy = regret_matching(self.regrets.get(key), legal_actions)
+
+        if player == update_player:
+            uniform = 1 / len(legal_actions)
+            sample_policy = [
+                EXPLORATION * uniform + (1 - EXPLORATION) * policy[action] if action in legal_actions else 0.0
+                for action in range(NUMBER_OF_ACTIONS)
+            ]
+        else:
+            sample_policy = policy
+        action = self._sample(sample_policy)
+
+        state.apply(action)
+        if player == update_player:
+            value = self._episode(
+                state, update_player, own_reach * policy[action], other_reach, sample_reach * sample_policy[action]
+            )
+        else:
+            value = self._episode(
+                state, update_player, own_reach, other_reach * policy[action], sample_reach * sample_policy[action]
+            )
+
+        # Only the sampled action has a value estimate, importance weighted by its sampling chance
+        action_value = value / sample_policy[action]
+        state_value = policy[action] * action_value
+
+        if player == update_player:
+            regrets = self.regrets.setdefault(key, [0.0] * NUMBER_OF_ACTIONS)
+            policy_sums = self.policy_sums.setdefault(key, [0.0] * NUMBER_OF_ACTIONS)
+            weight = other_reach / sample_reach
+            for legal_action in legal_actions:
+                counterfactual_value = action_value if legal_action == action else 0.0
+                regrets[legal_action] += weight * (counterfactual_value - state_value)
+                policy_sums[legal_action] += own_reach / sample_reach * policy[legal_action]
+
+        return state_value
+
+
+def _merge_into(table: Table, delta: Table) -> None:
+    for key, values in delta.items():
+        if key in table:
+            table[key] = [value + delta_value for value, delta_value in zip(table[key], values)]
+        else:
+            table[key] = values
+
+
+def _train_batch(regrets: Table, iterations: int, seed: int) -> Tuple[Table, Table]:
+    """Run iterations in a worker, on its own copy of the regrets, and return the ones it updated"""
+    trainer = OutcomeSamplingCFR(seed)
+    trainer.regrets = regrets
+    trainer.iterate(iterations)
+    # A batch updates the regrets and the policy sums of exactly the same information sets
+    return {key: trainer.regrets[key] for key in trainer.policy_sums}, trainer.policy_sums
+
+
+class EndgamePolicy:
+    """The average strategy of a trained CFR run, as a compact table with O(1) lookups"""
+
+    def __init__(self, keys: np.ndarray, probabilities: np.ndarray):
+        self._keys = keys
+        self._probabilities = probabilities
+        self._rows = {int(key): row for row, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @classmethod
+    def from_policy_sums(cls, policy_sums: Table) -> "EndgamePolicy":
+        keys = np.array(sorted(policy_sums), dtype=np.int64)
+        probabilities = np.zeros((len(keys), NUMBER_OF_ACTIONS), dtype=np.uint8)
+        for row, key in enumerate(keys):
+            sums = np.array(policy_sums[int(key)])
+            total = sums.sum()
+            if total > 0:
+                probabilities[row] = np.round(sums / total * PROBABILITY_SCALE)
+        return cls(keys, probabilities)
+
+    def action_probabilities(self, key: int, legal_actions: List[int]) -> List[float]:
+        """Probability of every action in this information set, uniform over the legal ones if unseen"""
+        policy = [0.0] * NUMBER_OF_ACTIONS
+        row = self._rows.get(key)
+        if row is not None:
+            weights = self._probabilities[row]
+            total = sum(int(weights[action]) for action in legal_actions)
+            if total:
+                for action in legal_actions:
+                    policy[action] = int(weights[action]) / total
+                return policy
+
+        for action in legal_actions:
+            policy[action] = 1 / len(legal_actions)
+        return policy
+
+    def sample(self, key: int, legal_actions: List[int], rng: random.Random = random) -> int:
+        policy = self.action_probabilities(key, legal_actions)
+        return rng.choices(range(NUMBER_OF_ACTIONS), weights=policy)[0]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, keys=self._keys, probabilities=self._probabilities)
+
+    @classmethod
+    def load(cls, path: str) -> "EndgamePolicy":
+        with np.load(path) as policy_file:
+            return cls(policy_file["keys"], policy_file["probabilities"])
+
+
+def train(
+        iterations: int, workers: int = 1, batch_iterations: int = 100000, seed: int = 0
+) -> Tuple[EndgamePolicy, Table]:
+    """Train in rounds: every worker runs a batch from the same regrets, then the changes are summed"""
+    if workers <= 1:
+        trainer = OutcomeSamplingCFR(seed)
+        trainer.iterate(iterations)
+        return EndgamePolicy.from_policy_sums(trainer.policy_sums), trainer.regrets
+
+    regrets: Table = {}
+    policy_sums: Table = {}
+    rounds = max(1, iterations // (batch_iterations * workers))
+    no_regrets = [0.0] * NUMBER_OF_ACTIONS
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for training_round in range(rounds):
+            batches = [
+                executor.submit(_train_batch, regrets, batch_iterations, seed + training_round * workers + worker)
+                for worker in range(workers)
+            ]
+            merged_regrets = dict(regrets)
+            for batch in batches:
+                batch_regrets, batch_policy_sums = batch.result()
+                for key, values in batch_regrets.items():
+                    # Add what this batch changed, on top of the changes of the other batches
+                    start_values = regrets.get(key, no_regrets)
+                    merged_values = merged_regrets.get(key, no_regrets)
+                    merged_regrets[key] = [
+                        merged + value - start for merged, value, start in zip(merged_values, values, start_values)
+                    ]
+                _merge_into(policy_sums, batch_policy_sums)
+            regrets = merged_regrets
+
+    return EndgamePolicy.from_policy_sums(policy_sums), regrets
+
+
+class _FixedOpponentCFR(OutcomeSamplingCFR):
+    """Learns a best response: only one player updates, the other always plays a fixed policy"""
+
+    def __init__(self, opponent_policy: EndgamePolicy, responder: int, seed: Optional[int] = None):
+        super().__init__(seed)
+        self._opponent_policy = opponent_policy
+        self._responder = responder
+
+    def iterate(self, iterations: int) -> None:
+        for _ in range(iterations):
+            self._episode(EndgameState.random(self._rng), self._responder, 1.0, 1.0, 1.0)
+
+    def _episode(self, state, update_player, own_reach, other_reach, sample_reach) -> float:
+        if state.is_terminal() or state.current_player == update_player:
+            return super()._episode(state, update_player, own_reach, other_reach, sample_reach)
+
+        # The fixed player's moves are sampled from its policy, so they carry no importance weight
+        legal_actions = state.legal_actions()
+        state.apply(self._opponent_policy.sample(state.information_set(), legal_actions, self._rng))
+        return self._episode(state, update_player, own_reach, other_reach, sample_reach)
+
+
+def _best_response_value(policy: EndgamePolicy, responder: int, iterations: int, games: int, seed: int) -> float:
+    response = _FixedOpponentCFR(policy, responder, seed)
+    response.iterate(iterations)
+    # Against a fixed opponent the action with the most regret is the best reply found so far.
+    # Regrets of illegal actions stay at exactly 0, so they are left out
+    best_response = EndgamePolicy.from_policy_sums({
+        key: [float(value == max(value for value in regrets if value)) if value else 0.0 for value in regrets]
+        for key, regrets in response.regrets.items()
+        if any(regrets)
+    })
+
+    rng = random.Random(seed + 1)
+    total = 0.0
+    for _ in range(games):
+        state = EndgameState.random(rng)
+        while not state.is_terminal():
+            acting_policy = best_response if state.current_player == responder else policy
+            state.apply(acting_policy.sample(state.information_set(), state.legal_actions(), rng))
+        total += state.utility(responder)
+    return total / games
+
+
+def estimate_exploitability(
+        policy: EndgamePolicy, iterations: int = 1_000_000, games: int = 20000, workers: int = 2, seed: int = 1
+) -> float:
+    """How much a best response wins against the policy, averaged over both seats.
+
+    The best response is itself learned by sampling, so this is an estimate (a lower bound)
+    of the exploitability within the abstraction. 0 means the policy can't be beaten.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        values = list(executor.map(
+            _best_response_value, [policy] * 2, [0, 1], [iterations] * 2, [games] * 2, [seed, seed + 1]
+        ))
+    return sum(values) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the heads-up endgame policy with CFR")
+    parser.add_argument("--iterations", type=int, default=2_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-iterations", type=int, default=100000, help="Iterations per worker between merges")
+    parser.add_argument("--output", default=DEFAULT_POLICY_PATH)
+    parser.add_argument("--exploitability-iterations", type=int, default=1_000_000, help="0 to skip the estimate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    policy, _ = train(args.iterations, args.workers, args.batch_iterations, args.seed)
+    policy.save(args.output)
+    print(f"Trained {len(policy)} information sets in {time.perf_counter() - started:.1f}s, saved to {args.output}")
+
+    if args.exploitability_iterations:
+        started = time.perf_counter()
+        exploitability = estimate_exploitability(policy, args.exploitability_iterations, workers=args.workers)
+        print(f"Estimated exploitability: {exploitability:.3f} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""An abstraction of the heads-up endgame, small enough to solve with CFR.
+
+The rules (what each action claims, whether it can be challenged or countered and by which
+card) come from `src.models.action`, and the turn structure follows the game handler:
+an action can be challenged first, then countered, and a counter can be challenged in turn.
+
+To keep the game small, a few things are simplified:
+- a player who wins a challenge keeps the revealed card instead of drawing a new one
+- an exchange keeps the current hand
+- the card to give up when losing influence is picked by a fixed rule (`card_to_lose`)
+- an action whose challenge failed goes through right away, without the chance to counter it,
+  as in the game handler. The full rules would still let the target block an Assassinate or Steal
+
+Players decide on an information set built from their own hand, bucketed coins, the number
+of cards of the opponent and the roles the opponent has claimed.
+"""
+import random
+from typing import List, Optional, Tuple
+
+from src.models.action import (
+    Action,
+    ActionType,
+    AssassinateAction,
+    CoupAction,
+    ExchangeAction,
+    ForeignAidAction,
+    IncomeAction,
+    StealAction,
+    TaxAction,
+    get_counter_action,
+)
+from src.models.beliefs import HAND_SHAPE_INDEX, HAND_SHAPES
+from src.models.card import CardType
+from src.models.deck import BASE_COPIES_PER_TYPE, CARD_TYPE_INDEX, CARD_TYPES
+
+ACTIONS: Tuple[Action, ...] = (
+    IncomeAction(),
+    ForeignAidAction(),
+    CoupAction(),
+    TaxAction(),
+    AssassinateAction(),
+    StealAction(),
+    ExchangeAction(),
+)
+ACTION_INDEX = {action.action_type: ind for ind, action in enumerate(ACTIONS)}
+NUMBER_OF_ACTIONS = len(ACTIONS)
+
+INCOME, FOREIGN_AID, COUP, TAX, ASSASSINATE, STEAL, EXCHANGE = (
+    ACTION_INDEX[action_type]
+    for action_type in (
+        ActionType.income, ActionType.foreign_aid, ActionType.coup, ActionType.tax,
+        ActionType.assassinate, ActionType.steal, ActionType.exchange,
+    )
+)
+
+# Card claimed by every action and by the counter against it, as card type indices
+CLAIMED_CARD: Tuple[Optional[int], ...] = tuple(
+    CARD_TYPE_INDEX[action.associated_card_type] if action.associated_card_type else None
+    for action in ACTIONS
+)
+COUNTER_CARD: Tuple[Optional[int], ...] = tuple(
+    CARD_TYPE_INDEX[get_counter_action(action.action_type).associated_card_type]
+    if action.can_be_countered else None
+    for action in ACTIONS
+)
+CAN_BE_CHALLENGED: Tuple[bool, ...] = tuple(action.can_be_challenged for action in ACTIONS)
+
+COUP_COST = 7
+ASSASSINATE_COST = 3
+MUST_COUP_COINS = 10
+COINS_GAINED = {INCOME: 1, FOREIGN_AID: 2, TAX: 3}
+STEAL_AMOUNT = 2
+
+# Decision points of a turn
+ACT, CHALLENGE_ACTION, COUNTER, CHALLENGE_COUNTER = range(4)
+NUMBER_OF_PHASES = 4
+PASS, RESPOND = 0, 1
+NUMBER_OF_RESPONSES = 2
+
+# Coins are bucketed where the available actions change: 3 to assassinate, 7 to coup, 10 must coup
+COIN_BUCKETS = (0, 1, 2, 3, 3, 4, 4, 5, 5, 5)
+NUMBER_OF_COIN_BUCKETS = 7
+# For the opponent only the threats matter: nothing to steal, assassination, coup, forced coup
+OTHER_COIN_BUCKETS = (0, 1, 1, 2, 2, 2, 2, 3, 3, 3)
+NUMBER_OF_OTHER_COIN_BUCKETS = 5
+
+# Games that drag on longer are scored by the cards left
+MAX_TURNS = 30
+
+# Which card a player gives up first when losing influence, lowest value goes first
+CARD_VALUE = {
+    CARD_TYPE_INDEX[CardType.duke]: 5,
+    CARD_TYPE_INDEX[CardType.contessa]: 4,
+    CARD_TYPE_INDEX[CardType.assassin]: 3,
+    CARD_TYPE_INDEX[CardType.captain]: 2,
+    CARD_TYPE_INDEX[CardType.ambassador]: 1,
+}
+
+
+def coin_bucket(coins: int, buckets: Tuple[int, ...] = COIN_BUCKETS) -> int:
+    return buckets[coins] if coins < MUST_COUP_COINS else buckets[-1] + 1
+
+
+def card_to_lose(hand: Tuple[int, ...]) -> int:
+    """The card given up when losing influence: the least valuable one"""
+    return min(hand, key=CARD_VALUE.__getitem__)
+
+
+def legal_decisions(phase: int, own_coins: int, other_coins: int) -> List[int]:
+    if phase != ACT:
+        return [PASS, RESPOND]
+
+    if own_coins >= MUST_COUP_COINS:
+        return [COUP]
+    actions = [INCOME, FOREIGN_AID, TAX, EXCHANGE]
+    # Can't steal from a player with 0 coins
+    if other_coins:
+        actions.append(STEAL)
+    if own_coins >= ASSASSINATE_COST:
+        actions.append(ASSASSINATE)
+    if own_coins >= COUP_COST:
+        actions.append(COUP)
+    return actions
+
+
+def information_set_key(
+        phase: int,
+        action: int,
+        hand: Tuple[int, ...],
+        own_coins: int,
+        other_coins: int,
+        other_number_of_cards: int,
+        other_claims: int,
+) -> int:
+    """Everything the deciding player knows, packed into one integer"""
+    key = phase
+    key = key * NUMBER_OF_ACTIONS + (action if phase != ACT else 0)
+    key = key * len(HAND_SHAPES) + HAND_SHAPE_INDEX[hand]
+    key = key * NUMBER_OF_COIN_BUCKETS + coin_bucket(own_coins)
+    key = key * NUMBER_OF_OTHER_COIN_BUCKETS + coin_bucket(other_coins, OTHER_COIN_BUCKETS)
+    key = key * 2 + other_number_of_cards - 1
+    key = (key << len(CARD_TYPES)) | other_claims
+    return key
+
+
+class EndgameState:
+    """A heads-up position. Hands are sorted tuples of card type indices"""
+
+    __slots__ = ("hands", "coins", "claims", "actor", "turn", "phase", "action")
+
+    def __init__(
+            self,
+            hands: List[Tuple[int, ...]],
+            coins: List[int],
+            claims: Optional[List[int]] = None,
+            actor: int = 0,
+    ):
+        self.hands = hands
+        self.coins = coins
+        # Bit mask of the card types every player has claimed so far
+        self.claims = claims or [0, 0]
+        self.actor = actor
+        self.turn = 0
+        self.phase = ACT
+        self.action = INCOME
+
+    def copy(self) -> "EndgameState":
+        state = EndgameState(self.hands.copy(), self.coins.copy(), self.claims.copy(), self.actor)
+        state.turn, state.phase, state.action = self.turn, self.phase, self.action
+        return state
+
+    @classmethod
+    def random(cls, rng: random.Random) -> "EndgameState":
+        """A random endgame: 1 or 2 cards each, dealt from a full deck, and a few coins"""
+        deck = [card for card in range(len(CARD_TYPES)) for _ in range(BASE_COPIES_PER_TYPE)]
+        rng.shuffle(deck)
+        hands = []
+        for _ in range(2):
+            number_of_cards = rng.choice((1, 2))
+            hands.append(tuple(sorted(deck.pop() for _ in range(number_of_cards))))
+        coins = [rng.randint(0, 8), rng.randint(0, 8)]
+        claims = [
+            sum(1 << card for card in range(len(CARD_TYPES)) if rng.random() < 0.25) for _ in range(2)
+        ]
+        return cls(hands, coins, claims, actor=rng.randint(0, 1))
+
+    @property
+    def current_player(self) -> int:
+        if self.phase in (CHALLENGE_ACTION, COUNTER):
+            return 1 - self.actor
+        return self.actor
+
+    def is_terminal(self) -> bool:
+        return not self.hands[0] or not self.hands[1] or self.turn >= MAX_TURNS
+
+    def utility(self, player: int) -> float:
+        """+1 for a win and -1 for a loss. Unfinished games are scored by the difference in cards"""
+        own_cards, other_cards = len(self.hands[player]), len(self.hands[1 - player])
+        if not other_cards:
+            return 1.0
+        if not own_cards:
+            return -1.0
+        return (own_cards - other_cards) / 2
+
+    def legal_actions(self) -> List[int]:
+        return legal_decisions(self.phase, self.coins[self.actor], self.coins[1 - self.actor])
+
+    def information_set(self) -> int:
+        """The state as seen by the player to move"""
+        player = self.current_player
+        other = 1 - player
+        return information_set_key(
+            self.phase,
+            self.action,
+            self.hands[player],
+            self.coins[player],
+            self.coins[other],
+            len(self.hands[other]),
+            self.claims[other],
+        )
+
+    def _lose_influence(self, player: int) -> None:
+        hand = list(self.hands[player])
+        hand.remove(card_to_lose(self.hands[player]))
+        self.hands[player] = tuple(hand)
+
+    def _execute(self, blocked: bool = False) -> None:
+        actor, other = self.actor, 1 - self.actor
+        action = self.action
+        if action == ASSASSINATE:
+            # Paid even when blocked
+            self.coins[actor] -= ASSASSINATE_COST
+            if not blocked and self.hands[other]:
+                self._lose_influence(other)
+        elif blocked:
+            pass
+        elif action in COINS_GAINED:
+            self.coins[actor] += COINS_GAINED[action]
+        elif action == STEAL:
+            stolen = min(self.coins[other], STEAL_AMOUNT)
+            self.coins[other] -= stolen
+            self.coins[actor] += stolen
+        self._end_turn()
+
+    def _end_turn(self) -> None:
+        self.turn += 1
+        self.actor = 1 - self.actor
+        self.phase = ACT
+
+    def apply(self, decision: int) -> None:
+        if self.phase == ACT:
+            self._act(decision)
+        elif self.phase == CHALLENGE_ACTION:
+            self._challenge_action(decision)
+        elif self.phase == COUNTER:
+            self._counter(decision)
+        else:
+            self._challenge_counter(decision)
+
+    def _act(self, action: int) -> None:
+        actor, other = self.actor, 1 - self.actor
+        self.action = action
+        if action == COUP:
+            self.coins[actor] -= COUP_COST
+            self._lose_influence(other)
+            self._end_turn()
+            return
+        if CLAIMED_CARD[action] is not None:
+            self.claims[actor] |= 1 << CLAIMED_CARD[action]
+        if CAN_BE_CHALLENGED[action]:
+            self.phase = CHALLENGE_ACTION
+        elif COUNTER_CARD[action] is not None:
+            self.phase = COUNTER
+        else:
+            self._execute()
+
+    def _challenge_action(self, decision: int) -> None:
+        actor, other = self.actor, 1 - self.actor
+        if decision == PASS:
+            if COUNTER_CARD[self.action] is not None:
+                self.phase = COUNTER
+            else:
+                self._execute()
+        elif CLAIMED_CARD[self.action] in self.hands[actor]:
+            # Challenge failed, the action goes through without a chance to counter
+            self._lose_influence(other)
+            self._execute()
+        else:
+            self._lose_influence(actor)
+            self._end_turn()
+
+    def _counter(self, decision: int) -> None:
+        if decision == PASS:
+            self._execute()
+        else:
+            self.claims[1 - self.actor] |= 1 << COUNTER_CARD[self.action]
+            self.phase = CHALLENGE_COUNTER
+
+    def _challenge_counter(self, decision: int) -> None:
+        actor, other = self.actor, 1 - self.actor
+        if decision == PASS:
+            self._execute(blocked=True)
+        elif COUNTER_CARD[self.action] in self.hands[other]:
+            self._lose_influence(actor)
+            self._execute(blocked=True)
+        else:
+            self._lose_influence(other)
+            self._execute()
@@ -0,0 +1,366 @@
+"""A small learned policy, trained on the decisions recorded by `src.stats.training_data`.
+
+One hidden layer is shared by three heads: the action to take, whether to respond (challenge
+or counter) in each response phase, and which opponent to target. Training imitates the
+recorded moves, e.g. those of LLM players to play like them at simulation speed.
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.policies.endgame import ACT, NUMBER_OF_ACTIONS, STEAL
+from src.stats.training_data import (
+    MAX_OPPONENTS,
+    NUMBER_OF_CARD_TYPES,
+    OBSERVATION_COLUMNS,
+    RESPOND,
+    iter_shards,
+    load_manifest,
+    observation_matrix,
+)
+
+DEFAULT_POLICY_PATH = "policies/learned.npz"
+DEFAULT_HIDDEN_SIZE = 32
+
+# One response logit per phase after ACT: CHALLENGE_ACTION, COUNTER, CHALLENGE_COUNTER
+NUMBER_OF_RESPONSE_PHASES = 3
+# Every opponent is scored on its coins, its cards and a bias, with weights per action
+TARGET_FEATURES = 3
+
+_COLUMN = {}
+_offset = 0
+for _name, _, _width in OBSERVATION_COLUMNS:
+    _COLUMN[_name] = np.arange(_offset, _offset + max(_width, 1))
+    _offset += max(_width, 1)
+
+
+def _columns(*names: str) -> np.ndarray:
+    return np.concatenate([_COLUMN[name] for name in names])
+
+
+# Features take a handful of numpy operations over the whole row, since a single decision costs
+# little more than the per-operation overhead. Counts are capped and scaled to [0, 1]
+_SCALED = _columns("coins", "hand", "cards_seen", "opponent_coins", "opponent_cards", "claims", "claimant_claims")
+_CAP = np.concatenate([
+    [10], [2] * NUMBER_OF_CARD_TYPES, [3] * NUMBER_OF_CARD_TYPES,
+    [10] * MAX_OPPONENTS, [2] * MAX_OPPONENTS, [3] * 2 * NUMBER_OF_CARD_TYPES,
+])
+_SCALE = 1 / _CAP
+_THRESHOLD_SOURCE = _columns("coins", "coins", "coins")
+_THRESHOLDS = np.array([3, 7, 10])
+# One-hot codes of the phase, the claimed card and the claimant
+_CODE_SOURCE = np.concatenate([
+    np.repeat(_COLUMN["phase"], NUMBER_OF_RESPONSE_PHASES + 1),
+    np.repeat(_COLUMN["claimed_card"], NUMBER_OF_CARD_TYPES),
+    np.repeat(_COLUMN["claimant"], MAX_OPPONENTS),
+])
+_CODE_VALUES = np.concatenate([
+    np.arange(NUMBER_OF_RESPONSE_PHASES + 1), np.arange(NUMBER_OF_CARD_TYPES), np.arange(MAX_OPPONENTS),
+])
+
+
+def _scaled_range(start: int, width: int) -> np.ndarray:
+    return np.arange(start, start + width)
+
+
+_HAND = _scaled_range(1, NUMBER_OF_CARD_TYPES)
+_CARDS_SEEN = _scaled_range(1 + NUMBER_OF_CARD_TYPES, NUMBER_OF_CARD_TYPES)
+_OPPONENT_COINS = _scaled_range(1 + 2 * NUMBER_OF_CARD_TYPES, MAX_OPPONENTS)
+_OPPONENT_CARDS = _scaled_range(1 + 2 * NUMBER_OF_CARD_TYPES + MAX_OPPONENTS, MAX_OPPONENTS)
+_CLAIMED_CARD_CODES = _scaled_range(NUMBER_OF_RESPONSE_PHASES + 1, NUMBER_OF_CARD_TYPES)
+_CLAIMANT_CODES = _scaled_range(NUMBER_OF_RESPONSE_PHASES + 1 + NUMBER_OF_CARD_TYPES, MAX_OPPONENTS)
+# The claim being responded to: copies of it in hand and accounted for, the claimant's coins
+# and cards. Each is a sum of scaled counts masked by a one-hot code
+_CLAIM_SOURCE = np.concatenate([_HAND, _CARDS_SEEN, _OPPONENT_COINS, _OPPONENT_CARDS])
+_CLAIM_CODES = np.concatenate([_CLAIMED_CARD_CODES, _CLAIMED_CARD_CODES, _CLAIMANT_CODES, _CLAIMANT_CODES])
+_CLAIM_SUMS = np.repeat(np.eye(4), [NUMBER_OF_CARD_TYPES] * 2 + [MAX_OPPONENTS] * 2, axis=0)
+# Coins and cards left to all opponents
+_TOTALS = np.zeros((len(_SCALED), 2))
+_TOTALS[_OPPONENT_COINS, 0] = 1 / MAX_OPPONENTS
+_TOTALS[_OPPONENT_CARDS, 1] = 1 / MAX_OPPONENTS
+
+
+def encode_observations(observations: np.ndarray) -> np.ndarray:
+    """(n, features) model inputs from (n, OBSERVATION_WIDTH) rows laid out like `observe`"""
+    scaled = np.minimum(observations[:, _SCALED], _CAP) * _SCALE
+    codes = observations[:, _CODE_SOURCE] == _CODE_VALUES
+    return np.concatenate([
+        scaled,
+        observations[:, _THRESHOLD_SOURCE] >= _THRESHOLDS,
+        codes,
+        (scaled[:, _CLAIM_SOURCE] * codes[:, _CLAIM_CODES]) @ _CLAIM_SUMS,
+        scaled @ _TOTALS,
+    ], axis=1, dtype=np.float32)
+
+
+def target_features(opponent_coins: np.ndarray, opponent_cards: np.ndarray) -> np.ndarray:
+    """(n, opponents, TARGET_FEATURES) what every opponent is scored on as a target"""
+    return np.stack(
+        [opponent_coins / 10, opponent_cards / 2, np.ones(opponent_coins.shape)], axis=-1
+    ).astype(np.float32)
+
+
+def target_mask(action: np.ndarray, opponent_coins: np.ndarray, opponent_cards: np.ndarray) -> np.ndarray:
+    """(n, opponents) who can be targeted: anyone still in the game, with coins to steal"""
+    return (opponent_cards > 0) & ~((action == STEAL)[:, None] & (opponent_coins == 0))
+
+
+def _masked_softmax(logits: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    logits = np.where(mask, logits, -np.inf)
+    exponentials = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exponentials / exponentials.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-logits))
+
+
+class LearnedPolicy:
+    """The weights of the model, and its forward pass for a batch of encoded observations"""
+
+    PARAMETERS = ("hidden_weights", "hidden_bias", "action_weights", "action_bias",
+                  "response_weights", "response_bias", "target_weights")
+
+    def __init__(self, parameters: Dict[str, np.ndarray]):
+        self.parameters = parameters
+
+    @classmethod
+    def initialize(cls, feature_size: int, hidden_size: int = DEFAULT_HIDDEN_SIZE, seed: int = 0) -> "LearnedPolicy":
+        rng = np.random.default_rng(seed)
+
+        def weights(rows: int, columns: int) -> np.ndarray:
+            return (rng.standard_normal((rows, columns)) * np.sqrt(2 / rows)).astype(np.float32)
+
+        return cls({
+            "hidden_weights": weights(feature_size, hidden_size),
+            "hidden_bias": np.zeros(hidden_size, dtype=np.float32),
+            "action_weights": weights(hidden_size, NUMBER_OF_ACTIONS),
+            "action_bias": np.zeros(NUMBER_OF_ACTIONS, dtype=np.float32),
+            "response_weights": weights(hidden_size, NUMBER_OF_RESPONSE_PHASES),
+            "response_bias": np.zeros(NUMBER_OF_RESPONSE_PHASES, dtype=np.float32),
+            "target_weights": np.zeros((NUMBER_OF_ACTIONS, TARGET_FEATURES), dtype=np.float32),
+        })
+
+    def hidden(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Hidden activations before and after the ReLU"""
+        pre_activation = features @ self.parameters["hidden_weights"] + self.parameters["hidden_bias"]
+        return pre_activation, np.maximum(pre_activation, 0)
+
+    def action_logits(self, hidden: np.ndarray) -> np.ndarray:
+        return hidden @ self.parameters["action_weights"] + self.parameters["action_bias"]
+
+    def response_logits(self, hidden: np.ndarray) -> np.ndarray:
+        return hidden @ self.parameters["response_weights"] + self.parameters["response_bias"]
+
+    def target_logits(self, actions: np.ndarray, opponent_features: np.ndarray) -> np.ndarray:
+        return np.einsum("nof,nf->no", opponent_features, self.parameters["target_weights"][actions])
+
+    def action_probabilities(self, features: np.ndarray, legal_moves: np.ndarray) -> np.ndarray:
+        return _masked_softmax(self.action_logits(self.hidden(features)[1]), legal_moves)
+
+    def response_probabilities(self, features: np.ndarray, phases: np.ndarray) -> np.ndarray:
+        logits = self.response_logits(self.hidden(features)[1])
+        return _sigmoid(logits[np.arange(len(phases)), phases - 1])
+
+    def target_probabilities(
+            self, actions: np.ndarray, opponent_coins: np.ndarray, opponent_cards: np.ndarray
+    ) -> np.ndarray:
+        logits = self.target_logits(actions, target_features(opponent_coins, opponent_cards))
+        return _masked_softmax(logits, target_mask(actions, opponent_coins, opponent_cards))
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, **self.parameters)
+
+    @classmethod
+    def load(cls, path: str) -> "LearnedPolicy":
+        with np.load(path) as policy_file:
+            return cls({name: policy_file[name] for name in cls.PARAMETERS})
+
+
+def load_training_data(
+        directories: Sequence[str], imitate: Optional[str] = None, winners_only: bool = False
+) -> Dict[str, np.ndarray]:
+    """The decisions to learn from, of the seats playing the `imitate` strategy (or every seat)"""
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in ("observations", "legal_moves", "move", "target")}
+    for directory in directories:
+        seat_labels = load_manifest(directory).seat_labels
+        imitated_seats = np.array([
+            imitate is None or label.partition(":")[0] == imitate for label in seat_labels
+        ] or [True])
+        for columns in iter_shards(directory):
+            keep = imitated_seats[np.minimum(columns["seat"], len(imitated_seats) - 1)]
+            if winners_only:
+                keep &= columns["outcome"] > 0
+            parts["observations"].append(observation_matrix(columns)[keep])
+            for name in ("legal_moves", "move", "target"):
+                parts[name].append(columns[name][keep])
+
+    if not parts["observations"]:
+        raise ValueError("No training data found")
+    return {name: np.concatenate(values) for name, values in parts.items()}
+
+
+class _Adam:
+    def __init__(self, parameters: Dict[str, np.ndarray], learning_rate: float):
+        self._learning_rate = learning_rate
+        self._moments = {name: np.zeros_like(value) for name, value in parameters.items()}
+        self._squares = {name: np.zeros_like(value) for name, value in parameters.items()}
+        self._steps = 0
+
+    def step(self, parameters: Dict[str, np.ndarray], gradients: Dict[str, np.ndarray]) -> None:
+        self._steps += 1
+        correction = np.sqrt(1 - 0.999 ** self._steps) / (1 - 0.9 ** self._steps)
+        for name, gradient in gradients.items():
+            self._moments[name] = 0.9 * self._moments[name] + 0.1 * gradient
+            self._squares[name] = 0.999 * self._squares[name] + 0.001 * gradient ** 2
+            parameters[name] -= (
+                self._learning_rate * correction * self._moments[name] / (np.sqrt(self._squares[name]) + 1e-8)
+            )
+
+
+def _losses_and_gradients(
+        policy: LearnedPolicy, batch: Dict[str, np.ndarray]
+) -> Tuple[Dict[str, float], Dict[str, np.ndarray]]:
+    """Cross entropy of the recorded moves under each head, and its gradients"""
+    parameters = policy.parameters
+    observations = batch["observations"]
+    features = encode_observations(observations)
+    phase = observations[:, _COLUMN["phase"]][:, 0]
+    move = batch["move"].astype(np.int64)
+    acting = phase == ACT
+    responding = ~acting
+    size = len(observations)
+
+    pre_activation, hidden = policy.hidden(features)
+    losses = {}
+    hidden_gradient = np.zeros_like(hidden)
+    gradients = {}
+
+    # Action head, a softmax over the legal actions
+    action_probabilities = _masked_softmax(policy.action_logits(hidden[acting]), batch["legal_moves"][acting])
+    chosen = action_probabilities[np.arange(len(action_probabilities)), move[acting]]
+    losses["action"] = float(-np.log(np.maximum(chosen, 1e-12)).mean()) if len(chosen) else 0.0
+    action_gradient = action_probabilities
+    action_gradient[np.arange(len(action_gradient)), move[acting]] -= 1
+    action_gradient /= size
+    gradients["action_weights"] = hidden[acting].T @ action_gradient
+    gradients["action_bias"] = action_gradient.sum(axis=0)
+    hidden_gradient[acting] += action_gradient @ parameters["action_weights"].T
+
+    # Response heads, one logistic regression per phase
+    response_rows = np.flatnonzero(responding)
+    response_phase = phase[response_rows] - 1
+    response_logits = policy.response_logits(hidden[response_rows])[np.arange(len(response_rows)), response_phase]
+    responded = (move[response_rows] == RESPOND).astype(np.float32)
+    response_probabilities = _sigmoid(response_logits)
+    responded_log_likelihood = responded * np.log(np.maximum(response_probabilities, 1e-12))
+    passed_log_likelihood = (1 - responded) * np.log(np.maximum(1 - response_probabilities, 1e-12))
+    losses["response"] = (
+        float(-np.mean(responded_log_likelihood + passed_log_likelihood)) if len(response_rows) else 0.0
+    )
+    response_gradient = np.zeros((len(response_rows), NUMBER_OF_RESPONSE_PHASES), dtype=np.float32)
+    response_gradient[np.arange(len(response_rows)), response_phase] = (response_probabilities - responded) / size
+    gradients["response_weights"] = hidden[response_rows].T @ response_gradient
+    gradients["response_bias"] = response_gradient.sum(axis=0)
+    hidden_gradient[response_rows] += response_gradient @ parameters["response_weights"].T
+
+    # Target scores, a softmax over the opponents that can be targeted
+    targeted = np.flatnonzero(acting & (batch["target"] >= 0))
+    opponent_coins = observations[targeted][:, _COLUMN["opponent_coins"]]
+    opponent_cards = observations[targeted][:, _COLUMN["opponent_cards"]]
+    opponent_features = target_features(opponent_coins, opponent_cards)
+    target_probabilities = _masked_softmax(
+        policy.target_logits(move[targeted], opponent_features),
+        target_mask(move[targeted], opponent_coins, opponent_cards),
+    )
+    target = batch["target"][targeted].astype(np.int64)
+    chosen_target = target_probabilities[np.arange(len(targeted)), target]
+    losses["target"] = float(-np.log(np.maximum(chosen_target, 1e-12)).mean()) if len(targeted) else 0.0
+    target_gradient = target_probabilities
+    target_gradient[np.arange(len(targeted)), target] -= 1
+    target_gradient /= max(len(targeted), 1)
+    gradients["target_weights"] = np.einsum(
+        "na,no,nof->af", np.eye(NUMBER_OF_ACTIONS, dtype=np.float32)[move[targeted]], target_gradient, opponent_features
+    )
+
+    pre_activation_gradient = hidden_gradient * (pre_activation > 0)
+    gradients["hidden_weights"] = features.T @ pre_activation_gradient
+    gradients["hidden_bias"] = pre_activation_gradient.sum(axis=0)
+    return losses, gradients
+
+
+def evaluate(policy: LearnedPolicy, data: Dict[str, np.ndarray]) -> Dict[str, float]:
+    """Losses, and how often the most likely move is the recorded one"""
+    losses, _ = _losses_and_gradients(policy, data)
+    features = encode_observations(data["observations"])
+    phase = data["observations"][:, _COLUMN["phase"]][:, 0]
+    acting = phase == ACT
+    metrics = dict(losses)
+    if acting.any():
+        probabilities = policy.action_probabilities(features[acting], data["legal_moves"][acting])
+        metrics["action_accuracy"] = float((probabilities.argmax(axis=1) == data["move"][acting]).mean())
+    if (~acting).any():
+        probabilities = policy.response_probabilities(features[~acting], phase[~acting])
+        metrics["response_accuracy"] = float(((probabilities > 0.5) == (data["move"][~acting] == RESPOND)).mean())
+    return metrics
+
+
+def train(
+        data: Dict[str, np.ndarray],
+        hidden_size: int = DEFAULT_HIDDEN_SIZE,
+        epochs: int = 5,
+        batch_size: int = 1024,
+        learning_rate: float = 3e-3,
+        validation_share: float = 0.1,
+        seed: int = 0,
+) -> Tuple[LearnedPolicy, Dict[str, float]]:
+    """Minibatch Adam on the recorded decisions. Returns the policy and its validation metrics"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(data["move"]))
+    number_of_validation_rows = int(len(order) * validation_share)
+    validation = {name: values[order[:number_of_validation_rows]] for name, values in data.items()}
+    training_rows = order[number_of_validation_rows:]
+
+    feature_size = encode_observations(data["observations"][:1]).shape[1]
+    policy = LearnedPolicy.initialize(feature_size, hidden_size, seed)
+    optimizer = _Adam(policy.parameters, learning_rate)
+    for _ in range(epochs):
+        rng.shuffle(training_rows)
+        for start in range(0, len(training_rows), batch_size):
+            rows = training_rows[start:start + batch_size]
+            _, gradients = _losses_and_gradients(policy, {name: values[rows] for name, values in data.items()})
+            optimizer.step(policy.parameters, gradients)
+
+    return policy, evaluate(policy, validation) if number_of_validation_rows else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a learned policy on recorded decisions")
+    parser.add_argument("data", nargs="+", help="Training data directories, see `tournament --export-dir`")
+    parser.add_argument("--imitate", help="Only learn from the seats playing this strategy, e.g. 'llm'")
+    parser.add_argument("--winners-only", action="store_true", help="Only learn from the games the seat won")
+    parser.add_argument("--hidden-size", type=int, default=DEFAULT_HIDDEN_SIZE)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--learning-rate", type=float, default=3e-3)
+    parser.add_argument("--output", default=DEFAULT_POLICY_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = load_training_data(args.data, args.imitate, args.winners_only)
+    started = time.perf_counter()
+    policy, metrics = train(
+        data, args.hidden_size, args.epochs, args.batch_size, args.learning_rate, seed=args.seed
+    )
+    policy.save(args.output)
+    print(f"Trained on {len(data['move'])} decisions in {time.perf_counter() - started:.1f}s, saved to {args.output}")
+    for name, value in metrics.items():
+        print(f"{name:>18}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
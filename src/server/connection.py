@@ -0,0 +1,142 @@
+import asyncio
+import io
+from typing import Any, Dict, Optional
+
+from src.server.protocol import (
+    DecisionKind,
+    Message,
+    MessageType,
+    encode_message,
+    read_message,
+    write_message,
+)
+
+
+class ClientConnection:
+    """A connected client. Decisions are requested from the table's coroutine on the event loop,
+    or from a worker thread, while all socket I/O stays on the event loop."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self._reader = reader
+        self._writer = writer
+        self._loop = loop
+        self._write_lock = asyncio.Lock()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_request_id = 0
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def receive(self) -> Optional[Message]:
+        return await read_message(self._reader)
+
+    async def send(self, message: Message) -> None:
+        if self._closed:
+            raise ConnectionError("Client connection is closed")
+        async with self._write_lock:
+            await write_message(self._writer, message)
+
+    def send_nowait(self, message: Message) -> None:
+        """Queue a message from the event loop thread, without waiting for the socket to drain"""
+        if self._closed:
+            raise ConnectionError("Client connection is closed")
+        self._writer.write(encode_message(message))
+
+    def post(self, message: Message) -> None:
+        """Queue a message from the event loop, or send it from a worker thread"""
+        if self.on_loop_thread():
+            self.send_nowait(message)
+        else:
+            self.send_from_thread(message)
+
+    async def drain(self) -> None:
+        """Wait until the messages queued with `send_nowait` are on their way"""
+        async with self._write_lock:
+            await self._writer.drain()
+
+    async def request(self, kind: DecisionKind, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Ask the client for a decision and wait for the matching answer"""
+        self._next_request_id += 1
+        request_id = self._next_request_id
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        try:
+            await self.send(
+                Message(type=MessageType.decision, request_id=request_id, kind=kind, payload=payload)
+            )
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def dispatch_responses(self) -> None:
+        """Route the client's answers to the waiting requests until the client disconnects"""
+        try:
+            while (message := await self.receive()) is not None:
+                if message.type != MessageType.decision or message.request_id is None:
+                    continue
+                future = self._pending.get(message.request_id)
+                if future and not future.done():
+                    future.set_result(message.payload)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Client disconnected"))
+
+    async def close(self) -> None:
+        self._closed = True
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def request_from_thread(self, kind: DecisionKind, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return asyncio.run_coroutine_threadsafe(self.request(kind, payload), self._loop).result()
+
+    def send_from_thread(self, message: Message) -> None:
+        asyncio.run_coroutine_threadsafe(self.send(message), self._loop).result()
+
+    def on_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+
+class EventStream(io.TextIOBase):
+    """File-like target for a table's console, forwarding every printed block to the client"""
+
+    def __init__(self, connection: ClientConnection):
+        super().__init__()
+        self._connection = connection
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text.strip() and not self._connection.closed:
+            message = Message(type=MessageType.event, payload={"text": text.strip()})
+            # Printing must never block the event loop, the table drains the socket between turns
+            self._connection.post(message)
+        return len(text)
+
+
+class SpeechStream:
+    """Speech listener for a table, forwarding table talk to the client while it is generated"""
+
+    def __init__(self, connection: ClientConnection):
+        self._connection = connection
+
+    def __call__(self, speaker: str, text: str) -> None:
+        if not self._connection.closed:
+            self._connection.post(Message(type=MessageType.speech, payload={"player": speaker, "text": text}))
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+from src.server.protocol import (
+    MAX_MESSAGE_SIZE,
+    DecisionKind,
+    Message,
+    MessageType,
+    read_message,
+    write_message,
+)
+
+
+class LoadStats(BaseModel):
+    games_completed: int = 0
+    games_rejected: int = 0
+    games_failed: int = 0
+    decisions: int = 0
+    events: int = 0
+    game_durations: List[float] = []
+
+
+def scripted_decision(message: Message) -> Dict[str, Any]:
+    """Answer a decision request like a random bot would"""
+    payload = message.payload
+    match message.kind:
+        case DecisionKind.choose_action:
+            return {"action": random.choice(payload["actions"]), "target": random.choice(payload["targets"])}
+        case DecisionKind.challenge:
+            return {"value": random.random() < 0.2}
+        case DecisionKind.counter:
+            return {"value": random.random() < 0.1}
+        case DecisionKind.remove_card:
+            return {"cards": [random.randrange(len(payload["cards"]))]}
+        case DecisionKind.exchange:
+            return {"cards": random.sample(range(len(payload["cards"])), 2)}
+        case DecisionKind.end_game:
+            return {"value": True}
+    return {}
+
+
+async def play_game(host: str, port: int, name: str, stats: LoadStats) -> None:
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_MESSAGE_SIZE)
+    started = time.perf_counter()
+    try:
+        await write_message(writer, Message(type=MessageType.join, payload={"name": name}))
+        while (message := await read_message(reader)) is not None:
+            match message.type:
+                case MessageType.decision:
+                    stats.decisions += 1
+                    await write_message(
+                        writer,
+                        Message(
+                            type=MessageType.decision,
+                            request_id=message.request_id,
+                            payload=scripted_decision(message),
+                        ),
+                    )
+                case MessageType.event:
+                    stats.events += 1
+                case MessageType.game_over:
+                    stats.games_completed += 1
+                    stats.game_durations.append(time.perf_counter() - started)
+                    return
+                case MessageType.error if message.payload.get("rejected"):
+                    stats.games_rejected += 1
+                    return
+
+        stats.games_failed += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_client(host: str, port: int, client_id: int, games: int, stats: LoadStats) -> None:
+    for game in range(games):
+        try:
+            await play_game(host, port, f"Bot{client_id}-{game}", stats)
+        except ConnectionError:
+            stats.games_failed += 1
+
+
+async def run_load(host: str, port: int, clients: int, games: int) -> LoadStats:
+    stats = LoadStats()
+    await asyncio.gather(
+        *(run_client(host, port, client_id, games, stats) for client_id in range(clients))
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many scripted games against a game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--games", type=int, default=1, help="Games played by every client")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = asyncio.run(run_load(args.host, args.port, args.clients, args.games))
+    elapsed = time.perf_counter() - started
+
+    print(f"Games completed: {stats.games_completed} in {elapsed:.1f}s")
+    print(f"Games rejected: {stats.games_rejected}, failed: {stats.games_failed}")
+    print(f"Decisions answered: {stats.decisions}, events received: {stats.events}")
+    if stats.game_durations:
+        print(
+            f"Game duration: mean {statistics.mean(stats.game_durations):.2f}s, "
+            f"max {max(stats.game_durations):.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import json
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+# Newline-delimited JSON: one message per line, in both directions
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+class MessageType(str, Enum):
+    join = "join"
+    decision = "decision"
+    event = "event"
+    # A piece of table talk while it is generated, the complete line follows as an event
+    speech = "speech"
+    game_over = "game_over"
+    error = "error"
+
+
+class DecisionKind(str, Enum):
+    choose_action = "choose_action"
+    challenge = "challenge"
+    counter = "counter"
+    remove_card = "remove_card"
+    exchange = "exchange"
+    end_game = "end_game"
+
+
+class Message(BaseModel):
+    type: MessageType
+    request_id: Optional[int] = None
+    kind: Optional[DecisionKind] = None
+    payload: Dict[str, Any] = {}
+
+
+def encode_message(message: Message) -> bytes:
+    return message.model_dump_json(exclude_none=True).encode() + b"\n"
+
+
+def decode_message(line: bytes) -> Message:
+    return Message.model_validate(json.loads(line))
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Message]:
+    """Read the next message, or None once the other side closed the connection"""
+    line = await reader.readline()
+    if not line:
+        return None
+    return decode_message(line)
+
+
+async def write_message(writer: asyncio.StreamWriter, message: Message) -> None:
+    writer.write(encode_message(message))
+    # Wait for the socket buffer to drain, so a slow client slows down only its own table
+    await writer.drain()
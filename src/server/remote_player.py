@@ -0,0 +1,139 @@
+import math
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.models.action import Action
+from src.models.card import Card
+from src.models.players.base import BasePlayer
+from src.models.players.human import HumanPlayer, get_decision_deadline
+from src.server.connection import ClientConnection
+from src.server.protocol import DecisionKind, Message, MessageType
+from src.utils.steps import Steps
+
+if TYPE_CHECKING:
+    from src.handler.game_handler import ResistanceCoupGameHandler
+
+# A client that keeps answering with invalid choices gets a default one instead
+MAX_INVALID_RESPONSES = 3
+
+
+class DecisionRequest:
+    """Ask the client for a decision and wait for their answer"""
+
+    __slots__ = ("connection", "kind", "payload")
+
+    def __init__(self, connection: ClientConnection, kind: DecisionKind, payload: Dict[str, Any]):
+        self.connection = connection
+        self.kind = kind
+        self.payload = payload
+
+    def run(self) -> Dict[str, Any]:
+        return self.connection.request_from_thread(self.kind, self.payload)
+
+    async def arun(self) -> Dict[str, Any]:
+        return await self.connection.request(self.kind, self.payload)
+
+
+class InvalidResponse:
+    """Tell the client why their answer was rejected, before asking again"""
+
+    __slots__ = ("connection", "reason")
+
+    def __init__(self, connection: ClientConnection, reason: str):
+        self.connection = connection
+        self.reason = reason
+
+    def _message(self) -> Message:
+        return Message(type=MessageType.error, payload={"reason": self.reason})
+
+    def run(self) -> None:
+        self.connection.send_from_thread(self._message())
+
+    async def arun(self) -> None:
+        await self.connection.send(self._message())
+
+
+class RemotePlayer(HumanPlayer):
+    """A human (or scripted) player who sends their decisions over a client connection"""
+
+    def __init__(
+        self,
+        name: str,
+        game_handler: "ResistanceCoupGameHandler",
+        connection: ClientConnection,
+        **data,
+    ):
+        super().__init__(name=name, game_handler=game_handler, **data)
+        self._connection = connection
+
+    def _request(self, kind: DecisionKind, **payload: Any) -> DecisionRequest:
+        payload.setdefault("cards_in_hand", [str(card) for card in self.cards])
+        payload["coins"] = self.coins
+        deadline = get_decision_deadline()
+        if deadline is not None:
+            # Lets the client show a countdown
+            payload["seconds_left"] = max(0, math.floor(deadline - time.monotonic()))
+        return DecisionRequest(self._connection, kind, payload)
+
+    def _notify_invalid(self, reason: str) -> InvalidResponse:
+        return InvalidResponse(self._connection, reason)
+
+    def _request_card_indices(
+        self, kind: DecisionKind, hand: List[Card], number_of_cards: int
+    ) -> Steps[List[int]]:
+        cards = [str(card) for card in hand]
+        for _ in range(MAX_INVALID_RESPONSES):
+            response = yield self._request(kind, cards=cards, cards_in_hand=cards)
+            indices = response.get("cards", [])
+            in_hand = all(isinstance(ind, int) and 0 <= ind < len(hand) for ind in indices)
+            if in_hand and len(indices) == len(set(indices)) == number_of_cards:
+                return indices
+            yield self._notify_invalid(f"Pick {number_of_cards} different card numbers from your hand")
+
+        return list(range(number_of_cards))
+
+    def _action_steps(
+        self, other_players: List[BasePlayer]
+    ) -> Steps[Tuple[Action, Optional[BasePlayer]]]:
+        actions_by_name = {str(action): action for action in self.available_actions()}
+        players_by_name = {player.name: player for player in other_players}
+
+        for _ in range(MAX_INVALID_RESPONSES):
+            response = yield self._request(
+                DecisionKind.choose_action,
+                actions=list(actions_by_name),
+                targets=list(players_by_name),
+            )
+            target_action = actions_by_name.get(response.get("action"))
+            target_player = players_by_name.get(response.get("target"))
+            if target_action is None:
+                yield self._notify_invalid("Unknown action")
+                continue
+            if not target_action.requires_target:
+                return target_action, None
+            if target_player is not None and self._validate_action(target_action, target_player):
+                return target_action, target_player
+            yield self._notify_invalid("Invalid action for the target player")
+
+        return self._default_action(other_players)
+
+    def _challenge_steps(self, player: BasePlayer) -> Steps[bool]:
+        return bool((yield self._request(DecisionKind.challenge, player=player.name)).get("value"))
+
+    def _counter_steps(self, player: BasePlayer) -> Steps[bool]:
+        return bool((yield self._request(DecisionKind.counter, player=player.name)).get("value"))
+
+    def _end_game_steps(self) -> Steps[bool]:
+        return bool((yield self._request(DecisionKind.end_game)).get("value"))
+
+    def _discard_steps(self) -> Steps[int]:
+        if len(self.cards) == 1:
+            return 0
+        return (yield from self._request_card_indices(DecisionKind.remove_card, self.cards, 1))[0]
+
+    def _exchange_steps(self, exchange_cards: list[Card]) -> Steps[Tuple[int, int]]:
+        hand = self.cards + exchange_cards
+        first_card_ind, second_card_ind = yield from self._request_card_indices(
+            DecisionKind.exchange, hand, 2
+        )
+        return first_card_ind, second_card_ind
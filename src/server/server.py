@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from dotenv import load_dotenv
+from rich.console import Console
+
+from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.players.llm_player.decision_cache import decision_cache
+from src.models.players.llm_player.scheduler import get_llm_scheduler
+from src.models.table import HUMAN_STRATEGY, TableSpec
+from src.server.connection import ClientConnection, EventStream, SpeechStream
+from src.server.protocol import MAX_MESSAGE_SIZE, Message, MessageType
+from src.server.remote_player import RemotePlayer
+from src.utils.print import use_console, use_speech_listener
+
+logger = logging.getLogger(__name__)
+
+
+# The connecting client takes the human seat, every other seat is a bot
+DEFAULT_TABLE = "human,ai*4"
+
+# Seconds a new connection gets to send its join message
+JOIN_TIMEOUT = 10
+
+# Seconds a client gets for each decision before the default one is taken for them
+DECISION_TIMEOUT = 60
+
+
+class GameServer:
+    """Hosts many games at once. Each connected client gets their own table against bots.
+
+    Tables are coroutines on the event loop, which await their client's decisions and LLM calls.
+    Bots that only decide blocking run in worker threads, so they only ever stall their own table.
+    A client that doesn't answer a decision within `decision_timeout` seconds gets the default one.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        max_tables: int = 32,
+        max_waiting: int = 64,
+        table_spec: Optional[TableSpec] = None,
+        decision_timeout: Optional[float] = DECISION_TIMEOUT,
+    ):
+        self._host = host
+        self._port = port
+        self._max_waiting = max_waiting
+        self._table_spec = table_spec or TableSpec.from_cli_spec(DEFAULT_TABLE, narration=False)
+        if sum(seat.count for seat in self._table_spec.seats if seat.strategy == HUMAN_STRATEGY) != 1:
+            raise ValueError("A server table needs exactly one human seat, for the connecting client")
+
+        self._decision_timeout = decision_timeout
+        self._table_slots = asyncio.Semaphore(max_tables)
+        self._executor = ThreadPoolExecutor(max_workers=max_tables, thread_name_prefix="bot")
+        self._table_ids = itertools.count(1)
+        self._number_of_waiting_clients = 0
+        self._server: Optional[asyncio.Server] = None
+
+    async def start(self) -> asyncio.Server:
+        # Blocking bot decisions of every table run here, see `BasePlayer.achoose_action`
+        asyncio.get_running_loop().set_default_executor(self._executor)
+        self._server = await asyncio.start_server(
+            self._handle_client, self._host, self._port, limit=MAX_MESSAGE_SIZE
+        )
+        return self._server
+
+    async def serve_forever(self) -> None:
+        server = self._server or await self.start()
+        logger.info("Serving games on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = ClientConnection(reader, writer, asyncio.get_running_loop())
+        try:
+            try:
+                join = await asyncio.wait_for(connection.receive(), JOIN_TIMEOUT)
+            except (asyncio.TimeoutError, ValueError):
+                join = None
+            if join is None or join.type != MessageType.join or not join.payload.get("name"):
+                await connection.send(
+                    Message(type=MessageType.error, payload={"reason": "Expected a join message with a name"})
+                )
+                return
+
+            # Backpressure: queue a bounded number of clients while every table is taken
+            if self._table_slots.locked() and self._number_of_waiting_clients >= self._max_waiting:
+                await connection.send(
+                    Message(type=MessageType.error, payload={"reason": "Server is full", "rejected": True})
+                )
+                return
+
+            self._number_of_waiting_clients += 1
+            try:
+                await self._table_slots.acquire()
+            finally:
+                self._number_of_waiting_clients -= 1
+
+            try:
+                await self._run_table(connection, str(join.payload["name"]))
+            finally:
+                self._table_slots.release()
+        except ConnectionError:
+            pass
+        finally:
+            await connection.close()
+
+    async def _run_table(self, connection: ClientConnection, player_name: str) -> None:
+        table_id = next(self._table_ids)
+        dispatcher = asyncio.create_task(connection.dispatch_responses())
+        logger.info("Table %s opened for %s", table_id, player_name)
+        try:
+            winner = await self._play_game(connection, player_name)
+            await connection.send(
+                Message(type=MessageType.game_over, payload={"table": table_id, "winner": winner})
+            )
+        except ConnectionError:
+            logger.info("Table %s closed, %s disconnected", table_id, player_name)
+        except Exception:
+            # A broken table must never take the other tables down with it
+            logger.exception("Table %s crashed", table_id)
+        finally:
+            dispatcher.cancel()
+
+        cache_stats = decision_cache.stats
+        if cache_stats.lookups:
+            logger.info(
+                "Decision cache: %d/%d hits (%.1f%%), %d situations",
+                cache_stats.hits, cache_stats.lookups, 100 * cache_stats.hit_rate, cache_stats.entries,
+            )
+        for priority, call_stats in get_llm_scheduler().stats().by_priority.items():
+            if call_stats.requests:
+                logger.info(
+                    "LLM %s calls: %d admitted, %d throttled, %.2fs mean wait, %.2fs max wait",
+                    priority, call_stats.requests, call_stats.throttled, call_stats.mean_wait, call_stats.max_wait,
+                )
+
+    async def _play_game(self, connection: ClientConnection, player_name: str) -> str:
+        """Play one full game, with the table's output sent to the client"""
+        table_console = Console(file=EventStream(connection), width=100)
+        with use_console(table_console), use_speech_listener(SpeechStream(connection)):
+            handler = ResistanceCoupGameHandler.from_table_spec(
+                self._table_spec,
+                player_name,
+                human_player_factory=partial(
+                    RemotePlayer, connection=connection, decision_timeout=self._decision_timeout
+                ),
+            )
+            try:
+                handler.setup_game()
+                while not await handler.ahandle_turn():
+                    await connection.drain()
+            finally:
+                handler.close()
+
+            return handler.remaining_player.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many games of Coup for remote players")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-tables", type=int, default=32)
+    parser.add_argument("--max-waiting", type=int, default=64)
+    parser.add_argument(
+        "--table", default=DEFAULT_TABLE, help="Table composition, e.g. 'human,llm*2,ai*2:think_time=0'"
+    )
+    parser.add_argument("--table-config", help="Table composition from a .toml or .json file")
+    parser.add_argument("--narration", action="store_true", help="Let the LLM narrate table talk")
+    parser.add_argument(
+        "--batch-narration", action="store_true", help="Narrate the table talk of a turn in one LLM call"
+    )
+    parser.add_argument(
+        "--stream-narration", action="store_true", help="Stream table talk to clients while it is generated"
+    )
+    parser.add_argument(
+        "--decision-timeout",
+        type=float,
+        default=DECISION_TIMEOUT,
+        help="Seconds a client gets for each decision before the default one is taken",
+    )
+    args = parser.parse_args()
+
+    if args.table_config:
+        # Narration flags given on the command line take precedence over the table file
+        narration_settings = {
+            setting: True
+            for setting in ("narration", "batch_narration", "stream_narration")
+            if getattr(args, setting)
+        }
+        table_spec = TableSpec.from_file(args.table_config).model_copy(update=narration_settings)
+    else:
+        table_spec = TableSpec.from_cli_spec(
+            args.table,
+            narration=args.narration,
+            batch_narration=args.batch_narration,
+            stream_narration=args.stream_narration,
+        )
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    server = GameServer(
+        host=args.host,
+        port=args.port,
+        max_tables=args.max_tables,
+        max_waiting=args.max_waiting,
+        table_spec=table_spec,
+        decision_timeout=args.decision_timeout,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import csv
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.stats.sketches import QuantileSketch, RunningStats
+
+# Coins over time are tracked per turn up to this turn, later turns share the last bucket
+MAX_TRACKED_TURNS = 100
+
+SUMMARY_QUANTILES = (0.1, 0.5, 0.9)
+
+
+class SummaryRow(BaseModel):
+    """One line of a tournament summary. Unused columns are left empty"""
+
+    section: str
+    group: str = ""
+    key: str = ""
+    count: int = 0
+    total: Optional[int] = None
+    rate: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    min: Optional[float] = None
+    p10: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    max: Optional[float] = None
+
+
+class TournamentStats:
+    """Aggregates the results of any number of games in constant memory per game.
+
+    Games feed their events in through a `GameRecorder` while they are played, so no history
+    is ever kept. Aggregates of games played by parallel workers are combined with `merge`.
+    """
+
+    def __init__(self):
+        self.games = 0
+        # (strategy, games played) and (turn position, games played), with the wins of each
+        self.games_by_strategy: Counter = Counter()
+        self.wins_by_strategy: Counter = Counter()
+        self.games_by_position: Counter = Counter()
+        self.wins_by_position: Counter = Counter()
+        # Keyed by (strategy, action or counter type)
+        self.actions: Counter = Counter()
+        # Keyed by strategy
+        self.claims: Counter = Counter()
+        self.bluffs: Counter = Counter()
+        self.bluffs_caught: Counter = Counter()
+        self.challenges: Counter = Counter()
+        self.challenges_won: Counter = Counter()
+        self.game_length = RunningStats()
+        self.game_length_quantiles = QuantileSketch()
+        self.coins_by_turn: List[RunningStats] = [RunningStats() for _ in range(MAX_TRACKED_TURNS)]
+
+    def start_game(self, seats: Iterable[Tuple[str, str, int]]) -> "GameRecorder":
+        """Start recording a game, given the (name, strategy, turn position) of every player"""
+        return GameRecorder(self, seats)
+
+    def merge(self, other: "TournamentStats") -> None:
+        self.games += other.games
+        for name in (
+                "games_by_strategy", "wins_by_strategy", "games_by_position", "wins_by_position",
+                "actions", "claims", "bluffs", "bluffs_caught", "challenges", "challenges_won",
+        ):
+            getattr(self, name).update(getattr(other, name))
+        self.game_length.merge(other.game_length)
+        self.game_length_quantiles.merge(other.game_length_quantiles)
+        for coins, other_coins in zip(self.coins_by_turn, other.coins_by_turn):
+            coins.merge(other_coins)
+
+    def summary(self) -> List[SummaryRow]:
+        rows = []
+        for strategy, games in sorted(self.games_by_strategy.items()):
+            wins = self.wins_by_strategy[strategy]
+            rows.append(self._rate_row("win_rate", "strategy", strategy, wins, games))
+        for position, games in sorted(self.games_by_position.items()):
+            wins = self.wins_by_position[position]
+            rows.append(self._rate_row("win_rate", "position", str(position), wins, games))
+
+        for (strategy, action), count in sorted(self.actions.items()):
+            rows.append(SummaryRow(section="actions", group=strategy, key=action, count=count))
+
+        for strategy, claims in sorted(self.claims.items()):
+            bluffs = self.bluffs[strategy]
+            rows.append(self._rate_row("bluffs", strategy, "bluff_rate", bluffs, claims))
+            if bluffs:
+                caught = self.bluffs_caught[strategy]
+                rows.append(self._rate_row("bluffs", strategy, "caught_rate", caught, bluffs))
+        for strategy, challenges in sorted(self.challenges.items()):
+            won = self.challenges_won[strategy]
+            rows.append(self._rate_row("challenges", strategy, "success_rate", won, challenges))
+
+        if self.game_length.count:
+            rows.append(
+                self._distribution_row("game_length", "turns", "", self.game_length, self.game_length_quantiles)
+            )
+        for turn, coins in enumerate(self.coins_by_turn, start=1):
+            if coins.count:
+                rows.append(self._distribution_row("coins_by_turn", "turn", str(turn), coins))
+        return rows
+
+    @staticmethod
+    def _rate_row(section: str, group: str, key: str, count: int, total: int) -> SummaryRow:
+        return SummaryRow(section=section, group=group, key=key, count=count, total=total, rate=count / total)
+
+    @staticmethod
+    def _distribution_row(
+            section: str, group: str, key: str, stats: RunningStats, quantiles: Optional[QuantileSketch] = None
+    ) -> SummaryRow:
+        p10, p50, p90 = (quantiles.quantile(q) for q in SUMMARY_QUANTILES) if quantiles else (None, None, None)
+        return SummaryRow(
+            section=section, group=group, key=key, count=stats.count, mean=stats.mean, std=stats.std,
+            min=stats.min, p10=p10, p50=p50, p90=p90, max=stats.max,
+        )
+
+    def export_csv(self, path: str) -> None:
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(SummaryRow.model_fields))
+            writer.writeheader()
+            writer.writerows(row.model_dump() for row in self.summary())
+
+    def export_parquet(self, path: str) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as error:
+            raise ImportError(
+                "Exporting to Parquet needs pyarrow, install it with `poetry install -E parquet`"
+            ) from error
+
+        table = pyarrow.Table.from_pylist([row.model_dump() for row in self.summary()])
+        pyarrow.parquet.write_table(table, path)
+
+
+class GameRecorder:
+    """Feeds the events of a single game into the tournament stats as they happen"""
+
+    def __init__(self, stats: TournamentStats, seats: Iterable[Tuple[str, str, int]]):
+        self._stats = stats
+        self._seats: Dict[str, Tuple[str, int]] = {name: (strategy, position) for name, strategy, position in seats}
+        # The last claim of every player, to tell whether a lost challenge caught a bluff
+        self._bluffing: Dict[str, bool] = {}
+
+    def _strategy(self, player_name: str) -> str:
+        return self._seats[player_name][0]
+
+    def on_action(self, player_name: str, action: str, claimed: bool, bluffing: bool) -> None:
+        """An action or counter, with whether it claimed a card and whether the player lacked it"""
+        strategy = self._strategy(player_name)
+        self._stats.actions[strategy, action] += 1
+        if claimed:
+            self._stats.claims[strategy] += 1
+            self._stats.bluffs[strategy] += bluffing
+            self._bluffing[player_name] = bluffing
+
+    def on_challenge(self, challenger_name: str, challenged_name: str, succeeded: bool) -> None:
+        strategy = self._strategy(challenger_name)
+        self._stats.challenges[strategy] += 1
+        self._stats.challenges_won[strategy] += succeeded
+        if succeeded and self._bluffing.get(challenged_name):
+            self._stats.bluffs_caught[self._strategy(challenged_name)] += 1
+
+    def on_turn_end(self, turn: int, coins: Iterable[int]) -> None:
+        """The coins of every player still in the game at the end of a turn"""
+        coins_this_turn = self._stats.coins_by_turn[min(turn, MAX_TRACKED_TURNS) - 1]
+        for player_coins in coins:
+            coins_this_turn.add(player_coins)
+
+    def on_game_end(self, winner_name: str, turns: int) -> None:
+        stats = self._stats
+        stats.games += 1
+        for name, (strategy, position) in self._seats.items():
+            stats.games_by_strategy[strategy] += 1
+            stats.games_by_position[position] += 1
+            if name == winner_name:
+                stats.wins_by_strategy[strategy] += 1
+                stats.wins_by_position[position] += 1
+        stats.game_length.add(turns)
+        stats.game_length_quantiles.add(turns)
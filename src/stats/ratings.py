@@ -0,0 +1,210 @@
+import argparse
+import io
+import math
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from rich.console import Console
+
+from src.models.table import SeatSpec, TableSpec
+
+# Defaults of the TrueSkill family: a new strategy is rated 25 ± 8.33, a skill gap of
+# BETA gives the better player about a 76% chance to come out ahead of the other
+DEFAULT_MU = 25.0
+DEFAULT_SIGMA = DEFAULT_MU / 3
+BETA = DEFAULT_SIGMA / 2
+# Keeps the variance from collapsing to zero after very one-sided games
+KAPPA = 0.0001
+# z-score of a 95% confidence interval
+CONFIDENCE_Z = 1.96
+
+
+class Rating(BaseModel):
+    mu: float = DEFAULT_MU
+    sigma: float = DEFAULT_SIGMA
+    games: int = 0
+
+    @property
+    def conservative(self) -> float:
+        """A rating the strategy is very likely to be at least as good as"""
+        return self.mu - 3 * self.sigma
+
+    @property
+    def confidence_interval(self) -> Tuple[float, float]:
+        return self.mu - CONFIDENCE_Z * self.sigma, self.mu + CONFIDENCE_Z * self.sigma
+
+
+class RatingLadder(BaseModel):
+    """Bayesian ratings of strategies, updated after every game from the order players went out in.
+
+    Uses the Bradley-Terry update of Weng and Lin (2011), the closed form online method behind
+    TrueSkill-like ratings: every player is compared with every other player at the table, and
+    both the estimate and its uncertainty are updated incrementally.
+    """
+
+    ratings: Dict[str, Rating] = {}
+
+    def rating(self, label: str) -> Rating:
+        return self.ratings.setdefault(label, Rating())
+
+    def record_game(self, ranking: Sequence[str]) -> None:
+        """Update from the strategy labels of the players, from the winner to the first one out.
+
+        Seats of the same strategy are not compared with each other, and the updates of all
+        seats of a strategy are combined into one update of its rating.
+        """
+        ratings = [self.rating(label) for label in ranking]
+        mean_updates: Dict[str, float] = {}
+        variance_shrinks: Dict[str, float] = {}
+
+        for place, (label, rating) in enumerate(zip(ranking, ratings)):
+            mean_update = variance_shrink = 0.0
+            for other_place, (other_label, other_rating) in enumerate(zip(ranking, ratings)):
+                if other_label == label:
+                    continue
+                c = math.sqrt(rating.sigma ** 2 + other_rating.sigma ** 2 + 2 * BETA ** 2)
+                win_probability = 1 / (1 + math.exp((other_rating.mu - rating.mu) / c))
+                score = 1.0 if place < other_place else 0.0
+                mean_update += rating.sigma ** 2 / c * (score - win_probability)
+                variance_shrink += (
+                    rating.sigma / c * rating.sigma ** 2 / c ** 2 * win_probability * (1 - win_probability)
+                )
+            mean_updates[label] = mean_updates.get(label, 0.0) + mean_update
+            variance_shrinks[label] = variance_shrinks.get(label, 0.0) + variance_shrink
+
+        for label, mean_update in mean_updates.items():
+            rating = self.ratings[label]
+            rating.mu += mean_update
+            rating.sigma *= math.sqrt(max(1 - variance_shrinks[label], KAPPA))
+            rating.games += 1
+
+    def leaderboard(self) -> List[Tuple[str, Rating]]:
+        return sorted(self.ratings.items(), key=lambda item: item[1].conservative, reverse=True)
+
+    @classmethod
+    def load(cls, path: str) -> "RatingLadder":
+        file_path = Path(path)
+        if not file_path.exists():
+            return cls()
+        return cls.model_validate_json(file_path.read_text())
+
+    def save(self, path: str) -> None:
+        # Write to a temporary file first, so an interrupted run never leaves a broken ladder
+        temporary_path = Path(f"{path}.tmp")
+        temporary_path.write_text(self.model_dump_json(indent=2))
+        temporary_path.replace(path)
+
+
+class MatchScheduler:
+    """Picks the next table so each game teaches the ladder as much as possible per unit of cost.
+
+    The seat with the most uncertain rating relative to its cost anchors the table, and the
+    other seats go to the entries whose games against it are the closest to a coin flip,
+    weighted by their own uncertainty. Well-known and expensive entries (e.g. LLM players)
+    are picked less and less as their ratings settle.
+    """
+
+    def __init__(self, ladder: RatingLadder, entries: Sequence[SeatSpec], costs: Optional[Dict[str, float]] = None):
+        self._ladder = ladder
+        self._entries = {entry.display_label: entry for entry in entries}
+        self._costs = costs or {}
+
+    def _cost(self, label: str) -> float:
+        """Costs are given per label, or per strategy for all its variants"""
+        return self._costs.get(label, self._costs.get(self._entries[label].strategy, 1.0))
+
+    def _value(self, label: str) -> float:
+        return self._ladder.rating(label).sigma ** 2 / self._cost(label)
+
+    def _match_quality(self, label: str, other_label: str) -> float:
+        rating, other_rating = self._ladder.rating(label), self._ladder.rating(other_label)
+        spread = 2 * BETA ** 2 + rating.sigma ** 2 + other_rating.sigma ** 2
+        return math.exp(-((rating.mu - other_rating.mu) ** 2) / (2 * spread))
+
+    def next_table(self, table_size: int) -> TableSpec:
+        labels = list(self._entries)
+        # Random tie breaks, so entries with equal ratings all get played
+        random.shuffle(labels)
+        anchor = max(labels, key=self._value)
+        seats = [anchor]
+        while len(seats) < table_size:
+            # Every entry gets a seat before any gets a second one
+            candidates = [label for label in labels if label not in seats] or labels
+            seats.append(max(
+                candidates,
+                key=lambda label: self._match_quality(anchor, label) * self._value(label),
+            ))
+
+        random.shuffle(seats)
+        return TableSpec(seats=[self._entries[label] for label in seats], narration=False)
+
+    def converged(self, max_sigma: float) -> bool:
+        return all(self._ladder.rating(label).sigma <= max_sigma for label in self._entries)
+
+
+def play_rated_game(table_spec: TableSpec) -> List[str]:
+    """Play one game between bots and return the seat labels from the winner to the first one out"""
+    # Imported here, so the ladder can be loaded and printed without the game stack
+    from src.handler.game_handler import ResistanceCoupGameHandler
+    from src.utils.print import use_console
+
+    seats = table_spec.expanded_seats()
+    handler = ResistanceCoupGameHandler.from_table_spec(table_spec)
+    with use_console(Console(file=io.StringIO())):
+        try:
+            handler.setup_game()
+            while not handler.handle_turn():
+                pass
+        finally:
+            handler.close()
+    return [seats[seat].display_label for seat in handler.get_final_ranking()]
+
+
+def print_leaderboard(ladder: RatingLadder) -> None:
+    print(f"{'strategy':<40} {'rating':>7} {'95% interval':>17} {'games':>6}")
+    for label, rating in ladder.leaderboard():
+        low, high = rating.confidence_interval
+        print(f"{label:<40} {rating.mu:>7.2f} {f'{low:.1f} .. {high:.1f}':>17} {rating.games:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate strategies against each other")
+    parser.add_argument(
+        "--entries",
+        default="ai:think_time=0,llm",
+        help="Strategies to rate, e.g. 'ai:think_time=0,llm:model_name=gpt-4o-mini,llm:model_name=gpt-4o'",
+    )
+    parser.add_argument("--ratings", default="ratings.json", help="Ratings file, updated after every game")
+    parser.add_argument("--table-size", type=int, default=4)
+    parser.add_argument("--games", type=int, default=100, help="The most games to play")
+    parser.add_argument("--max-sigma", type=float, default=1.0, help="Stop once every rating is this certain")
+    parser.add_argument(
+        "--cost", action="append", default=[], metavar="LABEL=COST",
+        help="Relative cost of a game seat, e.g. 'llm=20' to spend fewer games on LLM players",
+    )
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    entries = TableSpec.from_cli_spec(args.entries).seats
+    costs = {label: float(cost) for label, _, cost in (item.partition("=") for item in args.cost)}
+    ladder = RatingLadder.load(args.ratings)
+    scheduler = MatchScheduler(ladder, entries, costs)
+
+    started = time.perf_counter()
+    games = 0
+    while games < args.games and not scheduler.converged(args.max_sigma):
+        ladder.record_game(play_rated_game(scheduler.next_table(args.table_size)))
+        ladder.save(args.ratings)
+        games += 1
+
+    print(f"Games played: {games} in {time.perf_counter() - started:.1f}s")
+    print_leaderboard(ladder)
+
+
+if __name__ == "__main__":
+    main()
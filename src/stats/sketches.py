@@ -0,0 +1,118 @@
+import math
+import random
+from typing import List, Optional, Tuple
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of numbers, in constant memory.
+
+    Uses Welford's online update, and Chan's formula to merge the stats of two streams.
+    """
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "RunningStats") -> None:
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            self.min, self.max = other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream, mergeable across workers (a KLL-style sketch).
+
+    Values are kept in levels of at most `capacity` items, where an item on level h stands
+    for 2^h values of the stream. A full level is sorted and every other item is promoted,
+    so memory only grows with the logarithm of the number of values.
+    """
+
+    __slots__ = ("capacity", "count", "_levels")
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.count = 0
+        self._levels: List[List[float]] = [[]]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self._levels[0].append(value)
+        if len(self._levels[0]) >= self.capacity:
+            self._compact()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.count += other.count
+        for height, items in enumerate(other._levels):
+            if height == len(self._levels):
+                self._levels.append([])
+            self._levels[height].extend(items)
+        self._compact()
+
+    def _compact(self) -> None:
+        height = 0
+        while height < len(self._levels):
+            level = self._levels[height]
+            if len(level) >= self.capacity:
+                level.sort()
+                # An odd item out stays behind, so no weight is lost
+                leftover = [level.pop()] if len(level) % 2 else []
+                # A random offset keeps the promoted half an unbiased sample of the level
+                promoted = level[random.getrandbits(1)::2]
+                level[:] = leftover
+                if height + 1 == len(self._levels):
+                    self._levels.append([])
+                self._levels[height + 1].extend(promoted)
+            height += 1
+
+    def _weighted_items(self) -> List[Tuple[float, int]]:
+        return sorted(
+            (value, 1 << height) for height, level in enumerate(self._levels) for value in level
+        )
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value below which a fraction `q` of the stream falls, e.g. 0.5 for the median"""
+        items = self._weighted_items()
+        if not items:
+            return None
+
+        total_weight = sum(weight for _, weight in items)
+        target = q * total_weight
+        cumulative_weight = 0
+        for value, weight in items:
+            cumulative_weight += weight
+            if cumulative_weight >= target:
+                return value
+        return items[-1][0]
@@ -0,0 +1,143 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+from rich.console import Console
+
+from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.table import TableSpec
+from src.stats.aggregator import TournamentStats
+from src.stats.training_data import (
+    DEFAULT_ROWS_PER_SHARD,
+    ShardInfo,
+    TrainingDataWriter,
+    clear_export_directory,
+    write_manifest,
+)
+from src.utils.print import use_console
+
+DEFAULT_TABLE = "ai*5:think_time=0"
+
+# Games a worker plays before sending back its partial aggregate
+GAMES_PER_BATCH = 500
+
+
+def play_games(
+        table_spec: TableSpec,
+        number_of_games: int,
+        export_directory: Optional[str] = None,
+        batch: int = 0,
+        rows_per_shard: int = DEFAULT_ROWS_PER_SHARD,
+) -> Tuple[TournamentStats, List[ShardInfo]]:
+    """Play games between bots, keeping nothing but the aggregated stats.
+
+    With an export directory, every decision is also written to training data shards of this batch.
+    """
+    stats = TournamentStats()
+    training_data = (
+        TrainingDataWriter(export_directory, batch, rows_per_shard) if export_directory else None
+    )
+    handler = ResistanceCoupGameHandler.from_table_spec(
+        table_spec, tournament_stats=stats, training_data=training_data
+    )
+    with use_console(Console(file=io.StringIO())) as console:
+        try:
+            for _ in range(number_of_games):
+                handler.setup_game()
+                while not handler.handle_turn():
+                    pass
+                # Drop the output of the finished game
+                console.file.seek(0)
+                console.file.truncate()
+        finally:
+            handler.close()
+    return stats, training_data.close() if training_data else []
+
+
+def run_tournament(
+        table_spec: TableSpec,
+        number_of_games: int,
+        workers: int = 1,
+        export_directory: Optional[str] = None,
+        rows_per_shard: int = DEFAULT_ROWS_PER_SHARD,
+) -> TournamentStats:
+    """Play the games in batches across worker processes, merging every batch as it comes in.
+
+    Workers write their training data shards themselves, only the manifest is written here. The
+    shards of an earlier run in the export directory are removed first.
+    """
+    if table_spec.has_human:
+        raise ValueError("A tournament table can't have a human seat")
+    if export_directory:
+        clear_export_directory(export_directory)
+
+    stats = TournamentStats()
+    shards: List[ShardInfo] = []
+    batches = [
+        (table_spec, min(GAMES_PER_BATCH, number_of_games - start), export_directory, batch, rows_per_shard)
+        for batch, start in enumerate(range(0, number_of_games, GAMES_PER_BATCH))
+    ]
+    if workers <= 1:
+        for batch in batches:
+            batch_stats, batch_shards = play_games(*batch)
+            stats.merge(batch_stats)
+            shards += batch_shards
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in as_completed([executor.submit(play_games, *batch) for batch in batches]):
+                batch_stats, batch_shards = future.result()
+                stats.merge(batch_stats)
+                shards += batch_shards
+
+    if export_directory:
+        write_manifest(
+            export_directory,
+            shards,
+            table=table_spec.model_dump_json(),
+            seat_labels=[seat.display_label for seat in table_spec.expanded_seats()],
+        )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play bot tournaments and summarize the results")
+    parser.add_argument("--table", default=DEFAULT_TABLE, help="Table composition, e.g. 'ai*3,llm*2'")
+    parser.add_argument("--table-config", help="Table composition from a .toml or .json file")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--csv", help="Write the summary to this CSV file")
+    parser.add_argument("--parquet", help="Write the summary to this Parquet file")
+    parser.add_argument("--export-dir", help="Write every decision to training data shards in this directory")
+    parser.add_argument("--rows-per-shard", type=int, default=DEFAULT_ROWS_PER_SHARD)
+    args = parser.parse_args()
+
+    if args.table_config:
+        # Nobody reads the table talk of a tournament
+        table_spec = TableSpec.from_file(args.table_config).model_copy(update={"narration": False})
+    else:
+        table_spec = TableSpec.from_cli_spec(args.table, narration=False)
+
+    started = time.perf_counter()
+    stats = run_tournament(table_spec, args.games, args.workers, args.export_dir, args.rows_per_shard)
+    elapsed = time.perf_counter() - started
+
+    if args.csv:
+        stats.export_csv(args.csv)
+    if args.parquet:
+        stats.export_parquet(args.parquet)
+
+    print(f"Games played: {stats.games} in {elapsed:.1f}s")
+    for row in stats.summary():
+        if row.section in ("win_rate", "bluffs", "challenges"):
+            print(f"{row.section:>10} {row.group:>8} {row.key:<12} {row.count}/{row.total} ({row.rate:.1%})")
+    print(
+        f"Game length: mean {stats.game_length.mean:.1f} turns, "
+        f"median {stats.game_length_quantiles.quantile(0.5)}, max {stats.game_length.max}"
+    )
+
+
+if __name__ == "__main__":
+    main()
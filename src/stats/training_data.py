@@ -0,0 +1,358 @@
+"""Training data for learned policies, recorded at every decision of simulated games.
+
+Every decision becomes one row of fixed-width columns: what the deciding player could see,
+which moves were legal, the move they made and whether they went on to win the game. Rows
+are written to compressed `.npz` shards of at most `rows_per_shard` rows. Every worker
+writes its own shards, and a JSON manifest lists all of them once the run is done.
+"""
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.models.action import Action, CounterAction, get_counter_action
+from src.models.beliefs import BeliefTracker
+from src.models.card import CardType
+from src.models.deck import CARD_TYPE_INDEX, CARD_TYPES
+from src.policies.batched import ObservationBatch, legal_action_mask
+from src.policies.endgame import (
+    ACT,
+    ACTION_INDEX,
+    CHALLENGE_ACTION,
+    CHALLENGE_COUNTER,
+    COUNTER,
+    NUMBER_OF_ACTIONS,
+    PASS,
+    RESPOND,
+)
+
+SCHEMA_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+DEFAULT_ROWS_PER_SHARD = 1 << 16
+
+# Opponent columns are padded to this many, so tables of up to 10 players share one schema
+MAX_OPPONENTS = 9
+NUMBER_OF_CARD_TYPES = len(CARD_TYPES)
+
+# What the deciding player can see, as column name, dtype and width (0 for a scalar column),
+# in the order of `observe`
+OBSERVATION_COLUMNS: Tuple[Tuple[str, str, int], ...] = (
+    # ACT, CHALLENGE_ACTION, COUNTER or CHALLENGE_COUNTER from `src.policies.endgame`
+    ("phase", "int8", 0),
+    ("coins", "int8", 0),
+    ("hand", "int8", NUMBER_OF_CARD_TYPES),
+    # Own cards plus every card discarded face up so far
+    ("cards_seen", "int8", NUMBER_OF_CARD_TYPES),
+    # Cards of every type the deciding player has claimed so far
+    ("claims", "int8", NUMBER_OF_CARD_TYPES),
+    # Opponents still in the game, in turn order after the deciding player, padded with 0 cards
+    ("opponent_coins", "int8", MAX_OPPONENTS),
+    ("opponent_cards", "int8", MAX_OPPONENTS),
+    # The card type claimed by the action or counter being responded to, who claimed it
+    # (opponent column) and what else they claimed so far. -1 and 0 when acting
+    ("claimed_card", "int8", 0),
+    ("claimant", "int8", 0),
+    ("claimant_claims", "int8", NUMBER_OF_CARD_TYPES),
+)
+OBSERVATION_WIDTH = sum(max(width, 1) for _, _, width in OBSERVATION_COLUMNS)
+
+# Every column of a shard, in the order of a flat row
+COLUMNS: Tuple[Tuple[str, str, int], ...] = (
+    ("game", "int64", 0),
+    ("turn", "int16", 0),
+    # Seat at the table (see `TrainingDataManifest.seat_labels`) and turn position of the
+    # deciding player, 0 for the player who started the game
+    ("seat", "int8", 0),
+    ("position", "int8", 0),
+    *OBSERVATION_COLUMNS,
+    # Action indices into `ACTIONS` when acting, PASS and RESPOND when responding
+    ("legal_moves", "bool", NUMBER_OF_ACTIONS),
+    ("move", "int8", 0),
+    # Opponent column of the target, -1 for none
+    ("target", "int8", 0),
+    # 1 if the deciding player won the game, -1 if they lost
+    ("outcome", "int8", 0),
+)
+# Filled in bulk when the game ends, not recorded per decision
+_DERIVED_COLUMNS = ("game", "legal_moves", "outcome")
+
+
+def _card_counts(card_types: Iterable[CardType]) -> List[int]:
+    counts = [0] * NUMBER_OF_CARD_TYPES
+    for card_type in card_types:
+        counts[CARD_TYPE_INDEX[card_type]] += 1
+    return counts
+
+
+def _claim_counts(beliefs: BeliefTracker, player_name: str) -> List[int]:
+    claim_counts = beliefs.claim_counts(player_name)
+    return [claim_counts[card_type] for card_type in CARD_TYPES]
+
+
+def observe(
+        phase: int,
+        player,
+        opponents: Sequence,
+        beliefs: BeliefTracker,
+        claimed_card: Optional[CardType] = None,
+        claimant=None,
+) -> List[int]:
+    """One flat row of `OBSERVATION_COLUMNS`, for a decision in a running game"""
+    hand = _card_counts(card.card_type for card in player.cards)
+    discard_counts = beliefs.discard_counts()
+    cards_seen = [count + discard_counts[card_type] for count, card_type in zip(hand, CARD_TYPES)]
+    padding = [0] * (MAX_OPPONENTS - len(opponents))
+    if claimant is None:
+        claim = [-1, -1, *([0] * NUMBER_OF_CARD_TYPES)]
+    else:
+        claim = [
+            CARD_TYPE_INDEX[claimed_card], opponents.index(claimant), *_claim_counts(beliefs, claimant.name)
+        ]
+
+    return [
+        phase, player.coins, *hand, *cards_seen, *_claim_counts(beliefs, player.name),
+        *(opponent.coins for opponent in opponents), *padding,
+        *(len(opponent.cards) for opponent in opponents), *padding,
+        *claim,
+    ]
+
+
+def observation_matrix(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """(n, OBSERVATION_WIDTH) the observation columns of a shard, laid out like `observe` rows"""
+    return np.concatenate(
+        [columns[name].reshape(len(columns[name]), -1) for name, _, _ in OBSERVATION_COLUMNS], axis=1
+    ).astype(np.int16)
+
+
+class ColumnSpec(BaseModel):
+    dtype: str
+    shape: List[int]
+
+
+class ShardInfo(BaseModel):
+    file: str
+    rows: int
+    games: int
+    bytes: int
+
+
+class TrainingDataManifest(BaseModel):
+    schema_version: int = SCHEMA_VERSION
+    columns: Dict[str, ColumnSpec]
+    shards: List[ShardInfo]
+    rows: int
+    games: int
+    table: str = ""
+    # Strategy label of every seat, indexed by the seat column
+    seat_labels: List[str] = []
+    created: float
+
+
+def _column_shape(width: int) -> List[int]:
+    return [width] if width else []
+
+
+class TrainingDataWriter:
+    """Writes the decisions of the games played in one worker to its own shards.
+
+    Shards are filled in preallocated column buffers and written with a temporary name first,
+    so a shard file that exists is always complete.
+    """
+
+    def __init__(self, directory: str, writer_id: int, rows_per_shard: int = DEFAULT_ROWS_PER_SHARD):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._writer_id = writer_id
+        self._rows_per_shard = rows_per_shard
+        self._buffers = {
+            name: np.zeros((rows_per_shard, *_column_shape(width)), dtype=dtype)
+            for name, dtype, width in COLUMNS
+        }
+        self._rows = 0
+        self._games_in_shard = 0
+        self._games = 0
+        self._shards: List[ShardInfo] = []
+
+    def start_game(self, seats: Iterable[Tuple[str, int, int]]) -> "DecisionRecorder":
+        """Start recording a game, given the (name, seat, turn position) of every player"""
+        self._games += 1
+        # Unique across workers as long as the writer ids are
+        return DecisionRecorder(self, (self._writer_id << 32) + self._games, seats)
+
+    def add_game(self, columns: Dict[str, np.ndarray]) -> None:
+        number_of_rows = len(columns["game"])
+        start = 0
+        # Games are counted in the shard they start in
+        self._games_in_shard += 1
+        while start < number_of_rows:
+            count = min(number_of_rows - start, self._rows_per_shard - self._rows)
+            for name, column in columns.items():
+                self._buffers[name][self._rows:self._rows + count] = column[start:start + count]
+            self._rows += count
+            start += count
+            if self._rows == self._rows_per_shard:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+
+        file_name = f"part-{self._writer_id:05d}-{len(self._shards):05d}.npz"
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **{name: column[:self._rows] for name, column in self._buffers.items()})
+        temporary_path = self._directory / f"{file_name}.tmp"
+        temporary_path.write_bytes(buffer.getbuffer())
+        os.replace(temporary_path, self._directory / file_name)
+
+        self._shards.append(ShardInfo(
+            file=file_name, rows=self._rows, games=self._games_in_shard, bytes=buffer.getbuffer().nbytes
+        ))
+        self._rows = 0
+        self._games_in_shard = 0
+
+    def close(self) -> List[ShardInfo]:
+        """Write the last, partly filled shard. Returns every shard written"""
+        self._flush()
+        return self._shards
+
+
+class DecisionRecorder:
+    """Collects the decisions of a single game, written once the game is over and its outcome known.
+
+    A game that is abandoned before it ends is never written.
+    """
+
+    def __init__(self, writer: TrainingDataWriter, game_id: int, seats: Iterable[Tuple[str, int, int]]):
+        self._writer = writer
+        self._game_id = game_id
+        self._seats: Dict[str, Tuple[int, int]] = {name: (seat, position) for name, seat, position in seats}
+        if len(self._seats) > MAX_OPPONENTS + 1:
+            raise ValueError(f"Training data is recorded for tables of up to {MAX_OPPONENTS + 1} players")
+        self._rows: List[List[int]] = []
+        self._deciders: List[str] = []
+
+    def _record(self, turn: int, player, observation: List[int], move: int, target: int) -> None:
+        self._deciders.append(player.name)
+        self._rows.append([turn, *self._seats[player.name], *observation, move, target])
+
+    def on_action(
+            self,
+            turn: int,
+            player,
+            opponents: Sequence,
+            beliefs: BeliefTracker,
+            action: Action,
+            target_player,
+    ) -> None:
+        target = opponents.index(target_player) if target_player is not None else -1
+        self._record(turn, player, observe(ACT, player, opponents, beliefs), ACTION_INDEX[action.action_type], target)
+
+    def on_challenge(
+            self,
+            turn: int,
+            player,
+            opponents: Sequence,
+            beliefs: BeliefTracker,
+            claim: Action | CounterAction,
+            claimant,
+            challenged: bool,
+    ) -> None:
+        """A decision whether to challenge the claimant's action or counter"""
+        phase = CHALLENGE_COUNTER if isinstance(claim, CounterAction) else CHALLENGE_ACTION
+        observation = observe(phase, player, opponents, beliefs, claim.associated_card_type, claimant)
+        self._record(turn, player, observation, RESPOND if challenged else PASS, -1)
+
+    def on_counter(
+            self,
+            turn: int,
+            player,
+            opponents: Sequence,
+            beliefs: BeliefTracker,
+            action: Action,
+            claimant,
+            countered: bool,
+    ) -> None:
+        """A decision whether to counter the claimant's action"""
+        counter_card = get_counter_action(action.action_type).associated_card_type
+        observation = observe(COUNTER, player, opponents, beliefs, counter_card, claimant)
+        self._record(turn, player, observation, RESPOND if countered else PASS, -1)
+
+    def on_game_end(self, winner_name: str) -> None:
+        if not self._rows:
+            return
+
+        block = np.array(self._rows, dtype=np.int16)
+        columns: Dict[str, np.ndarray] = {}
+        offset = 0
+        for name, dtype, width in COLUMNS:
+            if name in _DERIVED_COLUMNS:
+                continue
+            columns[name] = block[:, offset:offset + max(width, 1)].reshape(
+                len(block), *_column_shape(width)
+            ).astype(dtype)
+            offset += max(width, 1)
+
+        columns["game"] = np.full(len(block), self._game_id, dtype=np.int64)
+        columns["outcome"] = np.where(np.array(self._deciders) == winner_name, 1, -1).astype(np.int8)
+
+        # Legal moves follow the rules the batched policies are played with
+        acting = columns["phase"] == ACT
+        legal_moves = np.zeros((len(block), NUMBER_OF_ACTIONS), dtype=bool)
+        legal_moves[acting] = legal_action_mask(ObservationBatch(
+            coins=columns["coins"][acting],
+            hands=columns["hand"][acting],
+            opponent_coins=columns["opponent_coins"][acting],
+            opponent_cards=columns["opponent_cards"][acting],
+        ))
+        legal_moves[~acting, PASS] = legal_moves[~acting, RESPOND] = True
+        columns["legal_moves"] = legal_moves
+
+        self._writer.add_game({name: columns[name] for name, _, _ in COLUMNS})
+        self._rows = []
+        self._deciders = []
+
+
+def clear_export_directory(directory: str) -> None:
+    """Remove the shards and manifest of an earlier run, so they are never mixed with the next one"""
+    directory_path = Path(directory)
+    if not directory_path.is_dir():
+        return
+    (directory_path / MANIFEST_FILE).unlink(missing_ok=True)
+    for pattern in ("part-*.npz", "part-*.npz.tmp"):
+        for path in directory_path.glob(pattern):
+            path.unlink()
+
+
+def write_manifest(
+        directory: str, shards: Sequence[ShardInfo], table: str = "", seat_labels: Sequence[str] = ()
+) -> TrainingDataManifest:
+    """List the shards of every worker in one manifest, next to the shards"""
+    manifest = TrainingDataManifest(
+        columns={
+            name: ColumnSpec(dtype=dtype, shape=_column_shape(width)) for name, dtype, width in COLUMNS
+        },
+        shards=sorted(shards, key=lambda shard: shard.file),
+        rows=sum(shard.rows for shard in shards),
+        games=sum(shard.games for shard in shards),
+        table=table,
+        seat_labels=list(seat_labels),
+        created=time.time(),
+    )
+    (Path(directory) / MANIFEST_FILE).write_text(manifest.model_dump_json(indent=2))
+    return manifest
+
+
+def load_manifest(directory: str) -> TrainingDataManifest:
+    return TrainingDataManifest.model_validate(json.loads((Path(directory) / MANIFEST_FILE).read_text()))
+
+
+def iter_shards(directory: str) -> Iterable[Dict[str, np.ndarray]]:
+    """The columns of every shard listed in the manifest, one shard at a time"""
+    for shard in load_manifest(directory).shards:
+        with np.load(Path(directory) / shard.file) as data:
+            yield {name: data[name] for name in data.files}
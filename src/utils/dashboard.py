@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from rich.console import Console, Group, RenderableType
+from rich.live import Live
+from rich.panel import Panel
+from rich.text import Text
+
+from src.models.deck import Deck
+from src.models.players.base import BasePlayer
+from src.utils.game_state import generate_players_table, generate_state_panel
+from src.utils.print import _current_dashboard, get_console
+
+DEFAULT_FRAMES_PER_SECOND = 8
+EVENT_LOG_LINES = 12
+
+
+class LiveDashboard:
+    """Keeps the game state and the latest events on screen, redrawn in place.
+
+    While it is active, printed messages go to its event log instead of scrolling the terminal.
+    Updates only mark the screen as out of date, it is redrawn at most `frames_per_second` times
+    a second, so fast bots don't spend their time on terminal output. An update that comes in
+    before the next frame is due is drawn once it is, even if nothing else happens in the meantime.
+    """
+
+    def __init__(
+            self,
+            console: Optional[Console] = None,
+            frames_per_second: float = DEFAULT_FRAMES_PER_SECOND,
+            event_log_lines: int = EVENT_LOG_LINES,
+    ):
+        self._console = console or get_console()
+        self._frame_interval = 1 / frames_per_second
+        self._events: deque[Text] = deque(maxlen=event_log_lines)
+        # What the state is built from, the state itself is only built once a frame shows it
+        self._state_key: Optional[Tuple] = None
+        self._state_snapshot: Optional[Tuple[List[BasePlayer], int, Deck, int]] = None
+        self._state: RenderableType = Text()
+        self._turn = 0
+        self._live: Optional[Live] = None
+        self._paused = False
+        self._last_frame = 0.0
+        self._stale = False
+        self._pending_frame: Optional[threading.Timer] = None
+        # Frames can be drawn from the timer thread, and table talk is logged from worker threads
+        self._lock = threading.RLock()
+        self._token = None
+
+    def __enter__(self) -> "LiveDashboard":
+        self._live = Live(self._render(), console=self._console, auto_refresh=False)
+        self._live.start()
+        self._token = _current_dashboard.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _current_dashboard.reset(self._token)
+        with self._lock:
+            self._cancel_pending_frame()
+            self._redraw()
+            self._live.stop()
+            self._live = None
+
+    def show_state(
+            self, players: List[BasePlayer], current_player_index: int, deck: Deck, treasury_coins: int
+    ) -> None:
+        state_key = (
+            current_player_index,
+            deck.to_counts(),
+            treasury_coins,
+            tuple((player.coins, player.is_active, tuple(player.cards)) for player in players),
+        )
+        with self._lock:
+            if state_key == self._state_key:
+                return
+            self._state_key = state_key
+            # Players keep changing while the frame waits to be drawn, it is drawn from copies
+            self._state_snapshot = (
+                [player.model_copy(update={"cards": list(player.cards)}) for player in players],
+                current_player_index,
+                deck.copy(),
+                treasury_coins,
+            )
+            self._changed()
+
+    def show_turn(self, turn: int) -> None:
+        with self._lock:
+            self._turn = turn
+            self._changed()
+
+    def log(self, text: Text) -> None:
+        with self._lock:
+            self._events.append(text)
+            self._changed()
+
+    def extend_event(self, text: Text, more: str) -> None:
+        """Add to an event that was logged before, e.g. table talk while it is generated"""
+        with self._lock:
+            text.append(more)
+            self._changed()
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Stop redrawing for a while, to ask a human something"""
+        if self._live is None:
+            yield
+            return
+
+        with self._lock:
+            self._redraw()
+            self._paused = True
+            self._live.stop()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._live.start()
+                self._paused = False
+                self._redraw()
+
+    def _changed(self) -> None:
+        self._stale = True
+        wait = self._frame_interval - (time.monotonic() - self._last_frame)
+        if wait <= 0:
+            self._redraw()
+        elif self._pending_frame is None and self._live is not None:
+            self._pending_frame = threading.Timer(wait, self._draw_pending_frame)
+            self._pending_frame.daemon = True
+            self._pending_frame.start()
+
+    def _draw_pending_frame(self) -> None:
+        with self._lock:
+            self._pending_frame = None
+            self._redraw()
+
+    def _cancel_pending_frame(self) -> None:
+        if self._pending_frame is not None:
+            self._pending_frame.cancel()
+            self._pending_frame = None
+
+    def _redraw(self) -> None:
+        if self._live is None or self._paused or not self._stale:
+            return
+        self._cancel_pending_frame()
+        self._live.update(self._render(), refresh=True)
+        self._last_frame = time.monotonic()
+        self._stale = False
+
+    def _render(self) -> RenderableType:
+        if self._state_snapshot is not None:
+            players, current_player_index, deck, treasury_coins = self._state_snapshot
+            self._state = Group(
+                generate_players_table(players, current_player_index),
+                generate_state_panel(deck, treasury_coins, players[current_player_index]),
+            )
+            self._state_snapshot = None
+
+        events = Text("\n").join(self._events) if self._events else Text("No events yet", style="grey46")
+        return Group(
+            self._state,
+            Panel(events, title=f"Turn {self._turn}" if self._turn else "Events", title_align="left"),
+        )
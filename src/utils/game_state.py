@@ -4,12 +4,12 @@ from rich.panel import Panel
 from rich.table import Column, Table
 from rich.text import Text
 
-from src.models.card import Card
+from src.models.deck import Deck
 from src.models.players.human import BasePlayer
 
 
 def generate_state_panel(
-    deck: list[Card], treasury_coins: int, current_player: BasePlayer
+    deck: Deck, treasury_coins: int, current_player: BasePlayer
 ) -> Panel:
     """Generate a panel showing some game information"""
     return Panel(
@@ -1,4 +1,13 @@
+import asyncio
+import io
+import math
 import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional
 
 from rich.console import Console, JustifyMethod
 from rich.highlighter import Highlighter
@@ -11,8 +20,57 @@ from rich.tree import Tree
 from src.models.action import Action, ActionType, CounterAction, CounterActionType
 from src.models.players.base import BasePlayer
 
+if TYPE_CHECKING:
+    from src.utils.dashboard import LiveDashboard
+
 console = Console()
 
+# Console used by the print helpers, so each table of a game server can print somewhere else
+_current_console: ContextVar[Console] = ContextVar("current_console", default=console)
+
+# Live dashboard that takes the printed messages instead, while one is on screen
+_current_dashboard: ContextVar[Optional["LiveDashboard"]] = ContextVar("current_dashboard", default=None)
+
+# Events printed while `capture_print` runs a print helper, collected instead of shown
+_current_capture: ContextVar[Optional[List[Text]]] = ContextVar("current_capture", default=None)
+
+# Gets table talk as (speaker, new text) while it is generated, instead of the console, e.g. to stream it
+# to a game server client. The complete line is still printed once it is done
+_current_speech_listener: ContextVar[Optional[Callable[[str, str], None]]] = ContextVar(
+    "current_speech_listener", default=None
+)
+
+# Timed prompts warn once this many seconds are left
+COUNTDOWN_WARNING_SECONDS = 10
+
+
+def get_console() -> Console:
+    return _current_console.get()
+
+
+@contextmanager
+def use_console(target_console: Console) -> Iterator[Console]:
+    """Send everything printed in the current context to the given console"""
+    token = _current_console.set(target_console)
+    try:
+        yield target_console
+    finally:
+        _current_console.reset(token)
+
+
+def get_dashboard() -> Optional["LiveDashboard"]:
+    return _current_dashboard.get()
+
+
+@contextmanager
+def use_speech_listener(listener: Callable[[str, str], None]) -> Iterator[None]:
+    """Send the table talk of the current context to the listener while it is generated"""
+    token = _current_speech_listener.set(listener)
+    try:
+        yield
+    finally:
+        _current_speech_listener.reset(token)
+
 
 class RainbowHighlighter(Highlighter):
     def highlight(self, text):
@@ -21,7 +79,8 @@ class RainbowHighlighter(Highlighter):
 
 
 def print_blank():
-    console.print()
+    if get_dashboard() is None and _current_capture.get() is None:
+        get_console().print()
 
 
 def print_text(content: str, style: str = "", rainbow: bool = False, with_markup: bool = False):
@@ -38,7 +97,7 @@ def print_text(content: str, style: str = "", rainbow: bool = False, with_markup
     if rainbow:
         text = RainbowHighlighter()(text)
 
-    console.print(text)
+    _print_event(text)
 
 
 def print_texts(*parts):
@@ -46,7 +105,104 @@ def print_texts(*parts):
 
     text = Text.assemble(*parts)
 
-    console.print(text)
+    _print_event(text)
+
+
+def _print_event(text: Text):
+    captured_events = _current_capture.get()
+    if captured_events is not None:
+        captured_events.append(text)
+        return
+
+    dashboard = get_dashboard()
+    if dashboard is not None:
+        dashboard.log(text)
+    else:
+        get_console().print(text)
+
+
+def capture_print(func: Callable[..., Any], *args, **kwargs) -> str:
+    """Run a print helper like `print_text` once, show what it printed and return it as plain text"""
+    captured_events: List[Text] = []
+    token = _current_capture.set(captured_events)
+    try:
+        func(*args, **kwargs)
+    finally:
+        _current_capture.reset(token)
+
+    capture_console = Console(file=io.StringIO())
+    for text in captured_events:
+        capture_console.print()
+        capture_console.print(text)
+        print_blank()
+        _print_event(text)
+    return capture_console.file.getvalue()
+
+
+class SpeechPrinter:
+    """Prints what a player says while it is being generated, so it shows up from the first token on.
+
+    `update` takes the message so far and may be called from any thread. Once `finish` has the
+    complete message, later updates are ignored: a model answer that comes in after its deadline
+    doesn't keep printing.
+    """
+
+    def __init__(self, speaker: str):
+        self._speaker = speaker
+        self._prefix = f"{speaker} said: "
+        # Captured here, updates may come from the worker thread the model is called in
+        self._console = get_console()
+        self._dashboard = get_dashboard()
+        self._listener = _current_speech_listener.get()
+        self._lock = threading.Lock()
+        self._event: Optional[Text] = None
+        self._printed = ""
+        self._started = False
+        self._finished = False
+
+    def update(self, message: str) -> None:
+        with self._lock:
+            # Partially parsed answers can still change what came before, wait until they don't
+            if self._finished or not message.startswith(self._printed):
+                return
+            self._write(message[len(self._printed):])
+            self._printed = message
+
+    def finish(self, message: str) -> None:
+        with self._lock:
+            self._finished = True
+            streamed_line = self._started and self._listener is None
+            if streamed_line and message.startswith(self._printed):
+                self._write(message[len(self._printed):])
+                if self._dashboard is None:
+                    self._console.print()
+                return
+            if streamed_line and self._dashboard is None:
+                # End the line that was cut short, the message is printed again in full below
+                self._console.print()
+
+        print_text(f"{self._prefix}{message}")
+
+    def _write(self, text: str) -> None:
+        if not text:
+            return
+        if self._listener is not None:
+            self._listener(self._speaker, text)
+            return
+
+        if not self._started:
+            self._started = True
+            if self._dashboard is not None:
+                self._event = Text(self._prefix)
+                self._dashboard.log(self._event)
+            else:
+                self._console.print()
+                self._console.print(self._prefix, end="", markup=False, highlight=False)
+
+        if self._dashboard is not None:
+            self._dashboard.extend_event(self._event, text)
+        else:
+            self._console.print(text, end="", markup=False, highlight=False, soft_wrap=True)
 
 
 def print_tree(root: str, content: list[str]):
@@ -55,31 +211,153 @@ def print_tree(root: str, content: list[str]):
     tree = Tree(root)
     for line in content:
         tree.add(line)
-    console.print(tree)
+    get_console().print(tree)
 
 
 def print_table(table: Table, justify: JustifyMethod = "center"):
     print_blank()
 
-    console.print(table, justify=justify)
+    get_console().print(table, justify=justify)
 
 
 def print_panel(panel: Panel, justify: JustifyMethod = "center"):
     print_blank()
 
-    console.print(panel, justify=justify)
+    get_console().print(panel, justify=justify)
 
 
 def print_prompt(content: str) -> str:
-    response = None
-    while not response:
-        response = Prompt.ask(content)
-    return response
+    with _prompting():
+        response = None
+        while not response:
+            response = Prompt.ask(content, console=get_console())
+        return response
 
 
 def print_confirm(content: str) -> bool:
     print_blank()
-    return Confirm.ask(content)
+    with _prompting():
+        return Confirm.ask(content, console=get_console())
+
+
+async def aprint_prompt(content: str, deadline: Optional[float] = None) -> str:
+    """Like `print_prompt`, but waits for the answer without blocking the event loop.
+
+    With a deadline (in `time.monotonic()` seconds) the prompt shows how much time is left.
+    It doesn't give up by itself: cancel it, e.g. with `asyncio.wait_for`, once time is up.
+    """
+    with _prompting():
+        response = ""
+        while not response:
+            response = await _ask_line(content, deadline)
+        return response
+
+
+async def aprint_confirm(content: str, deadline: Optional[float] = None) -> bool:
+    """Like `print_confirm`, but waits for the answer without blocking the event loop"""
+    print_blank()
+    with _prompting():
+        while True:
+            response = (await _ask_line(f"{content} [prompt.choices]\\[y/n][/]", deadline)).lower()
+            if response in ("y", "yes"):
+                return True
+            if response in ("n", "no"):
+                return False
+            get_console().print("[prompt.invalid]Please enter Y or N")
+
+
+async def _ask_line(content: str, deadline: Optional[float]) -> str:
+    # What was typed too late for a question that timed out doesn't answer this one
+    _terminal_input.discard_stale()
+
+    if deadline is None:
+        get_console().print(f"{content}: ", end="")
+        return (await _terminal_input.readline()).strip()
+
+    get_console().print(f"{content} [grey46]({_seconds_left(deadline)}s left)[/]: ", end="")
+    warning_delay = deadline - time.monotonic() - COUNTDOWN_WARNING_SECONDS
+    if warning_delay > 0:
+        try:
+            return (await asyncio.wait_for(_terminal_input.readline(), warning_delay)).strip()
+        except asyncio.TimeoutError:
+            get_console().print()
+            get_console().print(f"[bold red]{_seconds_left(deadline)}s left![/] {content}: ", end="")
+
+    return (await _terminal_input.readline()).strip()
+
+
+def _seconds_left(deadline: float) -> int:
+    return max(0, math.ceil(deadline - time.monotonic()))
+
+
+class _TerminalInput:
+    """Reads lines from stdin in a background thread and hands them to the running event loop,
+    so waiting on a human doesn't hold up the rest of the game"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lines: Optional[asyncio.Queue] = None
+        self._reader: Optional[threading.Thread] = None
+        self._at_eof = False
+        self._abandoned = False
+
+    def discard_stale(self) -> None:
+        lines = self._bind(asyncio.get_running_loop())
+        while self._abandoned and not lines.empty():
+            lines.get_nowait()
+        self._abandoned = False
+
+    async def readline(self) -> str:
+        if self._at_eof:
+            raise EOFError("stdin is closed")
+        try:
+            line = await self._bind(asyncio.get_running_loop()).get()
+        except asyncio.CancelledError:
+            self._abandoned = True
+            raise
+        self._abandoned = False
+        if line is None:
+            raise EOFError("stdin is closed")
+        return line
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+        with self._lock:
+            if self._loop is not loop:
+                self._loop, self._lines = loop, asyncio.Queue()
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._read_forever, name="stdin", daemon=True)
+                self._reader.start()
+            return self._lines
+
+    def _read_forever(self) -> None:
+        for line in sys.stdin:
+            self._deliver(line.rstrip("\n"))
+        self._at_eof = True
+        self._deliver(None)
+
+    def _deliver(self, line: Optional[str]) -> None:
+        with self._lock:
+            loop, lines = self._loop, self._lines
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        except RuntimeError:
+            # The event loop that asked is gone, nobody is waiting for this line
+            pass
+
+
+_terminal_input = _TerminalInput()
+
+
+@contextmanager
+def _prompting() -> Iterator[None]:
+    dashboard = get_dashboard()
+    if dashboard is None:
+        yield
+        return
+
+    with dashboard.paused():
+        yield
 
 
 def build_action_report_string(
@@ -0,0 +1,36 @@
+from typing import Any, Generator, Protocol, TypeVar
+
+T = TypeVar("T")
+
+
+class Step(Protocol):
+    """Something a decision has to wait on, like a player's answer or a model call"""
+
+    def run(self) -> Any:
+        ...
+
+    async def arun(self) -> Any:
+        ...
+
+
+# Logic that waits on players is written once, as a generator that yields every step it has
+# to wait on and is sent back the results. It is run either blocking, or inside an event loop
+Steps = Generator[Step, Any, T]
+
+
+def run_steps(steps: Steps[T]) -> T:
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(step.run())
+    except StopIteration as stop:
+        return stop.value
+
+
+async def arun_steps(steps: Steps[T]) -> T:
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(await step.arun())
+    except StopIteration as stop:
+        return stop.value
@@ -0,0 +1,47 @@
+from src.stats.aggregator import TournamentStats
+
+
+def _play(stats: TournamentStats, winner: str, turns: int) -> None:
+    recorder = stats.start_game([("Ann", "ai", 0), ("Bob", "llm", 1)])
+    recorder.on_action("Ann", "tax", claimed=True, bluffing=True)
+    recorder.on_challenge("Bob", "Ann", succeeded=True)
+    recorder.on_action("Bob", "income", claimed=False, bluffing=False)
+    for turn in range(1, turns + 1):
+        recorder.on_turn_end(turn, [turn, 2])
+    recorder.on_game_end(winner, turns)
+
+
+def _rows(stats: TournamentStats):
+    return {(row.section, row.group, row.key): row for row in stats.summary()}
+
+
+def test_summary_counts_wins_bluffs_and_challenges():
+    stats = TournamentStats()
+    _play(stats, "Ann", 4)
+    _play(stats, "Bob", 6)
+
+    rows = _rows(stats)
+
+    assert rows["win_rate", "strategy", "ai"].rate == 0.5
+    assert rows["win_rate", "position", "1"].count == 1
+    assert rows["actions", "llm", "income"].count == 2
+    assert rows["bluffs", "ai", "bluff_rate"].rate == 1.0
+    assert rows["bluffs", "ai", "caught_rate"].count == 2
+    assert rows["challenges", "llm", "success_rate"].rate == 1.0
+    assert ("bluffs", "llm", "bluff_rate") not in rows
+    game_length = rows["game_length", "turns", ""]
+    assert (game_length.count, game_length.mean, game_length.min, game_length.max) == (2, 5.0, 4, 6)
+    assert rows["coins_by_turn", "turn", "5"].count == 2
+
+
+def test_merged_stats_equal_the_stats_of_all_games():
+    together, first, second = TournamentStats(), TournamentStats(), TournamentStats()
+    for stats in (together, first):
+        _play(stats, "Ann", 4)
+    for stats in (together, second):
+        _play(stats, "Bob", 6)
+
+    first.merge(second)
+
+    assert first.games == 2
+    assert _rows(first) == _rows(together)
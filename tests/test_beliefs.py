@@ -0,0 +1,122 @@
+import pytest
+
+from src.models.beliefs import DEFAULT_BLUFF_LIKELIHOOD, HAND_SHAPES, BeliefTracker
+from src.models.card import CardType, create_card
+
+
+def _tracker(*names: str) -> BeliefTracker:
+    beliefs = BeliefTracker()
+    beliefs.reset(names or ("alice", "bob"))
+    return beliefs
+
+
+def test_prior_is_a_distribution_over_pairs():
+    distribution = _tracker().hand_distribution("alice")
+
+    assert sum(distribution.values()) == pytest.approx(1.0)
+    assert all(len(hand) == 2 for hand in distribution)
+    assert len(distribution) == len(HAND_SHAPES) - len(CardType)
+    # 3 copies of every card in a deck of 15
+    assert _tracker().card_probabilities("alice")[CardType.duke] == pytest.approx(1 - (12 * 11) / (15 * 14))
+
+
+def test_claim_makes_the_card_more_likely():
+    beliefs = _tracker()
+    before = beliefs.card_probabilities("alice")[CardType.duke]
+
+    beliefs.on_claim("alice", CardType.duke)
+
+    assert beliefs.card_probabilities("alice")[CardType.duke] > before
+    assert beliefs.claim_counts("alice")[CardType.duke] == 1
+    assert sum(beliefs.hand_distribution("alice").values()) == pytest.approx(1.0)
+
+
+def test_claim_keeps_the_bluff_likelihood_ratio():
+    beliefs = _tracker()
+    before = beliefs.hand_distribution("alice")
+
+    beliefs.on_claim("alice", CardType.duke)
+
+    after = beliefs.hand_distribution("alice")
+    holding, bluffing = (CardType.duke, CardType.captain), (CardType.contessa, CardType.captain)
+    ratio = (after[bluffing] / after[holding]) / (before[bluffing] / before[holding])
+    assert ratio == pytest.approx(DEFAULT_BLUFF_LIKELIHOOD)
+
+
+def test_caught_bluff_rules_the_card_out():
+    beliefs = _tracker()
+    beliefs.on_claim("alice", CardType.duke)
+
+    beliefs.on_challenge_succeeded("alice", CardType.duke)
+
+    assert beliefs.card_probabilities("alice")[CardType.duke] == pytest.approx(0.0)
+
+
+def test_discard_leaves_a_single_card_and_is_public():
+    beliefs = _tracker()
+
+    beliefs.on_discard("alice", CardType.assassin)
+
+    distribution = beliefs.hand_distribution("alice")
+    assert all(len(hand) == 1 for hand in distribution)
+    assert sum(distribution.values()) == pytest.approx(1.0)
+    assert beliefs.discard_counts()[CardType.assassin] == 1
+    # One assassin fewer is left unseen, for hands drawn from now on
+    beliefs.on_exchange("bob")
+    fresh = _tracker()
+    fresh.on_exchange("bob")
+    assert beliefs.card_probabilities("bob")[CardType.assassin] < fresh.card_probabilities("bob")[CardType.assassin]
+
+
+def test_losing_the_last_card_defeats_the_player():
+    beliefs = _tracker()
+
+    beliefs.on_discard("alice", CardType.assassin)
+    beliefs.on_discard("alice", CardType.duke)
+
+    assert beliefs.hand_distribution("alice") == {}
+    assert "alice: defeated" in beliefs.summarize("bob")
+
+
+def test_replaced_card_is_a_fresh_draw():
+    beliefs = _tracker()
+    beliefs.on_claim("alice", CardType.duke)
+
+    beliefs.on_card_replaced("alice", CardType.duke)
+
+    distribution = beliefs.hand_distribution("alice")
+    assert all(len(hand) == 2 for hand in distribution)
+    assert sum(distribution.values()) == pytest.approx(1.0)
+
+
+def test_exchange_forgets_the_claims_evidence():
+    beliefs = _tracker()
+    beliefs.on_claim("alice", CardType.duke)
+
+    beliefs.on_exchange("alice")
+
+    assert beliefs.hand_distribution("alice") == pytest.approx(_tracker().hand_distribution("alice"))
+    assert beliefs.claim_counts("alice")[CardType.duke] == 1
+
+
+def test_observer_cards_are_taken_out_of_the_unseen_pool():
+    beliefs = _tracker()
+    observer_cards = [create_card(CardType.duke), create_card(CardType.duke)]
+
+    public = beliefs.card_probabilities("alice")[CardType.duke]
+    observed = beliefs.card_probabilities("alice", observer_cards)[CardType.duke]
+
+    assert observed < public
+    assert sum(beliefs.hand_distribution("alice", observer_cards).values()) == pytest.approx(1.0)
+
+
+def test_summary_lists_the_other_players_only():
+    beliefs = _tracker("alice", "bob", "carol")
+    beliefs.on_claim("bob", CardType.captain)
+    beliefs.on_discard("carol", CardType.contessa)
+
+    summary = beliefs.summarize("alice")
+
+    assert "alice" not in summary
+    assert "bob (2 cards)" in summary and "claimed Captain x1" in summary
+    assert "carol (1 cards)" in summary and "discarded Contessa" in summary
@@ -0,0 +1,30 @@
+from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.card import CardType, create_card
+from src.models.players.card_value_player import CardValuePlayer
+from src.models.table import TableSpec
+
+
+def _card_value_player_at_table() -> CardValuePlayer:
+    table_spec = TableSpec.from_cli_spec("cfr,ai:think_time=0", narration=False)
+    handler = ResistanceCoupGameHandler.from_table_spec(table_spec)
+    handler.setup_game()
+    return next(player for player in handler.get_active_players() if isinstance(player, CardValuePlayer))
+
+
+def test_discards_the_least_valuable_card():
+    player = _card_value_player_at_table()
+    player.cards = [create_card(CardType.duke), create_card(CardType.captain)]
+
+    player.remove_card()
+
+    assert [card.card_type for card in player.cards] == [CardType.duke]
+
+
+def test_sends_back_the_least_valuable_cards():
+    player = _card_value_player_at_table()
+    player.cards = [create_card(CardType.ambassador), create_card(CardType.contessa)]
+
+    returned = player.choose_exchange_cards([create_card(CardType.duke), create_card(CardType.captain)])
+
+    assert sorted(card.card_type for card in returned) == [CardType.ambassador, CardType.captain]
+    assert sorted(card.card_type for card in player.cards) == [CardType.contessa, CardType.duke]
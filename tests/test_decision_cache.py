@@ -0,0 +1,76 @@
+from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.card import CardType, create_card
+from src.models.players.llm_player.decision_cache import (
+    MISS,
+    CacheGranularity,
+    DecisionCache,
+    situation_key,
+)
+from src.models.players.llm_player.llm_player import LLMPlayer, decision_cache
+from src.models.table import TableSpec
+
+
+def _llm_player_at_table() -> LLMPlayer:
+    table_spec = TableSpec.from_cli_spec(
+        "llm:cache_granularity=coarse;cache_exploration_rate=0,ai:think_time=0", narration=False
+    )
+    handler = ResistanceCoupGameHandler.from_table_spec(table_spec)
+    handler.setup_game()
+    return next(player for player in handler.get_active_players() if isinstance(player, LLMPlayer))
+
+
+def test_lookup_replays_most_common_answer():
+    cache = DecisionCache()
+    cache.store("key", "income")
+    cache.store("key", "tax")
+    cache.store("key", "tax")
+
+    assert cache.lookup("key") == "tax"
+    assert cache.lookup("other") is MISS
+    assert cache.stats.hits == 1
+    assert cache.stats.lookups == 2
+
+
+def test_answer_that_cant_be_played_is_a_miss():
+    cache = DecisionCache()
+    cache.store("key", "steal")
+
+    assert cache.lookup("key", from_answer=lambda answer: None) is MISS
+    assert cache.stats.hits == 0
+
+
+def test_least_recently_used_situation_is_evicted():
+    cache = DecisionCache(max_entries=2)
+    cache.store("first", 1)
+    cache.store("second", 2)
+    cache.lookup("first")
+    cache.store("third", 3)
+
+    assert cache.lookup("second") is MISS
+    assert cache.lookup("first") == 1
+    assert cache.stats.entries == 2
+
+
+def test_coarse_key_ignores_opponent_coins():
+    player = _llm_player_at_table()
+    opponent = player._opponents()[0]
+    beliefs = player._game_handler.get_belief_tracker()
+
+    key = situation_key("remove_card", player, [opponent], beliefs, CacheGranularity.coarse)
+    opponent.coins += 5
+    assert situation_key("remove_card", player, [opponent], beliefs, CacheGranularity.coarse) == key
+    assert situation_key("remove_card", player, [opponent], beliefs, CacheGranularity.normal) != key
+
+
+def test_cached_discard_from_a_pair_removes_one_card():
+    decision_cache.clear()
+    player = _llm_player_at_table()
+    duke = create_card(CardType.duke)
+    player.cards = [duke, duke]
+    decision_cache.store(player._cached_discard().key, CardType.duke)
+
+    player.remove_card()
+
+    assert [card.card_type for card in player.cards] == [CardType.duke]
+    assert decision_cache.stats.hits == 1
+    decision_cache.clear()
@@ -0,0 +1,91 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.models.card import CardType, create_card
+from src.models.deck import BASE_COPIES_PER_TYPE, CARD_TYPES, Deck, copies_per_type_for
+
+
+def test_full_deck_has_every_copy():
+    deck = Deck.full()
+
+    assert len(deck) == BASE_COPIES_PER_TYPE * len(CARD_TYPES)
+    assert all(deck.count(card_type) == BASE_COPIES_PER_TYPE for card_type in CardType)
+
+
+def test_draw_removes_the_card_it_hands_out():
+    deck = Deck.full()
+
+    card = deck.draw()
+
+    assert len(deck) == BASE_COPIES_PER_TYPE * len(CARD_TYPES) - 1
+    assert deck.count(card.card_type) == BASE_COPIES_PER_TYPE - 1
+
+
+def test_draw_from_an_empty_deck_fails():
+    with pytest.raises(IndexError):
+        Deck().draw()
+
+
+def test_put_back_restores_the_deck():
+    deck = Deck.full()
+
+    deck.put_back(deck.draw())
+
+    assert deck == Deck.full()
+
+
+def test_draws_hand_out_one_shared_card_per_type():
+    deck = Deck.full()
+
+    cards = [deck.draw() for _ in range(len(deck))]
+
+    by_type = {}
+    for card in cards:
+        assert by_type.setdefault(card.card_type, card) is card
+    assert len(by_type) == len(CARD_TYPES)
+
+
+def test_drawing_the_whole_deck_gives_every_copy():
+    random.seed(0)
+    deck = Deck([1, 2, 0, 3, 1])
+
+    drawn = Counter(deck.draw().card_type for _ in range(len(deck)))
+
+    assert drawn == Counter({card_type: count for card_type, count in zip(CARD_TYPES, [1, 2, 0, 3, 1]) if count})
+    assert len(deck) == 0
+
+
+def test_draws_are_uniform_over_the_remaining_cards():
+    random.seed(1)
+    draws = Counter(Deck([1, 3, 0, 0, 0]).draw().card_type for _ in range(4000))
+
+    assert draws[CARD_TYPES[1]] / 4000 == pytest.approx(0.75, abs=0.03)
+    assert draws[CARD_TYPES[2]] == 0
+
+
+def test_counts_round_trip_and_copies_are_independent():
+    deck = Deck.from_counts([3, 2, 1, 0, 3])
+    copy = deck.copy()
+
+    copy.put_back(create_card(CardType.duke))
+
+    assert Deck.from_counts(deck.to_counts()) == deck
+    assert copy != deck
+    assert len(copy) == len(deck) + 1
+
+
+def test_invalid_counts_are_rejected():
+    with pytest.raises(ValueError):
+        Deck([1, 2])
+    with pytest.raises(ValueError):
+        Deck([1, -1, 0, 0, 0])
+
+
+@pytest.mark.parametrize("players,copies", [(2, 3), (6, 3), (7, 4), (9, 5), (10, 5)])
+def test_large_tables_get_more_copies(players, copies):
+    copies_per_type = copies_per_type_for(players)
+
+    assert copies_per_type == copies
+    assert copies_per_type * len(CARD_TYPES) >= 2 * players + 3
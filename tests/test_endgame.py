@@ -0,0 +1,101 @@
+from src.models.card import CardType
+from src.models.deck import CARD_TYPE_INDEX
+from src.policies.endgame import (
+    ACT,
+    ASSASSINATE,
+    CHALLENGE_ACTION,
+    CHALLENGE_COUNTER,
+    COUNTER,
+    COUP,
+    PASS,
+    RESPOND,
+    STEAL,
+    TAX,
+    EndgameState,
+    legal_decisions,
+)
+
+DUKE, CONTESSA, ASSASSIN, CAPTAIN, AMBASSADOR = (
+    CARD_TYPE_INDEX[card_type]
+    for card_type in (CardType.duke, CardType.contessa, CardType.assassin, CardType.captain, CardType.ambassador)
+)
+
+
+def _hand(*cards: int):
+    return tuple(sorted(cards))
+
+
+def test_coup_takes_the_least_valuable_card():
+    state = EndgameState([_hand(DUKE), _hand(DUKE, AMBASSADOR)], [7, 0])
+
+    state.apply(COUP)
+
+    assert state.coins == [0, 0]
+    assert state.hands[1] == _hand(DUKE)
+    assert (state.actor, state.phase, state.turn) == (1, ACT, 1)
+
+
+def test_unchallenged_tax_is_claimed_and_paid():
+    state = EndgameState([_hand(CAPTAIN), _hand(CONTESSA)], [0, 0])
+
+    state.apply(TAX)
+    assert state.phase == CHALLENGE_ACTION
+    assert state.current_player == 1
+    state.apply(PASS)
+
+    assert state.coins == [3, 0]
+    assert state.claims[0] == 1 << DUKE
+
+
+def test_failed_challenge_goes_through_without_a_counter():
+    state = EndgameState([_hand(CAPTAIN), _hand(DUKE, CONTESSA)], [0, 2])
+
+    state.apply(STEAL)
+    state.apply(RESPOND)
+
+    assert state.hands[1] == _hand(DUKE)
+    assert state.coins == [2, 0]
+    assert state.phase == ACT
+
+
+def test_caught_bluff_loses_a_card_and_the_action():
+    state = EndgameState([_hand(DUKE, CAPTAIN), _hand(CONTESSA)], [3, 0])
+
+    state.apply(ASSASSINATE)
+    state.apply(RESPOND)
+
+    assert state.hands[0] == _hand(DUKE)
+    assert state.coins == [3, 0]
+    assert state.phase == ACT
+
+
+def test_challenged_counter_with_the_card_blocks_the_assassination():
+    state = EndgameState([_hand(ASSASSIN, DUKE), _hand(CONTESSA, CAPTAIN)], [3, 0])
+
+    state.apply(ASSASSINATE)
+    state.apply(PASS)
+    assert state.phase == COUNTER
+    state.apply(RESPOND)
+    assert state.phase == CHALLENGE_COUNTER
+    assert state.current_player == 0
+    state.apply(RESPOND)
+
+    assert state.hands == [_hand(DUKE), _hand(CONTESSA, CAPTAIN)]
+    # The assassination is paid for even when blocked
+    assert state.coins == [0, 0]
+
+
+def test_utility_of_a_finished_and_an_unfinished_game():
+    state = EndgameState([_hand(DUKE), ()], [0, 0])
+    assert state.is_terminal()
+    assert (state.utility(0), state.utility(1)) == (1.0, -1.0)
+
+    state = EndgameState([_hand(DUKE, CAPTAIN), _hand(DUKE)], [0, 0])
+    assert not state.is_terminal()
+    assert state.utility(0) == 0.5
+
+
+def test_ten_coins_must_coup():
+    assert legal_decisions(ACT, 10, 3) == [COUP]
+    assert STEAL not in legal_decisions(ACT, 2, 0)
+    assert legal_decisions(COUNTER, 10, 3) == [PASS, RESPOND]
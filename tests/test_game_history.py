@@ -0,0 +1,61 @@
+import threading
+
+from src.models.game_history import GameHistory, HistoryRecord, HistorySpill
+
+
+def _record(turn: int) -> HistoryRecord:
+    return HistoryRecord(turn=turn, current_player=f"player {turn % 3}", messages=[f"message {turn}"])
+
+
+def test_spilled_turns_are_read_back_in_order():
+    history = GameHistory(history=[], max_in_memory_turns=4)
+    for turn in range(20):
+        history.append(_record(turn))
+
+    assert len(history) == 20
+    assert len(history.history) == 4
+    assert [record.turn for record in history.records()] == list(range(20))
+
+
+def test_recent_reads_only_the_latest_spilled_turns():
+    history = GameHistory(history=[], max_in_memory_turns=4)
+    for turn in range(20):
+        history.append(_record(turn))
+
+    assert [record.turn for record in history.recent(2)] == [18, 19]
+    assert [record.turn for record in history.recent(7)] == list(range(13, 20))
+    assert [record.turn for record in history.recent(50)] == list(range(20))
+
+
+def test_spill_reads_ranges_in_small_chunks(monkeypatch):
+    monkeypatch.setattr("src.models.game_history.READ_CHUNK_SIZE", 10)
+    spill = HistorySpill()
+    for turn in range(10):
+        spill.append(_record(turn))
+
+    assert [record.turn for record in spill.records(3, 7)] == [3, 4, 5, 6]
+    assert [record.turn for record in spill.records()] == list(range(10))
+
+
+def test_concurrent_reads_see_intact_records():
+    spill = HistorySpill()
+    errors = []
+
+    def read_while_appending():
+        try:
+            for _ in range(200):
+                turns = [record.turn for record in spill.records()]
+                assert turns == list(range(len(turns)))
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read_while_appending) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for turn in range(500):
+        spill.append(_record(turn))
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    assert [record.turn for record in spill.records()] == list(range(500))
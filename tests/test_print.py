@@ -0,0 +1,55 @@
+import io
+import time
+
+from rich.console import Console
+from rich.text import Text
+
+from src.handler.game_handler import ResistanceCoupGameHandler
+from src.models.table import TableSpec
+from src.utils.dashboard import LiveDashboard
+from src.utils.print import capture_print, print_text, use_console
+
+
+def test_capture_print_shows_event_once_and_returns_it():
+    console = Console(file=io.StringIO())
+    with use_console(console):
+        captured = capture_print(print_text, "Ann's coins are increased by 1")
+
+    assert captured == "\nAnn's coins are increased by 1\n"
+    assert console.file.getvalue() == captured
+
+
+def test_capture_print_logs_to_dashboard_once():
+    console = Console(file=io.StringIO())
+    with use_console(console), LiveDashboard(console) as dashboard:
+        captured = capture_print(print_text, "Ann's coins are increased by 1")
+
+    assert captured == "\nAnn's coins are increased by 1\n"
+    assert [event.plain for event in dashboard._events] == ["Ann's coins are increased by 1"]
+
+
+def test_dashboard_draws_late_update_without_another_change():
+    console = Console(file=io.StringIO(), force_terminal=True, width=100)
+    with use_console(console), LiveDashboard(console, frames_per_second=20) as dashboard:
+        dashboard.log(Text("first event"))
+        dashboard.log(Text("second event"))
+        assert "second event" not in console.file.getvalue()
+
+        time.sleep(0.2)
+        assert "second event" in console.file.getvalue()
+
+
+def test_dashboard_skips_unchanged_state():
+    handler = ResistanceCoupGameHandler.from_table_spec(
+        TableSpec.from_cli_spec("ai*3:think_time=0", narration=False)
+    )
+    handler.setup_game()
+    console = Console(file=io.StringIO())
+    with use_console(console), LiveDashboard(console) as dashboard:
+        handler.print_game_state()
+        dashboard._render()
+        state = dashboard._state
+        handler.print_game_state()
+
+        assert dashboard._state_snapshot is None
+        assert dashboard._render().renderables[0] is state
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from src.models.table import TableSpec
+from src.stats.ratings import (
+    DEFAULT_MU,
+    DEFAULT_SIGMA,
+    MatchScheduler,
+    Rating,
+    RatingLadder,
+)
+
+
+def test_winner_gains_what_the_loser_loses():
+    ladder = RatingLadder()
+
+    ladder.record_game(["winner", "loser"])
+
+    winner, loser = ladder.rating("winner"), ladder.rating("loser")
+    assert winner.mu > DEFAULT_MU > loser.mu
+    assert winner.mu - DEFAULT_MU == pytest.approx(DEFAULT_MU - loser.mu)
+    assert winner.sigma < DEFAULT_SIGMA and loser.sigma < DEFAULT_SIGMA
+    assert winner.games == loser.games == 1
+
+
+def test_upset_moves_ratings_more_than_an_expected_result():
+    expected, upset = RatingLadder(), RatingLadder()
+    for ladder in (expected, upset):
+        ladder.ratings = {"strong": Rating(mu=30.0, sigma=4.0), "weak": Rating(mu=20.0, sigma=4.0)}
+
+    expected.record_game(["strong", "weak"])
+    upset.record_game(["weak", "strong"])
+
+    assert upset.rating("weak").mu - 20.0 > expected.rating("strong").mu - 30.0
+
+
+def test_seats_of_the_same_strategy_are_combined():
+    ladder = RatingLadder()
+
+    ladder.record_game(["ai", "llm", "ai"])
+
+    assert set(ladder.ratings) == {"ai", "llm"}
+    assert ladder.rating("ai").games == 1
+    # First and last place against the same strategy cancel out
+    assert ladder.rating("llm").mu == pytest.approx(DEFAULT_MU)
+
+
+def test_ratings_converge_to_the_stronger_strategy():
+    ladder = RatingLadder()
+    rng = random.Random(0)
+    for _ in range(300):
+        ladder.record_game(["strong", "weak"] if rng.random() < 0.8 else ["weak", "strong"])
+
+    assert [label for label, _ in ladder.leaderboard()] == ["strong", "weak"]
+    assert ladder.rating("strong").sigma < 2
+
+
+def test_ladder_survives_a_save_and_load(tmp_path):
+    path = str(tmp_path / "ratings.json")
+    ladder = RatingLadder()
+    ladder.record_game(["a", "b", "c"])
+
+    ladder.save(path)
+
+    assert RatingLadder.load(path) == ladder
+    assert RatingLadder.load(str(tmp_path / "missing.json")) == RatingLadder()
+
+
+def test_scheduler_seats_every_entry_before_repeating_one():
+    entries = TableSpec.from_cli_spec("ai:think_time=0,cfr,learned").seats
+    scheduler = MatchScheduler(RatingLadder(), entries)
+
+    table = scheduler.next_table(3)
+
+    assert sorted(seat.display_label for seat in table.seats) == sorted(entry.display_label for entry in entries)
+    assert not table.narration
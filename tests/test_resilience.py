@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+from src.models.players.llm_player.resilience import (
+    CircuitState,
+    adecide_with_deadline,
+    decide_with_deadline,
+    fallback_log,
+    get_circuit_breaker,
+)
+from src.models.players.llm_player.scheduler import LLMScheduler, Priority
+
+
+def _scheduler() -> LLMScheduler:
+    return LLMScheduler(requests_per_minute=100000, tokens_per_minute=100000000, max_concurrency=1)
+
+
+def _decide(model_name: str, llm_call, deadline: float = 0.1):
+    return decide_with_deadline(
+        decision="test", player_name="Player", llm_call=llm_call, fallback=lambda: "fallback",
+        model_name=model_name, deadline=deadline, max_retries=0,
+    )
+
+
+def test_call_queued_past_the_deadline_is_dropped():
+    scheduler = _scheduler()
+    sent = []
+
+    def llm_call():
+        with scheduler.slot(Priority.decision, 10):
+            sent.append(True)
+            return "answer"
+
+    with scheduler.slot(Priority.decision, 10):
+        assert _decide("queued-model", llm_call) == "fallback"
+        time.sleep(0.05)
+        assert scheduler.stats().waiting == 0
+
+    time.sleep(0.05)
+    assert sent == []
+    assert get_circuit_breaker("queued-model")._consecutive_failures == 0
+    assert fallback_log.records[-1].reason == "deadline exceeded waiting for the rate limit"
+
+
+def test_request_past_the_deadline_opens_the_circuit():
+    scheduler = _scheduler()
+    release = threading.Event()
+
+    def llm_call():
+        with scheduler.slot(Priority.decision, 10):
+            release.wait(1)
+            return "answer"
+
+    assert _decide("slow-model", llm_call) == "fallback"
+    release.set()
+    assert get_circuit_breaker("slow-model")._consecutive_failures == 1
+    assert fallback_log.records[-1].reason == "deadline exceeded"
+
+
+def test_abandoned_call_makes_no_further_requests():
+    scheduler = _scheduler()
+    release = threading.Event()
+    finished = threading.Event()
+    requests = []
+
+    def llm_call():
+        try:
+            for _ in range(2):
+                with scheduler.slot(Priority.decision, 10):
+                    requests.append(True)
+                    release.wait(1)
+        finally:
+            finished.set()
+
+    assert _decide("two-step-model", llm_call) == "fallback"
+    release.set()
+    assert finished.wait(1)
+    assert requests == [True]
+    assert scheduler.stats().in_flight == 0
+
+
+def test_async_call_queued_past_the_deadline_is_cancelled():
+    scheduler = _scheduler()
+
+    async def llm_call():
+        async with scheduler.aslot(Priority.decision, 10):
+            return "answer"
+
+    async def main():
+        async with scheduler.aslot(Priority.decision, 10):
+            decision = await adecide_with_deadline(
+                decision="test", player_name="Player", llm_call=llm_call, fallback=lambda: "fallback",
+                model_name="async-queued-model", deadline=0.1, max_retries=0,
+            )
+            await asyncio.sleep(0)
+            assert scheduler.stats().waiting == 0
+            return decision
+
+    assert asyncio.run(main()) == "fallback"
+    assert get_circuit_breaker("async-queued-model")._consecutive_failures == 0
+    assert scheduler.stats().in_flight == 0
+
+
+def test_trial_call_queued_past_the_deadline_frees_the_trial():
+    scheduler = _scheduler()
+    circuit_breaker = get_circuit_breaker("trial-model")
+    circuit_breaker._reset_timeout = 0.0
+    for _ in range(5):
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state == CircuitState.open
+
+    def llm_call():
+        with scheduler.slot(Priority.decision, 10):
+            return "answer"
+
+    with scheduler.slot(Priority.decision, 10):
+        assert _decide("trial-model", llm_call) == "fallback"
+
+    assert circuit_breaker.state == CircuitState.open
+    assert fallback_log.records[-1].reason == "deadline exceeded waiting for the rate limit"
+    # The next decision gets the trial instead of falling back for good
+    assert _decide("trial-model", llm_call) == "answer"
+    assert circuit_breaker.state == CircuitState.closed
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+from src.models.players.llm_player.scheduler import LLMScheduler, Priority
+
+
+def _scheduler(max_concurrency: int = 1) -> LLMScheduler:
+    return LLMScheduler(requests_per_minute=100000, tokens_per_minute=100000000, max_concurrency=max_concurrency)
+
+
+def test_async_waiters_dont_hold_threads():
+    scheduler = _scheduler()
+    threads_while_waiting = []
+
+    async def call(release: asyncio.Event):
+        async with scheduler.aslot(Priority.decision, 10):
+            await release.wait()
+
+    async def main():
+        release = asyncio.Event()
+        calls = [asyncio.create_task(call(release)) for _ in range(50)]
+        await asyncio.sleep(0.05)
+        threads_while_waiting.append(threading.active_count())
+        assert scheduler.stats().in_flight == 1
+        assert scheduler.stats().waiting == 49
+        release.set()
+        await asyncio.gather(*calls)
+
+    threads_before = threading.active_count()
+    asyncio.run(main())
+    assert threads_while_waiting == [threads_before]
+    assert scheduler.stats().waiting == 0
+    assert scheduler.stats().by_priority["decision"].requests == 50
+
+
+def test_waiters_are_admitted_by_priority():
+    scheduler = _scheduler()
+    admitted = []
+
+    async def call(priority: Priority, name: str):
+        async with scheduler.aslot(priority, 10):
+            admitted.append(name)
+
+    async def main():
+        async with scheduler.aslot(Priority.decision, 10):
+            calls = [
+                asyncio.create_task(call(Priority.speculation, "speculation")),
+                asyncio.create_task(call(Priority.narration, "narration")),
+                asyncio.create_task(call(Priority.decision, "decision")),
+            ]
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+    assert admitted == ["decision", "narration", "speculation"]
+
+
+def test_cancelled_waiter_leaves_the_line():
+    scheduler = _scheduler()
+    admitted = []
+
+    async def call(name: str):
+        async with scheduler.aslot(Priority.decision, 10):
+            admitted.append(name)
+
+    async def main():
+        async with scheduler.aslot(Priority.decision, 10):
+            first = asyncio.create_task(call("first"))
+            second = asyncio.create_task(call("second"))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            assert scheduler.stats().waiting == 1
+        await asyncio.wait_for(second, 1)
+
+    asyncio.run(main())
+    assert admitted == ["second"]
+    assert scheduler.stats().in_flight == 0
+
+
+def test_thread_and_async_waiters_share_the_line():
+    scheduler = _scheduler()
+    admitted = []
+
+    def thread_call():
+        with scheduler.slot(Priority.narration, 10):
+            admitted.append("thread")
+
+    async def async_call():
+        async with scheduler.aslot(Priority.decision, 10):
+            admitted.append("async")
+
+    async def main():
+        async with scheduler.aslot(Priority.decision, 10):
+            thread = threading.Thread(target=thread_call)
+            thread.start()
+            await asyncio.sleep(0.05)
+            waiting = asyncio.create_task(async_call())
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(waiting, 1)
+        await asyncio.to_thread(thread.join, 1)
+
+    asyncio.run(main())
+    assert admitted == ["async", "thread"]
+    assert scheduler.stats().in_flight == 0
+
+
+def test_waiter_is_admitted_when_the_budget_refills():
+    scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=100000000, max_concurrency=8)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(101):
+            async with scheduler.aslot(Priority.decision, 10):
+                pass
+        return loop.time() - started
+
+    # The burst allows a sixth of a minute's requests, the next one waits for a refill
+    assert 0.05 < asyncio.run(main()) < 1
+    stats = scheduler.stats().by_priority["decision"]
+    assert stats.requests == 101
+    assert stats.throttled == 1
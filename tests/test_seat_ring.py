@@ -0,0 +1,62 @@
+from src.handler.seat_ring import SeatRing
+
+
+def test_full_ring_goes_around_in_turn_order():
+    seats = SeatRing(4)
+
+    assert len(seats) == 4
+    assert list(seats) == [0, 1, 2, 3]
+    assert [seats.next(seat) for seat in range(4)] == [1, 2, 3, 0]
+
+
+def test_removed_seats_are_skipped():
+    seats = SeatRing(5)
+
+    seats.remove(2)
+    seats.remove(3)
+
+    assert len(seats) == 3
+    assert 2 not in seats and 3 not in seats
+    assert seats.next(1) == 4
+    assert list(seats) == [0, 1, 4]
+
+
+def test_next_after_a_removed_seat_skips_seats_removed_later():
+    seats = SeatRing(5)
+
+    seats.remove(1)
+    seats.remove(2)
+    seats.remove(3)
+
+    # Seat 1 still points at seat 2, which was removed after it
+    assert seats.next(1) == 4
+
+
+def test_removing_twice_changes_nothing():
+    seats = SeatRing(3)
+
+    seats.remove(1)
+    seats.remove(1)
+
+    assert len(seats) == 2
+    assert list(seats) == [0, 2]
+
+
+def test_first_follows_the_last_seat_standing():
+    seats = SeatRing(3)
+
+    seats.remove(0)
+    seats.remove(1)
+
+    assert seats.first() == 2
+    assert list(seats) == [2]
+    assert seats.next(2) == 2
+
+
+def test_seats_after_lists_the_other_seats_in_turn_order():
+    seats = SeatRing(5)
+    seats.remove(3)
+
+    assert list(seats.seats_after(2)) == [4, 0, 1]
+    # From a removed seat, every seat still in the game is listed
+    assert list(seats.seats_after(3)) == [4, 0, 1, 2]
@@ -0,0 +1,93 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.models.game_history import GameHistory, HistoryRecord
+from src.models.players.llm_player.scheduler import AbandonableCalls, abandonable
+from src.models.players.llm_player.session import ConversationSession
+
+
+def _history(turns: int) -> GameHistory:
+    history = GameHistory(history=[])
+    for turn in range(turns):
+        history.append(HistoryRecord(turn=turn, current_player="Ann", messages=[f"message {turn}"]))
+    return history
+
+
+def _format_turns(turns) -> str:
+    return ", ".join(message for turn in turns for message in turn.messages)
+
+
+def _request(session: ConversationSession, history: GameHistory, instruction: str):
+    return session.request(history, instruction, lambda: "context", _format_turns)
+
+
+def _answer(name: str):
+    return {"name": name, "args": {}, "id": name}
+
+
+def _contents(messages):
+    return [(type(message).__name__, message.content) for message in messages[1:]]
+
+
+def test_unanswered_request_leaves_the_conversation_as_it_was():
+    session = ConversationSession()
+    history = _history(2)
+
+    _request(session, history, "first")
+    retry = _request(session, history, "first again")
+
+    assert _contents(retry) == [("HumanMessage", "first again")]
+
+
+def test_answered_request_is_kept_with_its_answer():
+    session = ConversationSession()
+    history = _history(2)
+
+    first = _request(session, history, "first")
+    session.record_answer(first, _answer("income"))
+    history.append(HistoryRecord(turn=2, current_player="Bob", messages=["message 2"]))
+    second = _request(session, history, "second")
+
+    assert isinstance(second[-2], AIMessage)
+    assert _contents(second) == [
+        ("HumanMessage", "first"),
+        ("AIMessage", "income: {}"),
+        ("HumanMessage", "Since your last decision:\nmessage 1, message 2\nsecond"),
+    ]
+
+
+def test_answer_after_the_conversation_moved_on_is_dropped():
+    session = ConversationSession()
+    history = _history(1)
+
+    late = _request(session, history, "late")
+    answered = _request(session, history, "answered")
+    session.record_answer(answered, _answer("tax"))
+    session.record_answer(late, _answer("income"))
+    following = _request(session, history, "next")
+
+    assert [message.content for message in following if isinstance(message, AIMessage)] == ["tax: {}"]
+    assert "late" not in [message.content for message in following]
+
+
+def test_answer_to_an_abandoned_call_is_dropped():
+    session = ConversationSession()
+    history = _history(1)
+    calls = AbandonableCalls()
+
+    with abandonable(calls):
+        messages = _request(session, history, "too slow")
+        calls.abandon()
+        session.record_answer(messages, _answer("income"))
+
+    assert _contents(_request(session, history, "next")) == [("HumanMessage", "next")]
+
+
+def test_reset_drops_pending_requests():
+    session = ConversationSession()
+    history = _history(1)
+
+    messages = _request(session, history, "before reset")
+    session.reset()
+    session.record_answer(messages, _answer("income"))
+
+    assert all(isinstance(message, HumanMessage) for message in _request(session, history, "next")[1:])
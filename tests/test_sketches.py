@@ -0,0 +1,76 @@
+import random
+import statistics
+
+import pytest
+
+from src.stats.sketches import QuantileSketch, RunningStats
+
+
+def test_running_stats_match_the_batch_statistics():
+    values = [random.Random(0).gauss(10, 3) for _ in range(1000)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.std == pytest.approx(statistics.stdev(values))
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_merged_running_stats_equal_one_stream():
+    values = [float(value) for value in range(100)]
+    whole, first, second, empty = RunningStats(), RunningStats(), RunningStats(), RunningStats()
+    for value in values:
+        whole.add(value)
+    for value in values[:30]:
+        first.add(value)
+    for value in values[30:]:
+        second.add(value)
+
+    empty.merge(first)
+    empty.merge(second)
+    empty.merge(RunningStats())
+
+    assert (empty.count, empty.min, empty.max) == (whole.count, whole.min, whole.max)
+    assert empty.mean == pytest.approx(whole.mean)
+    assert empty.variance == pytest.approx(whole.variance)
+
+
+def test_running_stats_of_one_value_have_no_spread():
+    stats = RunningStats()
+    stats.add(4)
+
+    assert (stats.mean, stats.variance) == (4, 0.0)
+
+
+def test_quantiles_are_close_to_the_exact_ones():
+    random.seed(1)
+    values = list(range(100000))
+    random.shuffle(values)
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == 100000
+    for q in (0.1, 0.5, 0.9):
+        assert abs(sketch.quantile(q) - q * 100000) < 2000
+    assert sum(len(level) for level in sketch._levels) < 200 * 10
+
+
+def test_merged_sketches_keep_every_worker_in_the_quantiles():
+    random.seed(2)
+    low, high = QuantileSketch(capacity=50), QuantileSketch(capacity=50)
+    for value in range(1000):
+        low.add(value)
+        high.add(1000 + value)
+
+    low.merge(high)
+
+    assert low.count == 2000
+    assert abs(low.quantile(0.5) - 1000) < 100
+    assert low.quantile(0.0) < 100 and low.quantile(1.0) >= 1900
+
+
+def test_empty_sketch_has_no_quantiles():
+    assert QuantileSketch().quantile(0.5) is None
@@ -0,0 +1,33 @@
+import pytest
+from pydantic import ValidationError
+
+from src.models.table import SeatSpec, TableSpec
+
+
+def test_cli_spec_unrolls_the_seats():
+    table_spec = TableSpec.from_cli_spec("human,llm*2:model_name=gpt-4o-mini,ai*2:think_time=0")
+
+    seats = table_spec.expanded_seats()
+    assert table_spec.number_of_players == len(seats) == 5
+    assert table_spec.has_human
+    assert seats[1].params == {"model_name": "gpt-4o-mini"}
+    assert seats[4].display_label == "ai:think_time=0"
+
+
+@pytest.mark.parametrize("spec", ["human*2,ai", "human,ai,human"])
+def test_more_than_one_human_seat_is_rejected(spec):
+    with pytest.raises(ValidationError, match="one human seat"):
+        TableSpec.from_cli_spec(spec)
+
+
+@pytest.mark.parametrize("spec", ["", "ai", "llm*1"])
+def test_tables_of_fewer_than_2_seats_are_rejected(spec):
+    with pytest.raises(ValidationError, match="at least 2 seats"):
+        TableSpec.from_cli_spec(spec)
+
+
+def test_named_seats_need_names_of_their_own():
+    with pytest.raises(ValidationError, match="name of its own"):
+        TableSpec(seats=[SeatSpec(strategy="ai", name="Bob"), SeatSpec(strategy="llm", name="Bob")])
+    with pytest.raises(ValidationError, match="name of its own"):
+        TableSpec(seats=[SeatSpec(strategy="ai", name="Bob", count=2)])
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from src.models.table import TableSpec
+from src.stats.tournament import run_tournament
+from src.stats.training_data import MANIFEST_FILE, iter_shards, load_manifest
+
+
+def _export(directory: Path, number_of_games: int) -> None:
+    table_spec = TableSpec.from_cli_spec("ai*3:think_time=0", narration=False)
+    run_tournament(table_spec, number_of_games, export_directory=str(directory), rows_per_shard=64)
+
+
+def test_export_lists_every_shard_it_writes(tmp_path):
+    _export(tmp_path, 3)
+
+    manifest = load_manifest(str(tmp_path))
+    assert manifest.games == 3
+    assert sorted(path.name for path in tmp_path.glob("part-*")) == [shard.file for shard in manifest.shards]
+    assert sum(len(columns["game"]) for columns in iter_shards(str(tmp_path))) == manifest.rows
+
+
+def test_rerun_into_the_same_directory_removes_the_old_shards(tmp_path):
+    (tmp_path / "part-00009-00000.npz").write_bytes(b"stale")
+    (tmp_path / "part-00009-00001.npz.tmp").write_bytes(b"stale")
+    (tmp_path / MANIFEST_FILE).write_text("{}")
+    (tmp_path / "notes.txt").write_text("kept")
+
+    _export(tmp_path, 2)
+
+    manifest = load_manifest(str(tmp_path))
+    assert manifest.games == 2
+    assert sorted(path.name for path in tmp_path.glob("part-*")) == [shard.file for shard in manifest.shards]
+    assert (tmp_path / "notes.txt").read_text() == "kept"